@@ -0,0 +1,19 @@
+import sys
+import os
+# Adjust path to include backend root
+sys.path.append(os.getcwd())
+from app.database import engine
+from sqlalchemy import text
+
+def add_column():
+    print("Connecting to database...")
+    with engine.connect() as conn:
+        # Tenants registry lives only in public on the default shard
+        conn.execute(text("ALTER TABLE public.tenants ADD COLUMN IF NOT EXISTS shard_key VARCHAR DEFAULT 'default'"))
+        conn.execute(text("UPDATE public.tenants SET shard_key = 'default' WHERE shard_key IS NULL"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_public_tenants_shard_key ON public.tenants (shard_key)"))
+        conn.commit()
+        print("Column shard_key ensured on public.tenants")
+
+if __name__ == "__main__":
+    add_column()
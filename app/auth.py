@@ -4,9 +4,11 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Header
 from sqlalchemy.orm import Session
-from .database import get_db, SessionLocal
+from .database import (
+    get_db, SessionLocal, create_tenant_session, create_async_tenant_session,
+    use_replica, create_replica_tenant_session, create_async_replica_tenant_session
+)
 from .models import User, Tenant
-from sqlalchemy import text
 
 import os
 from dotenv import load_dotenv
@@ -17,27 +19,106 @@ SECRET_KEY = os.getenv("SECRET_KEY", "SUPER_SECRET_KEY_CHANGE_ME")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+import asyncio
 import bcrypt
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-def verify_password(plain_password, hashed_password):
-    if not hashed_password: return False
-    # Bcrypt requires bytes
-    password_bytes = plain_password.encode('utf-8')
-    # If hashed_password is a string (from DB), encode it
-    if isinstance(hashed_password, str):
-        hashed_password = hashed_password.encode('utf-8')
+# --- PASSWORD HASHING ---
+# bcrypt is CPU-bound and deliberately slow. Hashing runs on a small dedicated
+# pool; when more than BCRYPT_MAX_QUEUE calls are waiting, new ones are
+# rejected with 503. Hot paths (login) await the pool from the event loop
+# (*_async helpers) so waiting logins hold no request thread; the sync
+# helpers block their caller and are meant for rare admin operations.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", 64))
+
+_hash_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_hash_lock = threading.Lock()
+_hash_stats = {"in_flight": 0, "peak_in_flight": 0, "completed": 0, "rejected": 0}
+
+def _admit_hashing():
+    with _hash_lock:
+        if _hash_stats["in_flight"] >= BCRYPT_WORKERS + BCRYPT_MAX_QUEUE:
+            _hash_stats["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Authentication service busy, please retry")
+        _hash_stats["in_flight"] += 1
+        _hash_stats["peak_in_flight"] = max(_hash_stats["peak_in_flight"], _hash_stats["in_flight"])
+
+def _release_hashing():
+    with _hash_lock:
+        _hash_stats["in_flight"] -= 1
+        _hash_stats["completed"] += 1
+
+def _run_hashing(fn, *args):
+    _admit_hashing()
+    try:
+        return _hash_executor.submit(fn, *args).result()
+    finally:
+        _release_hashing()
+
+async def _run_hashing_async(fn, *args):
+    _admit_hashing()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _release_hashing()
+
+def get_password_hashing_stats():
+    """Queue-depth metric for the bcrypt pool (queue_depth = calls waiting for a worker)"""
+    with _hash_lock:
+        stats = dict(_hash_stats)
+    stats["queue_depth"] = max(0, stats["in_flight"] - BCRYPT_WORKERS)
+    stats.update({"workers": BCRYPT_WORKERS, "max_queue": BCRYPT_MAX_QUEUE, "rounds": BCRYPT_ROUNDS})
+    return stats
+
+def _checkpw(password_bytes, hashed_password):
     try:
         return bcrypt.checkpw(password_bytes, hashed_password)
     except Exception:
         return False
 
-def get_password_hash(password):
+def _hashpw(password_bytes, rounds):
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=rounds))
+
+def _checkpw_args(plain_password, hashed_password):
+    # Bcrypt requires bytes; hashed_password is a string when it comes from the DB
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return plain_password.encode('utf-8'), hashed_password
+
+def verify_password(plain_password, hashed_password):
+    if not hashed_password: return False
+    return _run_hashing(_checkpw, *_checkpw_args(plain_password, hashed_password))
+
+async def verify_password_async(plain_password, hashed_password):
+    if not hashed_password: return False
+    return await _run_hashing_async(_checkpw, *_checkpw_args(plain_password, hashed_password))
+
+def get_password_hash(password, rounds: Optional[int] = None):
     # Bcrypt requires bytes
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
+    hashed = _run_hashing(_hashpw, password_bytes, rounds or BCRYPT_ROUNDS)
+    return hashed.decode('utf-8')
+
+async def get_password_hash_async(password, rounds: Optional[int] = None):
+    hashed = await _run_hashing_async(_hashpw, password.encode('utf-8'), rounds or BCRYPT_ROUNDS)
     return hashed.decode('utf-8')
 
+def password_needs_rehash(hashed_password) -> bool:
+    """True when a stored bcrypt hash was made with a different cost than BCRYPT_ROUNDS"""
+    if not hashed_password:
+        return False
+    if isinstance(hashed_password, bytes):
+        hashed_password = hashed_password.decode('utf-8')
+    # Format: $2b$<cost>$<salt+hash>
+    parts = hashed_password.split('$')
+    try:
+        return int(parts[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -80,29 +161,110 @@ async def get_current_superadmin(
         raise HTTPException(status_code=401, detail="Invalid admin")
     return admin
 
+def _refuse_inactive_tenant(tenant):
+    # Write fence: deactivated tenants (and tenants being moved between shards)
+    # get no sessions at all, not just no new logins
+    if not tenant.is_active:
+        raise HTTPException(status_code=403, detail="Pharmacy account is inactive. Please contact support.")
+
 def get_db_with_tenant(x_tenant_id: str = Header(None)):
-    db = SessionLocal()
     print(f"AUTH DEBUG: get_db_with_tenant called with X-Tenant-ID: '{x_tenant_id}'")
+    if not x_tenant_id:
+        print("AUTH DEBUG: No X-Tenant-ID provided, using 'public'")
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+
+    # Find tenant by subdomain (served from the in-process tenant registry cache)
+    from .services.tenant_registry import get_tenant_info
+    tenant = get_tenant_info(x_tenant_id)
+    schema_name = tenant.schema_name if tenant else None
+    if not schema_name:
+        print(f"AUTH DEBUG: Tenant '{x_tenant_id}' NOT FOUND")
+        raise HTTPException(status_code=404, detail=f"Tenant '{x_tenant_id}' not found")
+    _refuse_inactive_tenant(tenant)
+
+    # Tenant tables are routed to the schema for the whole session lifetime,
+    # so routes no longer need to restore a search_path after commits.
+    db = create_tenant_session(schema_name, tenant.shard_key)
     try:
-        if not x_tenant_id:
-             print("AUTH DEBUG: No X-Tenant-ID provided, using 'public'")
-             db.execute(text(f"SET search_path TO public"))
-             yield db
-             return
-
-        # Find tenant by subdomain
-        tenant = db.query(Tenant).filter(Tenant.subdomain == x_tenant_id).first()
-        if not tenant:
-            print(f"AUTH DEBUG: Tenant '{x_tenant_id}' NOT FOUND")
-            raise HTTPException(status_code=404, detail=f"Tenant '{x_tenant_id}' not found")
-            
-        print(f"AUTH DEBUG: Setting search_path to '{tenant.schema_name}, public'")
-        db.info['tenant_schema'] = tenant.schema_name
-        db.execute(text(f"SET search_path TO {tenant.schema_name}, public"))
         yield db
     finally:
         db.close()
 
+async def get_async_db_with_tenant(x_tenant_id: str = Header(None)):
+    """Async (asyncpg) counterpart of get_db_with_tenant for read-heavy endpoints"""
+    from starlette.concurrency import run_in_threadpool
+    from .services.tenant_registry import get_tenant_info
+
+    if not x_tenant_id:
+        raise HTTPException(status_code=400, detail="X-Tenant-ID header is required")
+
+    # Cache hits are instant; a miss queries the public registry off the event loop
+    tenant = await run_in_threadpool(get_tenant_info, x_tenant_id)
+    if not tenant:
+        print(f"AUTH DEBUG: Tenant '{x_tenant_id}' NOT FOUND")
+        raise HTTPException(status_code=404, detail=f"Tenant '{x_tenant_id}' not found")
+    _refuse_inactive_tenant(tenant)
+
+    db = create_async_tenant_session(tenant.schema_name, tenant.shard_key)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+def get_replica_db_with_tenant(x_tenant_id: str = Header(None)):
+    """
+    Read-only tenant session for reports/analytics. Served by the shard's replica
+    while its lag is within REPLICA_MAX_LAG_SECONDS, otherwise by the primary.
+    """
+    from .services.tenant_registry import get_tenant_info
+
+    if not x_tenant_id:
+        raise HTTPException(status_code=400, detail="X-Tenant-ID header is required")
+
+    tenant = get_tenant_info(x_tenant_id)
+    if not tenant:
+        print(f"AUTH DEBUG: Tenant '{x_tenant_id}' NOT FOUND")
+        raise HTTPException(status_code=404, detail=f"Tenant '{x_tenant_id}' not found")
+    _refuse_inactive_tenant(tenant)
+
+    if use_replica(tenant.shard_key):
+        db = create_replica_tenant_session(tenant.schema_name, tenant.shard_key)
+    else:
+        db = create_tenant_session(tenant.schema_name, tenant.shard_key)
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_replica_db_with_tenant(x_tenant_id: str = Header(None)):
+    """Async counterpart of get_replica_db_with_tenant"""
+    from starlette.concurrency import run_in_threadpool
+    from .services.tenant_registry import get_tenant_info
+
+    if not x_tenant_id:
+        raise HTTPException(status_code=400, detail="X-Tenant-ID header is required")
+
+    tenant = await run_in_threadpool(get_tenant_info, x_tenant_id)
+    if not tenant:
+        print(f"AUTH DEBUG: Tenant '{x_tenant_id}' NOT FOUND")
+        raise HTTPException(status_code=404, detail=f"Tenant '{x_tenant_id}' not found")
+    _refuse_inactive_tenant(tenant)
+
+    # The lag check is cached per shard; a miss probes the replica off the event loop
+    if await run_in_threadpool(use_replica, tenant.shard_key):
+        db = create_async_replica_tenant_session(tenant.schema_name, tenant.shard_key)
+    else:
+        db = create_async_tenant_session(tenant.schema_name, tenant.shard_key)
+    try:
+        yield db
+    finally:
+        await db.close()
+
 async def get_current_tenant_user(
     x_tenant_id: str = Header(...),
     payload: dict = Depends(get_current_user_data),
@@ -113,12 +275,11 @@ async def get_current_tenant_user(
             print(f"AUTH DEBUG: Payload tenant '{payload.get('tenant_id')}' != Header tenant '{x_tenant_id}'")
             raise HTTPException(status_code=403, detail="Not authorized for this tenant")
         
-        user = db.query(User).filter(User.username == payload.get("sub")).first()
+        # Served from the user context cache; roles are loaded eagerly on a miss
+        from .services.user_context import get_user_context
+        user = get_user_context(db, payload)
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
-        
-        # Accessing roles here to ensure they are loaded while session is open
-        _ = user.roles
         return user
     except Exception as e:
         if isinstance(e, HTTPException):
@@ -127,3 +288,24 @@ async def get_current_tenant_user(
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail="Authentication error")
+
+def require_permission(*permission_names: str, any_of: bool = False):
+    """
+    Dependency factory enforcing tenant RBAC, e.g.
+    `user = Depends(require_permission("Sales > POS:process_sale"))`.
+    Returns the current user so it can replace `get_current_tenant_user`.
+    """
+    from .services.permission_cache import has_permissions
+
+    async def permission_checker(
+        user = Depends(get_current_tenant_user),
+        db: Session = Depends(get_db_with_tenant)
+    ):
+        if not has_permissions(db, user, permission_names, any_of=any_of):
+            raise HTTPException(
+                status_code=403,
+                detail=f"Missing permission: {', '.join(permission_names)}"
+            )
+        return user
+
+    return permission_checker
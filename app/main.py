@@ -2,11 +2,10 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import text
 import traceback
 
 from .database import engine, Base, SessionLocal
-from .models import Tenant, SuperAdmin, SoftwarePayment
+from .models import Tenant, SuperAdmin, SoftwarePayment, TenantMigrationStatus
 from .auth import get_password_hash
 from .routes import api_router
 
@@ -79,10 +78,9 @@ app.include_router(api_router)
 @app.on_event("startup")
 def startup():
     try:
-        Base.metadata.create_all(bind=engine, tables=[Tenant.__table__, SuperAdmin.__table__, SoftwarePayment.__table__])
+        Base.metadata.create_all(bind=engine, tables=[Tenant.__table__, SuperAdmin.__table__, SoftwarePayment.__table__, TenantMigrationStatus.__table__])
         db = SessionLocal()
         try:
-            db.execute(text("SET search_path TO public"))
             admin = db.query(SuperAdmin).filter(SuperAdmin.username == "admin").first()
             if not admin:
                 db.add(SuperAdmin(username="admin", email="admin@pharmaconnect.com", hashed_password=get_password_hash("admin123")))
@@ -1,25 +1,27 @@
 # Models package - exports all models
 from ..database import Base
-from .public_models import Tenant, SuperAdmin, SoftwarePayment
+from .public_models import Tenant, SuperAdmin, SoftwarePayment, TenantMigrationStatus
 from .user_models import User, Role, Permission, Store, user_roles, role_permissions
 from .pharmacy_models import (
     Manufacturer, Category, Product, ProductIngredient, 
-    ProductSupplier, ProductHistory, Supplier, PharmacySettings, AppSettings
+    ProductSupplier, ProductHistory, ProductCode, CatalogDeletion, Supplier, PharmacySettings, AppSettings
 )
-from .procurement_models import PurchaseOrder, PurchaseOrderItem, StockTransfer, GRN, GRNItem, StockInventory, StockAdjustment
-from .sales_models import Patient, Prescription, Invoice, InvoiceItem, SalesReturn
+from .procurement_models import PurchaseOrder, PurchaseOrderItem, StockTransfer, GRN, GRNItem, StockInventory, StockOnHand, StockAdjustment
+from .sales_models import Patient, Prescription, Invoice, InvoiceItem, SalesReturn, DraftCart
 from .service_models import TemperatureLog, RegulatoryLog
 from .inventory_models import (
     LineItem, SubCategory, ProductGroup, CategoryGroup,
     Generic, CalculateSeason, Rack, PurchaseConversionUnit
 )
 from .accounting_models import (
-    Account, JournalEntry, JournalEntryLine, SupplierLedger,
-    CustomerLedger, PaymentVoucher, ReceiptVoucher
+    Account, JournalEntry, JournalEntryLine, AccountBalanceDelta, SupplierLedger,
+    CustomerLedger, PaymentVoucher, ReceiptVoucher, AccountingOutbox
 )
 
 from .customer_models import Customer, CustomerType, CustomerGroup
 from .cash_register_models import CashRegister, CashRegisterSession, CashDenominationCount, CashMovement
+from .numbering_models import DocumentCounter
+from .idempotency_models import IdempotencyKey
 
 __all__ = [
     "Base",  # Re-exported from database
@@ -36,6 +38,8 @@ __all__ = [
     "Product",
     "ProductIngredient",
     "ProductSupplier",
+    "ProductCode",
+    "CatalogDeletion",
     "ProductHistory",
     "Supplier",
     "PurchaseOrder",
@@ -46,6 +50,7 @@ __all__ = [
     "Invoice",
     "InvoiceItem",
     "SalesReturn",
+    "DraftCart",
     "TemperatureLog",
     "RegulatoryLog",
     "StockAdjustment",
@@ -60,21 +65,27 @@ __all__ = [
     "GRN",
     "GRNItem",
     "StockInventory",
+    "StockOnHand",
     "PharmacySettings",
     "Account",
     "JournalEntry",
     "JournalEntryLine",
+    "AccountBalanceDelta",
     "SupplierLedger",
     "CustomerLedger",
     "PaymentVoucher",
     "ReceiptVoucher",
+    "AccountingOutbox",
     "AppSettings",
     "Customer",
     "CustomerType",
     "CustomerGroup",
     "SoftwarePayment",
+    "TenantMigrationStatus",
     "CashRegister",
     "CashRegisterSession",
     "CashDenominationCount",
     "CashMovement",
+    "DocumentCounter",
+    "IdempotencyKey",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, Text, ForeignKey, Enum as SQLEnum, Numeric, CheckConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, DateTime, Date, Text, ForeignKey, Enum as SQLEnum, Numeric, CheckConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -105,6 +105,20 @@ class JournalEntryLine(Base):
                        name='check_debit_or_credit'),
     )
 
+class AccountBalanceDelta(Base):
+    """
+    Append-only change to Account.current_balance (signed in the account's
+    normal direction). Postings insert rows here instead of updating the hot
+    account rows; they are folded into current_balance on read / periodically.
+    """
+    __tablename__ = "account_balance_deltas"
+    
+    id = Column(BigInteger, primary_key=True)
+    account_id = Column(Integer, ForeignKey('accounts.id'), nullable=False, index=True)
+    journal_entry_id = Column(Integer, ForeignKey('journal_entries.id'), nullable=True)
+    amount = Column(Numeric(15, 2), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class SupplierLedger(Base):
     __tablename__ = "supplier_ledger"
     
@@ -186,3 +200,22 @@ class ReceiptVoucher(Base):
     account = relationship("Account")
     journal_entry = relationship("JournalEntry")
     creator = relationship("User", foreign_keys=[created_by])
+
+class AccountingOutbox(Base):
+    """
+    Pending journal posting for a business document, written in the same
+    transaction as the document and drained by the outbox worker.
+    """
+    __tablename__ = "accounting_outbox"
+    
+    id = Column(BigInteger, primary_key=True)
+    event_type = Column(String(30), nullable=False)  # sale, purchase, inventory_adjustment
+    aggregate_id = Column(Integer, nullable=False)  # Invoice / GRN / StockAdjustment id
+    user_id = Column(Integer, nullable=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending, done, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # next attempt not before
+    journal_entry_id = Column(Integer, ForeignKey('journal_entries.id'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Integer, DateTime, JSON
+from datetime import datetime
+from ..database import Base
+
+# --- IDEMPOTENCY KEYS ---
+
+class IdempotencyKey(Base):
+    """Result of a create request sent with an Idempotency-Key header, replayed on retries"""
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String(50), primary_key=True)  # e.g. "invoices", "grn", "payment-vouchers"
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
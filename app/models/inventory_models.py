@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -40,6 +40,12 @@ class Generic(Base, AuditMixin):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
 
+    # Product search matches generic names too
+    __table_args__ = (
+        Index("ix_generics_name_trgm", text("lower(name) gin_trgm_ops"), postgresql_using="gin"),
+        Index("ix_generics_name_prefix", text("lower(name) text_pattern_ops")),
+    )
+
 class CalculateSeason(Base, AuditMixin):
     __tablename__ = "calculate_seasons"
     id = Column(Integer, primary_key=True, index=True)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from datetime import datetime
+from ..database import Base
+
+# --- DOCUMENT NUMBERING ---
+
+class DocumentCounter(Base):
+    """Last number issued per document series, keyed by the rendered prefix without its trailing dash (e.g. "INV", "PV-2026", "SES-20261016", "JE-SALE-2026")"""
+    __tablename__ = "document_counters"
+
+    series = Column(String(100), primary_key=True)
+    last_value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
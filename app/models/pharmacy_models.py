@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, Text, JSON, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, ForeignKey, Float, Text, JSON, DateTime, Index, text, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -68,6 +68,9 @@ class Product(Base):
     technical_details = Column(Text, nullable=True)
     internal_comments = Column(Text, nullable=True)
     
+    # Id of the last transaction that wrote the row; drives the POS catalog delta feed
+    catalog_version = Column(BigInteger, default=func.txid_current(), onupdate=func.txid_current(), index=True)
+    
     # Relationships for core fields
     line_item = relationship("LineItem")
     category = relationship("Category")
@@ -88,6 +91,13 @@ class Product(Base):
     ingredients = relationship("ProductIngredient", back_populates="product")
     product_suppliers = relationship("ProductSupplier", back_populates="product")
     history = relationship("ProductHistory", back_populates="product")
+    codes = relationship("ProductCode", back_populates="product")
+
+    # Search-as-you-type (see services/product_search.py): trigram for substrings, pattern ops for short prefixes
+    __table_args__ = (
+        Index("ix_products_name_trgm", text("lower(product_name) gin_trgm_ops"), postgresql_using="gin"),
+        Index("ix_products_name_prefix", text("lower(product_name) text_pattern_ops")),
+    )
 
     @property
     def uom(self):
@@ -107,6 +117,32 @@ class ProductIngredient(Base):
     percentage = Column(String, nullable=True) # 10%
     product = relationship("Product", back_populates="ingredients")
 
+    __table_args__ = (
+        Index("ix_product_ingredients_name_trgm", text("lower(name) gin_trgm_ops"), postgresql_using="gin"),
+        Index("ix_product_ingredients_name_prefix", text("lower(name) text_pattern_ops")),
+    )
+
+class ProductCode(Base):
+    """Barcode / alternate code of a product; pack-level codes point at a PurchaseConversionUnit"""
+    __tablename__ = "product_codes"
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
+    code = Column(String(64), nullable=False, unique=True, index=True)
+    code_type = Column(String(20), default="barcode") # barcode, sku, alternate
+    unit_id = Column(Integer, ForeignKey("purchase_conversion_units.id"), nullable=True) # Pack-level code
+    pack_quantity = Column(Integer, default=1) # Base units sold per scan
+    created_at = Column(DateTime, default=datetime.utcnow)
+    product = relationship("Product", back_populates="codes")
+    unit = relationship("PurchaseConversionUnit")
+
+class CatalogDeletion(Base):
+    """Tombstone of a hard-deleted product, so POS catalog deltas can drop it"""
+    __tablename__ = "catalog_deletions"
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, nullable=False) # No FK: the product row is gone
+    catalog_version = Column(BigInteger, default=func.txid_current(), index=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
 class ProductSupplier(Base):
     __tablename__ = "product_suppliers"
     id = Column(Integer, primary_key=True, index=True)
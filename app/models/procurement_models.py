@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Float, DateTime, Text, Boolean, Index, text, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -137,11 +137,42 @@ class StockInventory(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Id of the last transaction that wrote the row (sales, GRNs, adjustments); drives the POS catalog delta feed
+    catalog_version = Column(BigInteger, default=func.txid_current(), onupdate=func.txid_current(), index=True)
+    
     # Relationships
     product = relationship("Product")
     supplier = relationship("Supplier")
     grn = relationship("GRN")
     adjustments = relationship("StockAdjustment", back_populates="inventory")
+    
+    # Sellable batches of a product in allocation order (see services/batch_allocation.py)
+    __table_args__ = (
+        Index("ix_stock_inventory_fifo", "product_id", "inventory_id",
+              postgresql_where=text("quantity > 0 AND is_available")),
+        Index("ix_stock_inventory_fefo", "product_id", "expiry_date", "inventory_id",
+              postgresql_where=text("quantity > 0 AND is_available")),
+    )
+
+class StockOnHand(Base):
+    """
+    Stock on hand per product and store, summarised from the available
+    stock_inventory batches. Kept current in the same transaction as every
+    stock change (see services/stock_on_hand.py); store_id 0 = no store.
+    """
+    __tablename__ = "stock_on_hand"
+    
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    store_id = Column(Integer, primary_key=True, default=0)
+    
+    quantity = Column(Float, nullable=False, default=0)
+    stock_value = Column(Float, nullable=False, default=0)  # quantity x landed unit cost
+    nearest_expiry = Column(DateTime, nullable=True)  # earliest expiry among batches with stock
+    latest_inventory_id = Column(Integer, ForeignKey("stock_inventory.inventory_id"), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    latest_batch = relationship("StockInventory")
 
 class StockAdjustment(Base):
     """
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
 from datetime import datetime
 from ..database import Base
 
@@ -11,6 +11,7 @@ class Tenant(Base):
     name = Column(String, unique=True, index=True)
     subdomain = Column(String, unique=True, index=True)
     schema_name = Column(String, unique=True)
+    shard_key = Column(String, default="default", server_default="default", index=True) # Database holding schema_name
     admin_username = Column(String)
     admin_password = Column(String)
     is_active = Column(Boolean, default=True)
@@ -38,3 +39,19 @@ class SoftwarePayment(Base):
     status = Column(String, default="pending") # pending, approved, rejected
     rejection_reason = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class TenantMigrationStatus(Base):
+    """Per-tenant progress of the Alembic migration runner (run_tenant_migrations.py)"""
+    __tablename__ = "tenant_migration_status"
+    __table_args__ = {"schema": "public"}
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, unique=True, index=True)
+    schema_name = Column(String)
+    shard_key = Column(String)
+    target_revision = Column(String)
+    current_revision = Column(String, nullable=True)
+    status = Column(String, default="pending", index=True) # pending, running, done, failed
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
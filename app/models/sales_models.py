@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Text, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Text, DateTime, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -55,7 +55,7 @@ class Invoice(Base):
 class InvoiceItem(Base):
     __tablename__ = "invoice_items"
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"))
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), index=True)
     medicine_id = Column(Integer, ForeignKey("products.id"))  # kept column name for compatibility
     batch_id = Column(Integer, ForeignKey("stock_inventory.inventory_id"))
     quantity = Column(Integer)
@@ -110,3 +110,19 @@ class SaleReturnItem(Base):
     sales_return = relationship("SalesReturn", back_populates="items")
     product = relationship("Product")
     inventory = relationship("StockInventory")
+
+class DraftCart(Base):
+    """Held (parked) POS sale. Stock and accounting are only touched when it is finalized into an Invoice."""
+    __tablename__ = "draft_carts"
+    id = Column(Integer, primary_key=True, index=True)
+    label = Column(String, nullable=True) # e.g. customer name shown in the recall list
+    user_id = Column(Integer, ForeignKey("users.id"))
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=True)
+    cash_register_session_id = Column(Integer, ForeignKey("cash_register_sessions.id"), nullable=True)
+    
+    cart = Column(JSON, nullable=False) # InvoiceCreate payload
+    item_count = Column(Integer, default=0)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = Column(DateTime, index=True) # Abandoned drafts are purged after this
@@ -48,4 +48,5 @@ class User(Base):
     hashed_password = Column(String)
     store_id = Column(Integer, ForeignKey("stores.id"), nullable=True)
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, default=0, server_default="0") # Bump to revoke issued tokens / cached contexts
     roles = relationship("Role", secondary=user_roles, backref="users")
@@ -1,57 +1,53 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func
+from sqlalchemy import func
 from datetime import datetime, timedelta
 
-from ..models import Invoice, StockInventory, Product, User
-from ..auth import get_db_with_tenant, get_current_tenant_user
+from ..models import Invoice, InvoiceItem, StockInventory, Product, User
+from ..auth import get_replica_db_with_tenant, get_current_tenant_user
 
 router = APIRouter()
 
 @router.get("/profit-margin")
-def get_profit_data(db: Session = Depends(get_db_with_tenant)):
-    results = db.execute(text("""
-        SELECT p.product_name, SUM(ii.quantity * (ii.unit_price - si.unit_cost)) as profit
-        FROM invoice_items ii
-        JOIN products p ON ii.medicine_id = p.id
-        JOIN stock_inventory si ON ii.batch_id = si.inventory_id
-        GROUP BY p.product_name
-        ORDER BY profit DESC LIMIT 10
-    """)).fetchall()
+def get_profit_data(db: Session = Depends(get_replica_db_with_tenant)):
+    profit = func.sum(InvoiceItem.quantity * (InvoiceItem.unit_price - StockInventory.unit_cost)).label("profit")
+    results = db.query(Product.product_name, profit).select_from(InvoiceItem).join(
+        Product, InvoiceItem.medicine_id == Product.id
+    ).join(
+        StockInventory, InvoiceItem.batch_id == StockInventory.inventory_id
+    ).group_by(Product.product_name).order_by(profit.desc()).limit(10).all()
     return [{"medicine": r[0], "total_profit": r[1]} for r in results]
 
 @router.get("/top-selling")
-def top_selling(db: Session = Depends(get_db_with_tenant)):
-    results = db.execute(text("""
-        SELECT p.product_name, SUM(ii.quantity) as total_qty
-        FROM invoice_items ii
-        JOIN products p ON ii.medicine_id = p.id
-        GROUP BY p.product_name
-        ORDER BY total_qty DESC LIMIT 10
-    """)).fetchall()
+def top_selling(db: Session = Depends(get_replica_db_with_tenant)):
+    total_qty = func.sum(InvoiceItem.quantity).label("total_qty")
+    results = db.query(Product.product_name, total_qty).select_from(InvoiceItem).join(
+        Product, InvoiceItem.medicine_id == Product.id
+    ).group_by(Product.product_name).order_by(total_qty.desc()).limit(10).all()
     return [{"medicine": r[0], "units_sold": r[1]} for r in results]
 
 @router.get("/slow-moving")
-def slow_moving(db: Session = Depends(get_db_with_tenant)):
-    results = db.execute(text("""
-        SELECT p.product_name, SUM(si.quantity) as stock
-        FROM products p
-        JOIN stock_inventory si ON p.id = si.product_id
-        WHERE p.id NOT IN (SELECT medicine_id FROM invoice_items WHERE created_at > NOW() - INTERVAL '30 days')
-        GROUP BY p.product_name
-        HAVING SUM(si.quantity) > 0
-    """)).fetchall()
+def slow_moving(db: Session = Depends(get_replica_db_with_tenant)):
+    # Invoice items carry no timestamp of their own; the sale date lives on the invoice
+    since = datetime.utcnow() - timedelta(days=30)
+    recently_sold = db.query(InvoiceItem.medicine_id).join(
+        Invoice, InvoiceItem.invoice_id == Invoice.id
+    ).filter(Invoice.created_at > since, InvoiceItem.medicine_id.isnot(None))
+    stock = func.sum(StockInventory.quantity)
+    results = db.query(Product.product_name, stock).join(
+        StockInventory, Product.id == StockInventory.product_id
+    ).filter(~Product.id.in_(recently_sold)).group_by(Product.product_name).having(stock > 0).all()
     return [{"medicine": r[0], "current_stock": r[1]} for r in results]
 
 @router.get("/daily-sales")
-def get_daily_sales(db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
+def get_daily_sales(db: Session = Depends(get_replica_db_with_tenant), user: User = Depends(get_current_tenant_user)):
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     sales = db.query(func.sum(Invoice.net_total)).filter(Invoice.created_at >= today).scalar() or 0
     count = db.query(func.count(Invoice.id)).filter(Invoice.created_at >= today).scalar() or 0
     return {"total_sales": sales, "invoice_count": count}
 
 @router.get("/expiry-alerts")
-def get_expiry_alerts(db: Session = Depends(get_db_with_tenant)):
+def get_expiry_alerts(db: Session = Depends(get_replica_db_with_tenant)):
     next_90_days = datetime.utcnow() + timedelta(days=90)
     return db.query(StockInventory).join(Product).filter(
         StockInventory.expiry_date <= next_90_days, 
@@ -59,7 +55,7 @@ def get_expiry_alerts(db: Session = Depends(get_db_with_tenant)):
     ).all()
 
 @router.get("/low-stock")
-def get_low_stock(db: Session = Depends(get_db_with_tenant)):
+def get_low_stock(db: Session = Depends(get_replica_db_with_tenant)):
     return db.query(Product).join(StockInventory).group_by(Product.id).having(
         func.sum(StockInventory.quantity) <= Product.reorder_level
     ).all()
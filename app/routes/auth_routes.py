@@ -1,29 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import text, desc
+from sqlalchemy.orm import Session, selectinload
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 from datetime import datetime
 import traceback
 
-from ..database import get_db
-from ..models import Tenant, User, SuperAdmin, SoftwarePayment
+from ..database import get_db, create_tenant_session
+from ..models import User, SuperAdmin
 from ..schemas import Token, LoginRequest
+from ..services.tenant_registry import get_tenant_info
 from ..auth import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token,
     get_current_superadmin,
     get_current_tenant_user,
-    get_current_user_data
+    get_current_user_data,
+    password_needs_rehash
 )
 
 router = APIRouter()
 
+async def _rehash_if_needed(db: Session, account, plain_password: str):
+    """Upgrade a stored hash to the configured bcrypt cost after a successful login"""
+    if not password_needs_rehash(account.hashed_password):
+        return
+    try:
+        account.hashed_password = await get_password_hash_async(plain_password)
+        await run_in_threadpool(db.commit)
+    except Exception as e:
+        # Never fail a valid login because the upgrade could not be stored
+        print(f"WARNING: password rehash failed: {e}")
+        await run_in_threadpool(db.rollback)
+
+# Async so a login waiting on the bcrypt pool holds no threadpool slot; the
+# (short) database calls run in the threadpool.
 @router.post("/auth/login/", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     try:
         if login_data.tenant_id:
-            tenant = db.query(Tenant).filter(Tenant.subdomain == login_data.tenant_id).first()
+            tenant = await run_in_threadpool(get_tenant_info, login_data.tenant_id)
             if not tenant: raise HTTPException(status_code=404, detail="Pharmacy not found")
             
             # 1. Active Check
@@ -39,52 +55,52 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
                 # If valid active subscription exists, allow login.
                 # If NOT, diagnose the latest payment to give a specific error.
                 
-                active_payment = db.query(SoftwarePayment).filter(
-                    SoftwarePayment.tenant_id == tenant.id,
-                    SoftwarePayment.status == 'approved',
-                    SoftwarePayment.valid_to >= datetime.utcnow()
-                ).first()
-                
-                if not active_payment:
+                if not tenant.has_active_subscription():
                     # No active subscription. Find out why.
-                    latest_payment = db.query(SoftwarePayment).filter(
-                        SoftwarePayment.tenant_id == tenant.id
-                    ).order_by(desc(SoftwarePayment.created_at)).first()
-                    
-                    if not latest_payment:
+                    if not tenant.latest_payment_status:
                         raise HTTPException(status_code=403, detail="No subscription found. Please contact support.")
                     
-                    if latest_payment.status == 'pending':
+                    if tenant.latest_payment_status == 'pending':
                         raise HTTPException(status_code=403, detail="Your subscription payment is pending approval.")
-                    elif latest_payment.status == 'rejected':
-                        reason = f": {latest_payment.rejection_reason}" if latest_payment.rejection_reason else "."
+                    elif tenant.latest_payment_status == 'rejected':
+                        reason = f": {tenant.latest_payment_rejection_reason}" if tenant.latest_payment_rejection_reason else "."
                         raise HTTPException(status_code=403, detail=f"Your payment was rejected{reason} Please submit a new payment.")
-                    elif latest_payment.status == 'approved':
+                    elif tenant.latest_payment_status == 'approved' and tenant.latest_payment_valid_to:
                         # Valid_to must be in the past
-                        raise HTTPException(status_code=403, detail=f"Subscription expired on {latest_payment.valid_to.strftime('%Y-%m-%d')}. Please renew.")
+                        raise HTTPException(status_code=403, detail=f"Subscription expired on {tenant.latest_payment_valid_to.strftime('%Y-%m-%d')}. Please renew.")
                     else:
                         raise HTTPException(status_code=403, detail="Subscription expired. Please renew.")
             
-            db.execute(text(f"SET search_path TO {tenant.schema_name}, public"))
-            user = db.query(User).filter(User.username == login_data.username).first()
-            
-            if not user or not verify_password(login_data.password, user.hashed_password):
-                raise HTTPException(status_code=401, detail="Invalid credentials")
-            
-            access_token = create_access_token(data={
-                "sub": user.username, 
-                "id": user.id,
-                "tenant_id": login_data.tenant_id,
-                "schema_name": tenant.schema_name,
-                "roles": [r.name for r in user.roles],
-                "is_superadmin": False
-            })
+            tdb = create_tenant_session(tenant.schema_name, tenant.shard_key)
+            try:
+                user = await run_in_threadpool(
+                    lambda: tdb.query(User).options(selectinload(User.roles)).filter(User.username == login_data.username).first()
+                )
+                
+                if not user or not await verify_password_async(login_data.password, user.hashed_password):
+                    raise HTTPException(status_code=401, detail="Invalid credentials")
+                if user.is_active is False:
+                    raise HTTPException(status_code=403, detail="User account is deactivated")
+                
+                access_token = create_access_token(data={
+                    "sub": user.username, 
+                    "id": user.id,
+                    "tenant_id": login_data.tenant_id,
+                    "schema_name": tenant.schema_name,
+                    "roles": [r.name for r in user.roles],
+                    "ver": user.token_version or 0,
+                    "is_superadmin": False
+                })
+                await _rehash_if_needed(tdb, user, login_data.password)
+            finally:
+                await run_in_threadpool(tdb.close)
         else:
             # Superadmin Login
-            db.execute(text("SET search_path TO public"))
-            admin = db.query(SuperAdmin).filter(SuperAdmin.username == login_data.username).first()
+            admin = await run_in_threadpool(
+                lambda: db.query(SuperAdmin).filter(SuperAdmin.username == login_data.username).first()
+            )
             
-            if not admin or not verify_password(login_data.password, admin.hashed_password):
+            if not admin or not await verify_password_async(login_data.password, admin.hashed_password):
                 raise HTTPException(status_code=401, detail="Invalid admin credentials")
             
             access_token = create_access_token(data={
@@ -92,6 +108,7 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
                 "id": admin.id,
                 "is_superadmin": True
             })
+            await _rehash_if_needed(db, admin, login_data.password)
         return {"access_token": access_token, "token_type": "bearer"}
     except Exception as e:
         traceback.print_exc()
@@ -14,6 +14,7 @@ from ..models.sales_models import Invoice, SalesReturn
 from ..models.accounting_models import JournalEntry, JournalEntryLine, Account
 from ..auth import get_current_tenant_user, get_db_with_tenant
 from ..models.user_models import User, Store
+from ..services.numbering import next_document_number
 from ..schemas.cash_register_schemas import (
     CashRegisterCreate, CashRegisterUpdate, CashRegister as CashRegisterSchema,
     CashRegisterSessionOpen, CashRegisterSessionClose, CashRegisterSessionApprove,
@@ -27,12 +28,8 @@ router = APIRouter(prefix="/cash-registers", tags=["Cash Registers"])
 # --- HELPER FUNCTIONS ---
 
 def generate_session_number(db: Session) -> str:
-    """Generate unique session number"""
-    today = datetime.now().strftime("%Y%m%d")
-    count = db.query(CashRegisterSession).filter(
-        func.date(CashRegisterSession.created_at) == date.today()
-    ).count()
-    return f"SES-{today}-{count + 1:04d}"
+    """Allocate the next session number of the day (SES-YYYYMMDD-NNNN)"""
+    return next_document_number(db, "SES")
 
 def calculate_denomination_total(denom: dict) -> Decimal:
     """Calculate total from denomination breakdown"""
@@ -225,13 +222,11 @@ def create_variance_journal_entry(
         line.journal_entry_id = journal_entry.id
         db.add(line)
     
-    # Update account balances
-    if variance > 0:
-        cash_account.current_balance += abs(variance)
-        variance_account.current_balance += abs(variance)
-    else:
-        cash_account.current_balance -= abs(variance)
-        variance_account.current_balance += abs(variance)
+    # Queue the account balance changes
+    from ..services.account_balances import record_balance_delta
+    accounts = {cash_account.id: cash_account, variance_account.id: variance_account}
+    for line in lines:
+        record_balance_delta(db, accounts[line.account_id], line.debit_amount, line.credit_amount, journal_entry.id)
     
     return journal_entry
 
@@ -254,7 +249,6 @@ def create_cash_register(
     db_register = CashRegister(**register.dict())
     db.add(db_register)
     db.commit()
-    db.execute(text(f"SET search_path TO {db.info.get('tenant_schema', 'public')}, public"))
     db.refresh(db_register)
     return db_register
 
@@ -402,7 +396,6 @@ def open_cash_register_session(
     db.add(opening_denom)
     
     db.commit()
-    db.execute(text(f"SET search_path TO {db.info.get('tenant_schema', 'public')}, public"))
     db.refresh(new_session)
     return new_session
 
@@ -612,12 +605,7 @@ def create_cash_movement(
         db.add(db_movement)
         db.flush() # Get the ID while session is active
         
-        # Refresh while session is definitively pointing to the correct schema
-        # SQLAlchemy refresh sometimes fails if the schema path is complex or reset on commit
         db.commit()
-        
-        # Manually fetch to be absolutely sure we avoid the "Could not refresh instance" error
-        db.execute(text(f"SET search_path TO {db.info.get('tenant_schema', 'public')}, public"))
         db.refresh(db_movement)
         
         return db_movement
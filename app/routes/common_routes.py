@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy import func, text, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from sqlalchemy.orm import joinedload
-from typing import List
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Optional
 
 from ..models import Category, Manufacturer, Store, Supplier, Patient, Invoice, StockInventory, Product, InvoiceItem, RegulatoryLog, User, Role, PharmacySettings, AppSettings
-from ..schemas import InvoiceCreate, RoleResponse
-from ..auth import get_db_with_tenant, get_current_tenant_user
+from ..schemas import InvoiceCreate, InvoiceSyncBatch, RoleResponse
+from ..auth import get_db_with_tenant, get_async_db_with_tenant, get_current_tenant_user
+from ..services.stock_on_hand import refresh_stock_on_hand
+from ..utils.streaming import STREAM_BATCH_SIZE, dumps, open_async_stream_session, stream_json_array
 
 router = APIRouter()
 
@@ -55,11 +58,6 @@ def add_supplier(name: str, address: str, gst: str, db: Session = Depends(get_db
     sup_id = sup.id
     db.commit()
     # db.refresh(sup)
-    
-    # Restore tenant search path
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
 
     sup = db.query(Supplier).filter(Supplier.id == sup_id).first()
     return sup
@@ -77,254 +75,47 @@ def add_patient(p_name: str, p_phone: str, db: Session = Depends(get_db_with_ten
     p_id = p.id
     db.commit()
     # db.refresh(p)
-    
-    # Restore tenant search path
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
 
     p = db.query(Patient).filter(Patient.id == p_id).first()
     return p
 
 # Invoices (at root for compatibility)
 @router.post("/invoices")
-def create_invoice(inv_in: InvoiceCreate, db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
-    from datetime import datetime
+def create_invoice(
+    inv_in: InvoiceCreate,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db_with_tenant),
+    user: User = Depends(get_current_tenant_user)
+):
     import traceback
     from fastapi import HTTPException
+    from ..services.idempotency import claim_idempotency_key, remember_response, IdempotencyKeyReused
     
     try:
-        # CRITICAL: Prevent object expiration on commit. 
-        # AccountingService.record_sale_transaction() calls db.commit(), which normally expires objects.
-        # This causes subsequent access to hit the DB. If the search_path was reset by the DB on commit,
-        # it might hit public.invoices (which is missing customer_id) instead of tenant.invoices.
-        db.expire_on_commit = False
-        
-        sub_total = 0
-        tax_total = 0
-        invoice_items = []
-        returned_items_data = [] # To track items for SalesReturn model
-        
-        for item in inv_in.items:
-            # batch_id in request maps to inventory_id in StockInventory
-            inv_item = db.query(StockInventory).filter(
-                StockInventory.inventory_id == item.batch_id, 
-                StockInventory.product_id == item.medicine_id
-            ).first()
-            
-            if not inv_item:
-                raise HTTPException(status_code=400, detail=f"Batch {item.batch_id} not found for product {item.medicine_id}")
-            
-            # If quantity is positive (Sale), check stock
-            if item.quantity > 0 and inv_item.quantity < item.quantity:
-                raise HTTPException(status_code=400, detail=f"Insufficient stock for {item.medicine_id} batch {item.batch_id}")
-            
-            # Deduct stock (Subtracting a negative quantity increases stock - perfect for returns)
-            inv_item.quantity -= item.quantity
-            
-            line_total = item.unit_price * item.quantity
-            tax = line_total * (item.tax_percent / 100)
-            sub_total += line_total
-            tax_total += tax
-            
-            # Item level discount
-            if item.discount_percent > 0:
-                disc = line_total * (item.discount_percent / 100)
-            else:
-                disc = item.discount_amount
-            
-            item_net = line_total + tax - disc
-            
-            invoice_items.append(InvoiceItem(
-                medicine_id=item.medicine_id, 
-                batch_id=item.batch_id,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                retail_price=item.retail_price,
-                tax_amount=tax,
-                discount_percent=item.discount_percent,
-                discount_amount=disc if item.discount_percent == 0 else 0,
-                total_price=item_net
-            ))
-
-            # Track for SalesReturn if it's a return line
-            if item.quantity < 0:
-                returned_items_data.append({
-                    "product_id": item.medicine_id,
-                    "batch_id": item.batch_id,
-                    "quantity": abs(item.quantity),
-                    "unit_price": item.unit_price,
-                    "retail_price": item.retail_price,
-                    "tax_amount": abs(tax),
-                    "total_price": abs(item_net)
-                })
-            
-            med = db.query(Product).get(item.medicine_id)
-            if med.control_drug and item.quantity > 0:
-                db.add(RegulatoryLog(medicine_id=med.id, action="Dispensed", quantity=item.quantity, patient_id=inv_in.patient_id, customer_id=inv_in.customer_id))
-            elif med.control_drug and item.quantity < 0:
-                db.add(RegulatoryLog(medicine_id=med.id, action="Returned", quantity=abs(item.quantity), patient_id=inv_in.patient_id, customer_id=inv_in.customer_id))
-
-        # Net total calculation: (Gross Items) + (Adjustment) - (Invoice Discount)
-        # Note: adjustment can be positive (charge) or negative (discount)
-        items_net_sum = sum(it.total_price for it in invoice_items)
-        net_total = items_net_sum + inv_in.adjustment - inv_in.invoice_discount
-        
-        # Ensure we don't double count if discount_amount was just a proxy for invoice_discount
-        # Actually, let's just use the fields explicitly.
-        # net_total = items_net_sum + inv_in.adjustment - inv_in.invoice_discount
-        # This matches the frontend: baseNetTotal = grossTotal + adjustment; netTotal = baseNetTotal - invoiceDiscount;
-        
-        # Auto-increment Invoice Number - Filter to only look at standard INV sequence (starts with 0 for now)
-        last_invoice = db.query(Invoice).filter(Invoice.invoice_number.like('INV-0%')).order_by(Invoice.invoice_number.desc()).first()
-        new_invoice_number = "INV-000001"
-        if last_invoice and last_invoice.invoice_number:
-            import re
-            # Extract numeric part
-            match = re.search(r'INV-(\d+)', last_invoice.invoice_number)
-            if match:
-                num_part = match.group(1)
-                # Check if it's a sequence vs timestamp (10+ digits)
-                if len(num_part) < 10: 
-                    try:
-                        next_seq = int(num_part) + 1
-                        new_invoice_number = f"INV-{next_seq:06d}"
-                    except ValueError:
-                        pass
-
-        new_inv = Invoice(
-            invoice_number=new_invoice_number,
-            patient_id=inv_in.patient_id,
-            customer_id=inv_in.customer_id,
-            customer_name=inv_in.customer_name,
-            user_id=user.id,
-            store_id=user.store_id,
-            sub_total=sub_total,
-            tax_amount=tax_total,
-            discount_amount=inv_in.discount_amount,
-            invoice_discount=inv_in.invoice_discount,
-            net_total=net_total,
-            paid_amount=net_total,
-            status=inv_in.status,
-            payment_method=inv_in.payment_method,
-            cash_register_session_id=inv_in.cash_register_session_id,
-            remarks=inv_in.remarks,
-            items=invoice_items
-        )
-        db.add(new_inv)
-        db.flush()
-        
-        # --- Handle SalesReturn Model for Audit ---
-        if returned_items_data:
-            from ..models.sales_models import SalesReturn, SaleReturnItem
-            
-            # Calculate return totals from the negative lines
-            ret_sub = sum(d['total_price'] for d in returned_items_data) # This is absolute value
-            
-            sales_ret = SalesReturn(
-                return_number=f"REV-{datetime.now().strftime('%y%m%d%H%M%S')}",
-                invoice_id=new_inv.id,
-                sub_total=ret_sub,
-                tax_amount=0.0, # Simplified: tax already reflected in item.total_price reversal
-                net_total=ret_sub,
-                reason="POS Return/Exchange",
-                remarks=inv_in.remarks
-            )
-            db.add(sales_ret)
-            db.flush()
-            
-            for r_item in returned_items_data:
-                db.add(SaleReturnItem(
-                    sales_return_id=sales_ret.id,
-                    product_id=r_item['product_id'],
-                    batch_id=r_item['batch_id'],
-                    quantity=r_item['quantity'],
-                    unit_price=r_item['unit_price'],
-                    retail_price=r_item.get('retail_price'),
-                    tax_amount=r_item.get('tax_amount', 0.0),
-                    total_price=r_item['total_price']
-                ))
-            
-            db.flush() # Ensure sales_ret.id is ready for accounting
-
-        new_inv_id = new_inv.id
-        print(f"--- TRACE: Invoice {new_inv.invoice_number} prepared. Starting accounting...")
+        # A retried request (same Idempotency-Key) gets the original invoice back
+        # instead of deducting stock a second time
+        try:
+            replay = claim_idempotency_key(db, "invoices", idempotency_key, inv_in)
+        except IdempotencyKeyReused as key_err:
+            raise HTTPException(status_code=422, detail=str(key_err))
+        if replay is not None:
+            return replay.body
         
-        # Create accounting entry
+        from ..services.invoice_posting import post_invoice, invoice_response
+        from ..services.stock_engine import InsufficientStockError
         try:
-            from ..services.accounting_service import AccountingService
-            
-            # The new record_sale_transaction is "Return-Aware" and handles 
-            # the net financials, revenue reversals, and inventory restock
-            # for the entire invoice (including exchanges) in ONE balanced entry.
-            sale_entry = AccountingService.record_sale_transaction(db, new_inv, user.id)
-            
-            print(f"--- TRACE: Accounting processed for POS Transaction {new_inv.invoice_number}")
-            db.commit() # FINAL COMMIT for everything
-            print(f"✓ DONE: Transaction {new_inv.invoice_number} fully recorded.")
-            
-            # Safer Refresh: Manually restore path and fetch to avoid UndefinedColumn errors
-            tenant_schema = db.info.get('tenant_schema')
-            if tenant_schema:
-                try:
-                    db.execute(text(f"SET search_path TO {tenant_schema}, public"))
-                    # Use a fresh query to avoid any stale data or expired attribute issues
-                    refreshed_inv = db.query(Invoice).options(
-                        joinedload(Invoice.items).joinedload(InvoiceItem.product)
-                    ).filter(Invoice.id == new_inv_id).first()
-                    if refreshed_inv:
-                        new_inv = refreshed_inv
-                        # Enrich items with product_name for serialization consistency
-                        for item in new_inv.items:
-                            if item.product:
-                                setattr(item, "product_name", item.product.product_name)
-                except Exception as refresh_err:
-                    print(f"⚠ Warning: Manual refresh failed: {refresh_err}")
-                    # If refresh fails, we still have the object from before commit (thanks to expire_on_commit=False)
-        except Exception as acc_err:
-            print(f"⚠ Warning: Failed to create accounting entry: {acc_err}")
-            traceback.print_exc()
-            
-            # Restore path even on accounting failure
-            tenant_schema = db.info.get('tenant_schema')
-            if tenant_schema:
-                try:
-                    db.execute(text(f"SET search_path TO {tenant_schema}, public"))
-                except: pass
+            new_inv = post_invoice(db, inv_in, user)
+        except InsufficientStockError as stock_err:
+            raise HTTPException(status_code=400, detail=str(stock_err))
+        print(f"--- TRACE: Invoice {new_inv.invoice_number} prepared.")
         
         # Build clean response dict to avoid circular reference issues
-        response = {
-            "id": new_inv.id,
-            "invoice_number": new_inv.invoice_number,
-            "customer_name": new_inv.customer_name,
-            "sub_total": new_inv.sub_total,
-            "tax_amount": new_inv.tax_amount,
-            "discount_amount": new_inv.discount_amount,
-            "invoice_discount": new_inv.invoice_discount,
-            "net_total": new_inv.net_total,
-            "paid_amount": new_inv.paid_amount,
-            "payment_method": new_inv.payment_method,
-            "status": new_inv.status,
-            "created_at": new_inv.created_at.isoformat() if new_inv.created_at else None,
-            "items": []
-        }
+        response = invoice_response(db, new_inv)
         
-        # Safely serialize items
-        for item in new_inv.items:
-            item_dict = {
-                "id": item.id,
-                "medicine_id": item.medicine_id,
-                "batch_id": item.batch_id,
-                "quantity": item.quantity,
-                "unit_price": item.unit_price,
-                "retail_price": item.retail_price,
-                "tax_amount": item.tax_amount,
-                "discount_percent": item.discount_percent,
-                "discount_amount": item.discount_amount,
-                "total_price": item.total_price,
-                "product_name": getattr(item, "product_name", item.product.product_name if item.product else None)
-            }
-            response["items"].append(item_dict)
+        # The stored response commits together with the invoice
+        remember_response(db, "invoices", idempotency_key, response)
+        db.commit() # FINAL COMMIT for everything
+        print(f"✓ DONE: Transaction {response['invoice_number']} recorded, accounting queued.")
         
         return response
     except Exception as e:
@@ -333,16 +124,109 @@ def create_invoice(inv_in: InvoiceCreate, db: Session = Depends(get_db_with_tena
         if isinstance(e, HTTPException): raise e
         raise HTTPException(status_code=500, detail=str(e))
 
+INVOICE_SYNC_MAX_BATCH = 1000
+INVOICE_SYNC_MAX_CHUNK = 200
+
+@router.post("/invoices/batch")
+def sync_invoices(
+    batch: InvoiceSyncBatch,
+    db: Session = Depends(get_db_with_tenant),
+    user: User = Depends(get_current_tenant_user)
+):
+    """
+    Post a terminal's offline queue of sales in one request.
+    Invoices are posted in order; stock for each chunk of chunk_size is
+    validated with one locking read, and every invoice is committed on its own
+    (it has its own idempotency key), so a failing sale does not block the
+    rest and live checkouts never wait for a whole chunk on the invoice
+    counter or batch locks. Returns one result per entry: created, replayed
+    (already posted under its idempotency_key) or failed.
+    """
+    import traceback
+    from fastapi import HTTPException
+    from ..services.idempotency import claim_idempotency_key, remember_response, find_stored_responses
+    from ..services.invoice_posting import post_invoice, invoice_response
+    from ..services.stock_engine import check_carts_stock
+    
+    if len(batch.invoices) > INVOICE_SYNC_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {INVOICE_SYNC_MAX_BATCH} invoices per batch")
+    chunk_size = max(1, min(batch.chunk_size, INVOICE_SYNC_MAX_CHUNK))
+    
+    results = []
+    for start in range(0, len(batch.invoices), chunk_size):
+        chunk = batch.invoices[start:start + chunk_size]
+        chunk_results = []
+        try:
+            # Entries already posted (e.g. the terminal retried after a timeout) are replayed without work
+            stored = find_stored_responses(db, "invoices", (entry.idempotency_key for entry in chunk))
+            pending = []
+            for offset, entry in enumerate(chunk):
+                result = {"index": start + offset, "client_ref": entry.client_ref, "status": None}
+                replay = stored.get(entry.idempotency_key) if entry.idempotency_key else None
+                if replay is not None and replay.matches(entry.invoice):
+                    result.update(status="replayed", invoice=replay.body)
+                elif replay is not None:
+                    result.update(status="failed", error=f"Idempotency-Key '{entry.idempotency_key}' was already used with a different request")
+                else:
+                    pending.append((entry, result))
+                chunk_results.append(result)
+            
+            # Validate every batch used by the chunk at once; post_invoice re-checks
+            # under its own locks, since these are released by the first commit below
+            problems = check_carts_stock(db, [entry.invoice.items for entry, _ in pending])
+            
+            for (entry, result), cart_problems in zip(pending, problems):
+                if cart_problems:
+                    result.update(status="failed", error="; ".join(cart_problems))
+                    continue
+                
+                try:
+                    replay = claim_idempotency_key(db, "invoices", entry.idempotency_key, entry.invoice)
+                    if replay is not None:
+                        # Posted by a concurrent request since the lookup above
+                        db.commit()
+                        result.update(status="replayed", invoice=replay.body)
+                        continue
+                    new_inv = post_invoice(db, entry.invoice, user)
+                    response = invoice_response(db, new_inv)
+                    remember_response(db, "invoices", entry.idempotency_key, response)
+                    db.commit()
+                    result.update(status="created", invoice=response)
+                except Exception as e:
+                    db.rollback()
+                    if not isinstance(e, ValueError):
+                        traceback.print_exc()
+                    result.update(status="failed", error=str(e))
+            
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            traceback.print_exc()
+            # Entries committed before the error stay created/replayed
+            for result in chunk_results:
+                if result["status"] not in ("created", "replayed"):
+                    result.update(status="failed", error=str(e), invoice=None)
+            for entry in chunk[len(chunk_results):]:
+                chunk_results.append({"index": start + len(chunk_results), "client_ref": entry.client_ref, "status": "failed", "error": str(e)})
+        results.extend(chunk_results)
+    
+    counts = {"created": 0, "replayed": 0, "failed": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    print(f"✓ SYNC: {len(results)} offline invoices processed {counts}")
+    return {"results": results, **counts}
+
 @router.get("/invoices")
-def list_invoices(
+async def list_invoices(
+    request: Request,
     limit: int = 50, 
     start_date: str | None = None, 
     end_date: str | None = None, 
     status: str | None = None, 
-    db: Session = Depends(get_db_with_tenant)
+    db: AsyncSession = Depends(get_async_db_with_tenant)
 ):
-    """List recent invoices for the POS history view with filters"""
-    query = db.query(Invoice)
+    """List recent invoices for the POS history view with filters (streamed)"""
+    query = select(Invoice)
     
     if status and status != 'All':
         query = query.filter(Invoice.status == status)
@@ -359,14 +243,13 @@ def list_invoices(
             query = query.filter(Invoice.created_at < end)
         except: pass
         
-    invoices = query.order_by(Invoice.created_at.desc()).limit(limit).options(
-        joinedload(Invoice.items).joinedload(InvoiceItem.product),
-        joinedload(Invoice.user)
-    ).all()
+    query = query.order_by(Invoice.created_at.desc()).limit(limit).options(
+        selectinload(Invoice.items).selectinload(InvoiceItem.product),
+        selectinload(Invoice.user)
+    ).execution_options(yield_per=STREAM_BATCH_SIZE)
     
     # Enrich and serialize
-    inv_list = []
-    for inv in invoices:
+    def serialize(inv):
         inv_dict = {
             "id": inv.id,
             "invoice_number": inv.invoice_number,
@@ -406,13 +289,24 @@ def list_invoices(
                 "product_name": item.product.product_name if item.product else f"Item {item.medicine_id}"
             }
             inv_dict["items"].append(item_dict)
-        inv_list.append(inv_dict)
+        return dumps(inv_dict)
+    
+    async def rows():
+        stream_db = open_async_stream_session(db)
+        try:
+            result = await stream_db.stream(query)
+            async for partition in result.scalars().partitions():
+                for inv in partition:
+                    yield inv
+                stream_db.expunge_all()
+        finally:
+            await stream_db.close()
                     
-    return inv_list
+    return stream_json_array(request, rows(), serialize)
 
 @router.delete("/invoices/{invoice_id}")
 def void_invoice(invoice_id: int, db: Session = Depends(get_db_with_tenant)):
-    """Void an invoice and restore stock (used for Recalling Held bills)"""
+    """Void an invoice and restore stock (legacy held-bill recall; new held bills use /sales/draft-carts)"""
     # Find invoice
     inv = db.query(Invoice).options(joinedload(Invoice.items)).filter(Invoice.id == invoice_id).first()
     if not inv:
@@ -426,6 +320,7 @@ def void_invoice(invoice_id: int, db: Session = Depends(get_db_with_tenant)):
         ).first()
         if stock:
             stock.quantity += item.quantity
+    refresh_stock_on_hand(db, (item.medicine_id for item in inv.items))
             
     # Delete invoice (or mark void, but for HOLD recall we delete it because we re-add to cart)
     db.delete(inv)
@@ -434,7 +329,7 @@ def void_invoice(invoice_id: int, db: Session = Depends(get_db_with_tenant)):
 
 @router.put("/invoices/{invoice_id}")
 def update_invoice(invoice_id: int, inv_in: InvoiceCreate, db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
-    """Update an existing invoice (used for modifying Held bills)"""
+    """Update an existing invoice (legacy held-bill edit; new held bills use /sales/draft-carts)"""
     import traceback
     from fastapi import HTTPException
     
@@ -497,6 +392,8 @@ def update_invoice(invoice_id: int, inv_in: InvoiceCreate, db: Session = Depends
             if med.control_drug:
                 db.add(RegulatoryLog(medicine_id=med.id, action="Dispensed", quantity=item.quantity, patient_id=inv_in.patient_id))
 
+        refresh_stock_on_hand(db, {item.medicine_id for item in inv.items} | {item.medicine_id for item in inv_in.items})
+        
         # 4. Update Invoice Totals
         items_net_sum = sum(it.total_price for it in invoice_items)
         net_total = items_net_sum - inv_in.discount_amount
@@ -512,11 +409,6 @@ def update_invoice(invoice_id: int, inv_in: InvoiceCreate, db: Session = Depends
         
         db.commit()
         # db.refresh(inv)
-        
-        # Restore tenant search path
-        tenant_schema = db.info.get('tenant_schema')
-        if tenant_schema:
-            db.execute(text(f"SET search_path TO {tenant_schema}, public"))
 
         inv = db.query(Invoice).filter(Invoice.id == invoice_id).first()
         return inv
@@ -566,6 +458,8 @@ def transfer_stock(from_id: int, to_id: int, med_id: int, qty: int, db: Session
         )
         db.add(new_inv)
         
+    refresh_stock_on_hand(db, [med_id])
+        
     transfer = StockTransfer(from_store_id=from_id, to_store_id=to_id, medicine_id=med_id, quantity=qty)
     db.add(transfer); db.commit()
     return {"message": "Transfer successful"}
@@ -679,4 +573,6 @@ def update_app_settings(s: AppSettingsSchema, db: Session = Depends(get_db_with_
         settings.stock_adj_batch_required = s.stock_adj_batch_required
     
     db.commit()
+    from ..services.batch_allocation import invalidate_sale_module
+    invalidate_sale_module(db.info.get('tenant_schema'))
     return settings
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import text, or_, func
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import text, or_, func, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
 from datetime import datetime
 
@@ -13,6 +13,7 @@ from ..schemas.customer_schemas import (
 from ..auth import get_db_with_tenant, get_current_tenant_user
 from ..schemas.common_schemas import PaginatedResponse
 from ..utils.pagination import paginate
+from ..utils.streaming import STREAM_BATCH_SIZE, open_stream_session, pydantic_item, stream_json_array
 
 router = APIRouter()
 
@@ -195,13 +196,24 @@ def list_customers(
     }
 
 @router.get("/all", response_model=List[CustomerResponse])
-def list_all_customers(db: Session = Depends(get_db_with_tenant)):
-    customers = db.query(Customer).filter(Customer.is_active == True).options(
-        joinedload(Customer.customer_type),
-        joinedload(Customer.customer_group)
-    ).all()
-    add_balances_to_customers(db, customers)
-    return customers
+def list_all_customers(request: Request, db: Session = Depends(get_db_with_tenant)):
+    stmt = select(Customer).filter(Customer.is_active == True).options(
+        selectinload(Customer.customer_type),
+        selectinload(Customer.customer_group)
+    ).order_by(Customer.id).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    def rows():
+        stream_db = open_stream_session(db)
+        try:
+            for partition in stream_db.execute(stmt).scalars().partitions():
+                # Balances are batched per yield_per partition instead of over all customers
+                add_balances_to_customers(stream_db, partition)
+                yield from partition
+                stream_db.expunge_all()
+        finally:
+            stream_db.close()
+
+    return stream_json_array(request, rows(), pydantic_item(CustomerResponse))
 
 @router.post("/", response_model=CustomerResponse)
 def create_customer(customer: CustomerCreate, db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy import func, text, select
 from typing import List, Optional
 from datetime import datetime
 
 from ..models import StockInventory, StockAdjustment, Product
-from ..services.accounting_service import AccountingService
+from ..services.accounting_outbox import enqueue_posting
+from ..services.stock_on_hand import refresh_stock_on_hand
 from ..schemas.procurement_schemas import StockAdjustmentCreate, StockAdjustmentResponse
 from ..auth import get_db_with_tenant, get_current_tenant_user
+from ..utils.streaming import STREAM_BATCH_SIZE, open_stream_session, pydantic_item, stream_json_array
 
 router = APIRouter()
 
@@ -120,29 +122,33 @@ def adjust_inventory(adj_in: StockAdjustmentCreate, db: Session = Depends(get_db
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Insufficient total stock. Could not adjust remaining {abs(remaining_to_adjust)} units.")
 
-    db.commit()
-    
+    refresh_stock_on_hand(db, [adj_in.product_id] + [batch.product_id for batch in batches])
+
     # --- Accounting Integration ---
+    # Queued in the same transaction as the adjustment; the outbox worker posts
+    # it with retries, failures end up in the dead-letter list instead of a log line.
     if last_adj.adjustment_type == "return_to_supplier":
-        try:
-            AccountingService.record_inventory_adjustment_accounting(db, last_adj, user.id)
-        except Exception as e:
-            # We don't want to fail the inventory save if accounting fails, 
-            # but we should log it. In production, consider a background task or more robust retry.
-            print(f"ACCOUNTING ERROR during return: {e}")
-            import traceback
-            traceback.print_exc()
-
-    # Pattern from product_routes.py: Explicitly restore search_path after commit 
-    # to avoid search_path loss during reconnection/refresh.
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
-    
+        db.flush()
+        enqueue_posting(db, "inventory_adjustment", last_adj.adjustment_id, user.id)
+
+    db.commit()
+
     # Re-fetch the object to ensure it's fully populated and visible
     last_adj = db.query(StockAdjustment).filter(StockAdjustment.adjustment_id == last_adj.adjustment_id).first()
     return last_adj
 
 @router.get("/adjustments", response_model=List[StockAdjustmentResponse])
-def list_adjustments(db: Session = Depends(get_db_with_tenant), user=Depends(get_current_tenant_user)):
-    return db.query(StockAdjustment).order_by(StockAdjustment.adjustment_date.desc()).all()
+def list_adjustments(request: Request, db: Session = Depends(get_db_with_tenant), user=Depends(get_current_tenant_user)):
+    stmt = select(StockAdjustment).order_by(StockAdjustment.adjustment_date.desc())\
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    def rows():
+        stream_db = open_stream_session(db)
+        try:
+            for partition in stream_db.execute(stmt).scalars().partitions():
+                yield from partition
+                stream_db.expunge_all()
+        finally:
+            stream_db.close()
+
+    return stream_json_array(request, rows(), pydantic_item(StockAdjustmentResponse))
@@ -138,11 +138,6 @@ def create_crud_routes(model_class, router_prefix: str, create_schema, update_sc
             item_id = db_item.id
             db.commit()
             
-            # Restore tenant search path after commit
-            tenant_schema = db.info.get('tenant_schema')
-            if tenant_schema:
-                db.execute(text(f"SET search_path TO {tenant_schema}, public"))
-            
             db_item = db.query(model_class).filter(model_class.id == item_id).first()
             return db_item
         except Exception as e:
@@ -173,10 +168,6 @@ def create_crud_routes(model_class, router_prefix: str, create_schema, update_sc
             setattr(db_item, field, value)
         
         db.commit()
-        # Restore tenant search path
-        tenant_schema = db.info.get('tenant_schema')
-        if tenant_schema:
-            db.execute(text(f"SET search_path TO {tenant_schema}, public"))
             
         db_item = db.query(model_class).filter(model_class.id == item_id).first()
         return db_item
@@ -277,11 +268,6 @@ def create_sub_category(item: SubCategoryCreate, db: Session = Depends(get_db_wi
         db.flush()
         item_id = db_item.id
         db.commit()
-        
-        # Restore tenant search path
-        tenant_schema = db.info.get('tenant_schema')
-        if tenant_schema:
-            db.execute(text(f"SET search_path TO {tenant_schema}, public"))
             
         db_item = db.query(SubCategory).filter(SubCategory.id == item_id).first()
         return db_item
@@ -320,11 +306,6 @@ def update_sub_category(item_id: int, item: SubCategoryUpdate, db: Session = Dep
         setattr(db_item, field, value)
     
     db.commit()
-    
-    # Restore tenant search path
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
         
     db_item = db.query(SubCategory).filter(SubCategory.id == item_id).first()
     return db_item
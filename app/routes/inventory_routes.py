@@ -1,33 +1,42 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.pharmacy_models import Product, Category, Manufacturer, Supplier
 from ..models.inventory_models import Generic
-from ..models.procurement_models import StockInventory
+from ..models.procurement_models import StockInventory, StockOnHand
 from ..models.user_models import User
-from ..auth import get_db_with_tenant, get_current_tenant_user
+from ..auth import get_db_with_tenant, get_async_db_with_tenant, get_current_tenant_user
+from ..services.stock_on_hand import refresh_stock_on_hand
+from ..utils.streaming import (
+    STREAM_BATCH_SIZE, dumps, open_stream_session, open_async_stream_session, stream_json_array
+)
 
 router = APIRouter()
 
 @router.get("/")
-def get_inventory(db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
-    # Robust query using explicit join for category and generic to avoid relationship issues
-    results = db.query(
+async def get_inventory(request: Request, db: AsyncSession = Depends(get_async_db_with_tenant), user: User = Depends(get_current_tenant_user)):
+    # Robust query using explicit join for category and generic to avoid relationship issues.
+    # Collections are selectin-loaded per yield_per batch, so rows stream from a server-side cursor.
+    stmt = select(
         Product, 
         Category.name.label("cat_name"), 
         Generic.name.label("gen_name")
     ).outerjoin(Category, Product.category_id == Category.id)\
      .outerjoin(Generic, Product.generics_id == Generic.id)\
-     .options(joinedload(Product.stock_inventory), joinedload(Product.product_suppliers))\
-     .all()
+     .options(selectinload(Product.stock_inventory), selectinload(Product.product_suppliers))\
+     .order_by(Product.id)\
+     .execution_options(yield_per=STREAM_BATCH_SIZE)
     
     from ..models.pharmacy_models import AppSettings
-    app_settings = db.query(AppSettings).first()
+    app_settings = (await db.execute(select(AppSettings).limit(1))).scalars().first()
     sale_module = app_settings.sale_module if app_settings else "FIFO"
 
-    response = []
-    for p, cat_name, gen_name in results:
+    def serialize(row):
+        p, cat_name, gen_name = row
         # Aggregate stock info
         available_stock = [s for s in p.stock_inventory if s.is_available]
         
@@ -42,7 +51,7 @@ def get_inventory(db: Session = Depends(get_db_with_tenant), user: User = Depend
         # Get latest batch info for price and expiry (based on current selection method)
         latest_inv = available_stock # Already sorted correctly
         
-        p_dict = {
+        return dumps({
             "id": p.id,
             "product_name": p.product_name,
             "name": p.product_name, # Alias for compatibility
@@ -77,23 +86,62 @@ def get_inventory(db: Session = Depends(get_db_with_tenant), user: User = Depend
                     "expiry_date": s.expiry_date.isoformat() if s.expiry_date else None
                 } for s in available_stock
             ]
-        }
-        response.append(p_dict)
-    return response
+        })
 
+    async def rows():
+        stream_db = open_async_stream_session(db)
+        try:
+            result = await stream_db.stream(stmt)
+            async for partition in result.partitions():
+                for row in partition:
+                    yield row
+                # Rows of a finished batch are not needed any more
+                stream_db.expunge_all()
+        finally:
+            await stream_db.close()
+
+    return stream_json_array(request, rows(), serialize)
+
+
+@router.get("/catalog")
+async def get_catalog(
+    request: Request,
+    since: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db_with_tenant),
+    user: User = Depends(get_current_tenant_user)
+):
+    """
+    POS catalog for terminal-side caching. Without `since`: full snapshot of
+    products and sellable batches with an ETag (If-None-Match -> 304).
+    With `since=<version>` from an earlier response: only the products and
+    batches written since then, plus the ids of products deleted since then
+    (deleted_products). Either way `version` is the next cursor.
+    """
+    from ..services import catalog_sync
+    
+    if since is not None:
+        return await db.run_sync(lambda sync_db: catalog_sync.catalog_changes(sync_db, since))
+    
+    # The tag is taken before the rows, so it can only be older than the body (never hides a change)
+    etag = await db.run_sync(catalog_sync.catalog_etag)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    snapshot = await db.run_sync(catalog_sync.catalog_snapshot)
+    return JSONResponse(content=snapshot, headers={"ETag": etag})
 
 @router.get("/stock")
-def get_stock_list(db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
-    """Return all stock inventory entries with product and supplier details."""
-    results = db.query(StockInventory).options(
-        joinedload(StockInventory.product),
-        joinedload(StockInventory.supplier)
-    ).filter(StockInventory.is_available == True).all()
+def get_stock_list(request: Request, db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
+    """Return all stock inventory entries with product and supplier details (streamed)."""
+    stmt = select(StockInventory).options(
+        selectinload(StockInventory.product),
+        selectinload(StockInventory.supplier)
+    ).filter(StockInventory.is_available == True)\
+     .order_by(StockInventory.inventory_id)\
+     .execution_options(yield_per=STREAM_BATCH_SIZE)
     
-    response = []
-    for s in results:
+    def serialize(s):
         p = s.product
-        response.append({
+        return dumps({
             "inventory_id": s.inventory_id,
             "product_name": p.product_name if p else "N/A",
             "batch_number": s.batch_number,
@@ -107,30 +155,42 @@ def get_stock_list(db: Session = Depends(get_db_with_tenant), user: User = Depen
             "product_id": s.product_id,
             "created_at": s.created_at.isoformat() if s.created_at else None
         })
-    return response
+
+    def rows():
+        stream_db = open_stream_session(db)
+        try:
+            for partition in stream_db.execute(stmt).scalars().partitions():
+                yield from partition
+                stream_db.expunge_all()
+        finally:
+            stream_db.close()
+
+    return stream_json_array(request, rows(), serialize)
 
 @router.get("/stock-summary")
 def get_stock_summary(db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
-    """Return products with aggregated stock quantities."""
+    """Return products with aggregated stock quantities (from stock_on_hand)."""
+    summary = select(
+        StockOnHand.product_id,
+        func.sum(StockOnHand.quantity).label("total_quantity"),
+        func.max(StockOnHand.latest_inventory_id).label("latest_inventory_id")
+    ).group_by(StockOnHand.product_id).subquery("summary")
+    
+    # Latest batch info for basic display (price, etc.) is joined in, not queried per product
     results = db.query(
         Product.id,
         Product.product_name,
         Product.purchase_conv_factor,
-        func.sum(StockInventory.quantity).label("total_quantity"),
-        func.max(StockInventory.created_at).label("latest_created")
-    ).join(StockInventory, Product.id == StockInventory.product_id)\
-     .filter(StockInventory.is_available == True)\
-     .group_by(Product.id, Product.product_name, Product.purchase_conv_factor)\
+        summary.c.total_quantity,
+        StockInventory,
+        Supplier.name
+    ).join(summary, Product.id == summary.c.product_id)\
+     .outerjoin(StockInventory, StockInventory.inventory_id == summary.c.latest_inventory_id)\
+     .outerjoin(Supplier, Supplier.id == StockInventory.supplier_id)\
      .all()
     
     response = []
-    for pid, name, factor, total_qty, latest_created in results:
-        # Get latest batch info for basic display (price, etc.)
-        latest_batch = db.query(StockInventory).filter(
-            StockInventory.product_id == pid,
-            StockInventory.is_available == True
-        ).order_by(StockInventory.inventory_id.desc()).first()
-
+    for pid, name, factor, total_qty, latest_batch, supplier_name in results:
         response.append({
             "product_id": pid,
             "product_name": name,
@@ -142,7 +202,7 @@ def get_stock_summary(db: Session = Depends(get_db_with_tenant), user: User = De
                 "expiry_date": latest_batch.expiry_date.isoformat() if latest_batch.expiry_date else None,
                 "selling_price": latest_batch.selling_price,
                 "unit_cost": latest_batch.unit_cost,
-                "supplier_name": latest_batch.supplier.name if latest_batch.supplier else "N/A"
+                "supplier_name": supplier_name or "N/A"
             } if latest_batch else None
         })
     return response
@@ -181,6 +241,8 @@ def update_stock_price(inventory_id: int, selling_price: float = None, unit_cost
         stock.selling_price = selling_price
     if unit_cost is not None:
         stock.unit_cost = unit_cost
+        # Stock value is at landed cost
+        refresh_stock_on_hand(db, [stock.product_id])
         
     db.commit()
     return {"status": "ok", "message": "Price updated successfully"}
@@ -1,96 +1,152 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text, func
+from sqlalchemy.exc import IntegrityError
 
-from ..models import Product, ProductIngredient, ProductSupplier, ProductHistory, StockInventory, User
-from ..schemas import MedicineCreate
-from ..auth import get_db_with_tenant, get_current_tenant_user
+from typing import List
+
+from ..models import Product, ProductIngredient, ProductSupplier, ProductHistory, ProductCode, StockInventory, User
+from ..schemas import MedicineCreate, ProductCodeCreate, ProductCodeResponse
+from ..auth import get_db_with_tenant, get_async_db_with_tenant, get_current_tenant_user
+from ..services.stock_on_hand import refresh_stock_on_hand
 
 router = APIRouter()
 
 @router.get("/search")
-def search_products(q: str, db: Session = Depends(get_db_with_tenant)):
-    from sqlalchemy import or_, func
-    from sqlalchemy.orm import joinedload, aliased
-    from ..models.procurement_models import StockInventory
-    from ..models.pharmacy_models import Product, Category, Manufacturer
-    from ..models.inventory_models import Generic, PurchaseConversionUnit
+async def search_products(q: str, limit: int = 50, offset: int = 0, db: AsyncSession = Depends(get_async_db_with_tenant)):
+    """Ranked, paginated search-as-you-type over product, generic and ingredient names"""
+    from ..services import product_search
+    return await db.run_sync(lambda sync_db: product_search.search_products(sync_db, q, limit, offset))
+
+@router.get("/scan/{code}")
+def scan_product_code(code: str, db: Session = Depends(get_db_with_tenant)):
+    """Resolve a scanned barcode / product code to the product, its pack unit and sellable batches"""
+    from ..services.product_codes import lookup_code, allocatable_batches
     
-    # Aliases for different unit joins
-    PurchaseUnit = aliased(PurchaseConversionUnit)
-    PosUnit = aliased(PurchaseConversionUnit)
+    target = lookup_code(db, code)
+    if target is None:
+        raise HTTPException(status_code=404, detail=f"No product with code '{code}'")
+    product = db.query(Product).get(target.product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail=f"No product with code '{code}'")
+    
+    return {
+        "code": target.code,
+        "product_id": product.id,
+        "product_name": product.product_name,
+        "name": product.product_name, # Alias for compatibility
+        "unit_id": target.unit_id,
+        "unit_name": target.unit_name,
+        "pack_quantity": target.pack_quantity,
+        "retail_price": product.retail_price,
+        "tax_percent": product.tax_percent or 0,
+        "control_drug": product.control_drug,
+        "active": product.active,
+        "stock_inventory": [
+            {
+                "inventory_id": s.inventory_id,
+                "id": s.inventory_id, # Alias for compatibility
+                "batch_number": s.batch_number,
+                "quantity": s.quantity,
+                "selling_price": s.selling_price,
+                "retail_price": s.retail_price,
+                "tax_percent": s.tax_percent,
+                "expiry_date": s.expiry_date.isoformat() if s.expiry_date else None
+            } for s in allocatable_batches(db, product.id)
+        ]
+    }
+
+@router.get("/{id}/codes", response_model=List[ProductCodeResponse])
+def list_product_codes(id: int, db: Session = Depends(get_db_with_tenant)):
+    return db.query(ProductCode).filter(ProductCode.product_id == id).order_by(ProductCode.id).all()
 
-    results = db.query(
-            Product, 
-            func.sum(StockInventory.quantity).label("current_stock"),
-            Category.name.label("category_name"),
-            Manufacturer.name.label("manufacturer_name"),
-            Generic.name.label("generic_name"),
-            PurchaseUnit.name.label("purchase_unit_name"),
-            PosUnit.name.label("pos_unit_name")
-        )\
-        .outerjoin(StockInventory, Product.id == StockInventory.product_id)\
-        .outerjoin(Category, Product.category_id == Category.id)\
-        .outerjoin(Manufacturer, Product.manufacturer_id == Manufacturer.id)\
-        .outerjoin(Generic, Product.generics_id == Generic.id)\
-        .outerjoin(PurchaseUnit, Product.purchase_conv_unit_id == PurchaseUnit.id)\
-        .outerjoin(PosUnit, Product.preferred_pos_unit_id == PosUnit.id)\
-        .options(joinedload(Product.stock_inventory))\
-        .filter(
-            or_(
-                Product.product_name.ilike(f"%{q}%")
-            )
-        )\
-        .group_by(Product.id, Category.name, Manufacturer.name, Generic.name, PurchaseUnit.name, PosUnit.name)\
-        .all()
+@router.post("/{id}/codes", response_model=ProductCodeResponse)
+def add_product_code(id: int, code_in: ProductCodeCreate, db: Session = Depends(get_db_with_tenant)):
+    """Attach a barcode / alternate code to a product (pack-level when unit_id is given)"""
+    from ..services.product_codes import normalize_code, invalidate_product_codes, mark_codes_changed
+    
+    product = db.query(Product).get(id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    code = normalize_code(code_in.code)
+    if not code:
+        raise HTTPException(status_code=400, detail="Code is required")
+    
+    existing = db.query(ProductCode).filter(ProductCode.code == code).first()
+    if existing:
+        raise HTTPException(status_code=400, detail=f"Code '{code}' is already assigned to product {existing.product_id}")
+    
+    if code_in.unit_id is not None and code_in.unit_id not in {
+        product.purchase_conv_unit_id, product.base_unit_id,
+        product.preferred_purchase_unit_id, product.preferred_pos_unit_id
+    }:
+        raise HTTPException(status_code=400, detail=f"Unit {code_in.unit_id} is not a unit of product {id}")
     
-    from ..models.pharmacy_models import AppSettings
-    app_settings = db.query(AppSettings).first()
-    sale_module = app_settings.sale_module if app_settings else "FIFO"
+    pack_quantity = code_in.pack_quantity
+    if pack_quantity is None:
+        pack_quantity = (product.purchase_conv_factor or 1) if code_in.unit_id else 1
+    
+    db_code = ProductCode(
+        product_id=id,
+        code=code,
+        code_type=code_in.code_type,
+        unit_id=code_in.unit_id,
+        pack_quantity=pack_quantity
+    )
+    db.add(db_code)
+    try:
+        db.flush()
+        code_id = db_code.id
+        mark_codes_changed(db)
+        db.commit()
+    except IntegrityError:
+        # Assigned by a concurrent request since the check above
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Code '{code}' is already assigned")
+    invalidate_product_codes(db.info.get('tenant_schema'))
+    
+    return db.query(ProductCode).filter(ProductCode.id == code_id).first()
 
-    # Map to list of dicts or enhanced objects
-    response = []
-    for product, stock, cat_name, man_name, gen_name, p_unit_name, pos_unit_name in results:
-        
-        # Sort stock inventory based on setting
-        available_batches = [s for s in product.stock_inventory if s.is_available]
-        if sale_module == "FEFO":
-            available_batches.sort(key=lambda x: (x.expiry_date is None, x.expiry_date))
-        else: # FIFO and Avg Cost
-            available_batches.sort(key=lambda x: x.inventory_id)
+@router.delete("/codes/{code_id}")
+def delete_product_code(code_id: int, db: Session = Depends(get_db_with_tenant)):
+    from ..services.product_codes import invalidate_product_codes, mark_codes_changed
+    
+    deleted = db.query(ProductCode).filter(ProductCode.id == code_id).delete(synchronize_session=False)
+    if not deleted:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Product code not found")
+    mark_codes_changed(db)
+    db.commit()
+    invalidate_product_codes(db.info.get('tenant_schema'))
+    return {"message": "Product code removed"}
 
-        p_dict = {
-            "id": product.id,
-            "product_name": product.product_name,
-            "name": product.product_name, # Alias for compatibility
-            "generic_name": gen_name or "N/A",
-            "retail_price": product.retail_price,
-            "current_stock": stock or 0,
-            "supplier_id": product.supplier_id,
-            "manufacturer_id": product.manufacturer_id,
-            "category": {"id": product.category_id, "name": cat_name or "Uncategorized"},
-            "manufacturer": {"id": product.manufacturer_id, "name": man_name or "N/A"},
-            "tax_percent": product.tax_percent or 0,
-            "uom": pos_unit_name or "Unit", # Base unit name from POS Unit
-            "purchase_conv_unit_id": product.purchase_conv_unit_id,
-            "purchase_conv_unit_name": p_unit_name, # Also providing this if needed
-            "purchase_conv_factor": product.purchase_conv_factor,
-            "preferred_purchase_unit_id": product.preferred_purchase_unit_id,
-            "stock_inventory": [
-                {
-                    "inventory_id": s.inventory_id,
-                    "id": s.inventory_id, # Alias for compatibility
-                    "batch_number": s.batch_number,
-                    "quantity": s.quantity,
-                    "selling_price": s.selling_price,
-                    "retail_price": s.retail_price,
-                    "tax_percent": s.tax_percent,
-                    "expiry_date": s.expiry_date.isoformat() if s.expiry_date else None
-                } for s in available_batches
-            ]
-        }
-        response.append(p_dict)
-    return response
+@router.get("/{id}/allocation")
+def preview_batch_allocation(id: int, quantity: float, db: Session = Depends(get_db_with_tenant)):
+    """Batches a sale of `quantity` would be taken from under the tenant's sale module (FIFO/FEFO)"""
+    from ..services.batch_allocation import allocate_batches, get_sale_module
+    from ..services.stock_engine import InsufficientStockError
+    
+    sale_module = get_sale_module(db)
+    try:
+        allocations = allocate_batches(db, {id: quantity}, sale_module).get(id, [])
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "product_id": id,
+        "sale_module": sale_module,
+        "batches": [
+            {
+                "batch_id": a.batch_id,
+                "batch_number": a.batch_number,
+                "quantity": a.quantity,
+                "expiry_date": a.expiry_date.isoformat() if a.expiry_date else None,
+                "retail_price": a.retail_price,
+                "selling_price": a.selling_price,
+                "tax_percent": a.tax_percent
+            } for a in allocations
+        ]
+    }
 
 @router.get("/{id}")
 def get_product_details(id: int, db: Session = Depends(get_db_with_tenant)):
@@ -147,6 +203,7 @@ def add_product(med: MedicineCreate, db: Session = Depends(get_db_with_tenant),
             selling_price=med.batch.sale_price,
             grn_id=None
         ))
+        refresh_stock_on_hand(db, [new_m.id])
     
     # 3. History Log
     db.add(ProductHistory(product_id=new_m.id, user_id=user.id, change_type="CREATE", changes={"action": "Initial Creation"}))
@@ -155,11 +212,6 @@ def add_product(med: MedicineCreate, db: Session = Depends(get_db_with_tenant),
     new_m_id = new_m.id
     db.commit()
     # db.refresh(new_m) -- REMOVED per multi-tenant best practice
-    
-    # Restore tenant search path
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
         
     new_m = db.query(Product).filter(Product.id == new_m_id).first()
     return new_m
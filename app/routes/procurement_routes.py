@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime
@@ -11,6 +11,8 @@ from ..schemas import (
     GRNCreate, GRNResponse
 )
 from ..auth import get_db_with_tenant
+from ..services.numbering import next_document_number
+from ..services.stock_on_hand import refresh_stock_on_hand, stock_totals
 from ..schemas.common_schemas import PaginatedResponse
 from ..utils.pagination import paginate
 
@@ -76,8 +78,7 @@ def get_po(order_id: int, db: Session = Depends(get_db_with_tenant)):
 @router.post("/orders", response_model=PurchaseOrderResponse)
 def create_po(po_in: PurchaseOrderCreate, db: Session = Depends(get_db_with_tenant)):
     try:
-        # Generate PO number with milliseconds to avoid duplicates
-        po_no = f"PO-{datetime.now().strftime('%y%m%d%H%M%S%f')[:16]}"
+        po_no = next_document_number(db, "PO")
         
         db_po = PurchaseOrder(
             po_no=po_no,
@@ -105,11 +106,6 @@ def create_po(po_in: PurchaseOrderCreate, db: Session = Depends(get_db_with_tena
         
         db.commit() # Final commit
         # db.refresh(db_po)
-        
-        # Restore tenant search path
-        tenant_schema = db.info.get('tenant_schema')
-        if tenant_schema:
-            db.execute(text(f"SET search_path TO {tenant_schema}, public"))
 
         db_po = db.query(PurchaseOrder).filter(PurchaseOrder.id == po_id).first()
         return db_po
@@ -144,11 +140,6 @@ def update_po(order_id: int, po_in: PurchaseOrderUpdate, db: Session = Depends(g
             db.add(db_item)
             
     db.commit()
-    
-    # Restore tenant search path
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
 
     db_po = db.query(PurchaseOrder).filter(PurchaseOrder.id == order_id).first()
     return db_po
@@ -168,19 +159,18 @@ def delete_po(order_id: int, db: Session = Depends(get_db_with_tenant)):
 @router.post("/generate", response_model=List[POSuggestionItem])
 def generate_suggestions(req: POGenerateRequest, db: Session = Depends(get_db_with_tenant)):
     try:
-        from ..models import StockInventory, ProductSupplier
+        from ..models import ProductSupplier
         # Fetch products for the supplier with joinedload for efficiency
         # We search in both primary supplier_id and secondary product_suppliers table
         products = db.query(Product).options(joinedload(Product.manufacturer)).outerjoin(ProductSupplier).filter(
             (Product.supplier_id == req.supplier_id) | (ProductSupplier.supplier_id == req.supplier_id)
         ).distinct().all()
         suggestions = []
+        # Current stock of every product in one stock_on_hand lookup
+        stock_by_product = stock_totals(db, [p.id for p in products])
         
         for p in products:
-            current_stock = db.query(func.sum(StockInventory.quantity)).filter(
-                StockInventory.product_id == p.id,
-                StockInventory.is_available == True
-            ).scalar() or 0
+            current_stock = stock_by_product[p.id]
             
             pending_qty = db.query(func.sum(PurchaseOrderItem.quantity)).join(PurchaseOrder).filter(
                 PurchaseOrder.status == "Pending",
@@ -235,13 +225,22 @@ def generate_suggestions(req: POGenerateRequest, db: Session = Depends(get_db_wi
 # --- GRN Routes ---
 
 @router.post("/grn", response_model=GRNResponse)
-def create_grn(grn_in: GRNCreate, db: Session = Depends(get_db_with_tenant)):
+def create_grn(grn_in: GRNCreate, idempotency_key: Optional[str] = Header(None), db: Session = Depends(get_db_with_tenant)):
     from ..models import StockInventory
     from ..models.user_models import Store
+    from ..services.idempotency import claim_idempotency_key, remember_response, IdempotencyKeyReused
     
     try:
+        # A retried submission (same Idempotency-Key) must not receive the stock twice
+        try:
+            replay = claim_idempotency_key(db, "grn", idempotency_key, grn_in)
+        except IdempotencyKeyReused as key_err:
+            raise HTTPException(status_code=422, detail=str(key_err))
+        if replay is not None:
+            return replay.body
+        
         # 1. Create GRN Header
-        custom_grn_no = f"GRN-{datetime.now().strftime('%y%m%d%H%M%S')}"
+        custom_grn_no = next_document_number(db, "GRN")
         
         db_grn = GRN(
             custom_grn_no=custom_grn_no,
@@ -266,17 +265,11 @@ def create_grn(grn_in: GRNCreate, db: Session = Depends(get_db_with_tenant)):
         db.add(db_grn)
         db.flush()
         grn_id = db_grn.id
-        db.commit()
-        # db.refresh(db_grn) -- REMOVED per multi-tenant best practice
-        
-        # Restore tenant search path
-        tenant_schema = db.info.get('tenant_schema')
-        if tenant_schema:
-            db.execute(text(f"SET search_path TO {tenant_schema}, public"))
-
-        db_grn = db.query(GRN).filter(GRN.id == grn_id).first()
         
         calculated_sub_total = 0.0
+        # Stock BEFORE this GRN, advanced line by line so a product received on
+        # several lines averages against the quantity of its earlier lines
+        running_stock = stock_totals(db, [item.product_id for item in grn_in.items])
         
         # 2. Process Items
         for item in grn_in.items:
@@ -313,14 +306,9 @@ def create_grn(grn_in: GRNCreate, db: Session = Depends(get_db_with_tenant)):
                 db.add(stock_inv)
                 
                 # Update Product Average Cost (Weighted Average)
-                total_stock = db.query(func.sum(StockInventory.quantity)).filter(
-                    StockInventory.product_id == item.product_id,
-                    StockInventory.is_available == True
-                ).scalar() or 0
+                total_stock = running_stock[item.product_id]
                 old_avg = product.average_cost or 0
                 
-                # total_stock includes current batch update? 
-                # scalar() query hits DB. If we haven't committed batch update, `total_stock` is BEFORE update.
                 # So we have: Old Total Value = total_stock * old_avg
                 # New Value = item.total_cost (UnitCost * Qty)
                 # New Qty = total_stock + item.quantity
@@ -328,6 +316,7 @@ def create_grn(grn_in: GRNCreate, db: Session = Depends(get_db_with_tenant)):
                 current_value = total_stock * old_avg
                 new_value = item.total_cost
                 new_total_qty = total_stock + total_units_received
+                running_stock[item.product_id] = new_total_qty
                 
                 if new_total_qty > 0:
                     product.average_cost = (current_value + new_value) / new_total_qty
@@ -336,6 +325,8 @@ def create_grn(grn_in: GRNCreate, db: Session = Depends(get_db_with_tenant)):
                 if item.retail_price > (product.retail_price or 0):
                     product.retail_price = item.retail_price
 
+        refresh_stock_on_hand(db, (item.product_id for item in grn_in.items))
+        
         # 3. Update Financials
         db_grn.sub_total = calculated_sub_total
         db_grn.net_total = (calculated_sub_total + 
@@ -348,35 +339,21 @@ def create_grn(grn_in: GRNCreate, db: Session = Depends(get_db_with_tenant)):
             if po:
                 po.status = "Received"
         
+        # 5. Queue the purchase journal entry; committed together with the GRN
+        # and posted by the accounting outbox worker
+        from ..services.accounting_outbox import enqueue_posting
+        enqueue_posting(db, "purchase", grn_id)
+        db.flush()
+        
+        if idempotency_key:
+            db_grn = db.query(GRN).options(joinedload(GRN.items)).filter(GRN.id == grn_id).first()
+            remember_response(db, "grn", idempotency_key, db_grn, GRNResponse)
+        
         db.commit()
         # db.refresh(db_grn)
-        
-        # Restore search path before accounting call as previous commit might have affected connection state
-        tenant_schema = db.info.get('tenant_schema')
-        if tenant_schema:
-            db.execute(text(f"SET search_path TO {tenant_schema}, public"))
-
-        # 5. Create Accounting Entry
-        try:
-            from ..services.accounting_service import AccountingService
-            
-            # Create purchase journal entry
-            # Ensure db_grn is fresh for this call
-            db_grn = db.query(GRN).filter(GRN.id == grn_id).first()
-            AccountingService.record_purchase_transaction(db, db_grn, user_id=None)
-            
-            print(f"✓ Accounting entry created for GRN {custom_grn_no}")
-        except Exception as acc_err:
-            # Log but don't fail the GRN creation
-            print(f"⚠ Warning: Failed to create accounting entry: {acc_err}")
-            import traceback
-            traceback.print_exc()
 
         # 6. Final fetch with joinedload to ensure everything is loaded before returning
-        # This prevents lazy-loading issues during serialization especially in multi-tenant contexts
-        if tenant_schema:
-            db.execute(text(f"SET search_path TO {tenant_schema}, public"))
-
+        # This prevents lazy-loading issues during serialization
         db_grn = db.query(GRN).options(joinedload(GRN.items)).filter(GRN.id == grn_id).first()
         return db_grn
 
@@ -8,7 +8,7 @@ from datetime import datetime
 from ..models import (
     Product, LineItem, Category, SubCategory, ProductGroup, CategoryGroup,
     Generic, CalculateSeason, Manufacturer, Rack, Supplier, PurchaseConversionUnit, User,
-    ProductSupplier, ProductIngredient, ProductHistory,
+    ProductSupplier, ProductIngredient, ProductHistory, ProductCode, CatalogDeletion,
     PurchaseOrderItem, GRNItem, InvoiceItem, StockInventory, StockTransfer, StockAdjustment
 )
 from sqlalchemy.exc import IntegrityError
@@ -217,11 +217,6 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db_with_ten
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="A product with this name already exists.")
-    
-    # Restore tenant search path
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
 
     db_product = db.query(Product).filter(Product.id == db_product_id).first()
     return db_product
@@ -264,11 +259,6 @@ def update_product(product_id: int, product: ProductUpdate, db: Session = Depend
         raise HTTPException(status_code=400, detail="A product with this name already exists.")
     # db.refresh(db_product)
 
-    # Restore tenant search path
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
-
     db_product = db.query(Product).filter(Product.id == product_id).first()
     return db_product
 
@@ -301,10 +291,15 @@ def delete_product(product_id: int, db: Session = Depends(get_db_with_tenant), u
         db.query(ProductSupplier).filter(ProductSupplier.product_id == product_id).delete()
         db.query(ProductIngredient).filter(ProductIngredient.product_id == product_id).delete()
         db.query(ProductHistory).filter(ProductHistory.product_id == product_id).delete()
+        db.query(ProductCode).filter(ProductCode.product_id == product_id).delete()
         
-        # Delete the product itself
+        # Delete the product itself; the tombstone tells POS terminals syncing deltas to drop it
         db.delete(db_product)
+        db.add(CatalogDeletion(product_id=product_id))
+        from ..services.product_codes import invalidate_product_codes, mark_codes_changed
+        mark_codes_changed(db)
         db.commit()
+        invalidate_product_codes(db.info.get('tenant_schema'))
         return {
             "message": "Product and all associated metadata successfully hard deleted.",
             "type": "hard_delete"
@@ -5,7 +5,11 @@ from sqlalchemy import text, func
 
 from ..models import Role, Permission
 from ..schemas import RoleResponse, RoleCreate, RoleUpdate, PermissionResponse
-from ..auth import get_db_with_tenant, get_current_tenant_user
+from ..auth import get_db_with_tenant, get_current_tenant_user, require_permission
+from ..services.user_context import invalidate_tenant_user_contexts, revoke_user_tokens
+from ..services.permission_cache import invalidate_role_permissions
+
+MANAGE_ROLES = "Settings > User Management:manage_roles"
 
 router = APIRouter()
 
@@ -14,7 +18,7 @@ def list_roles(db: Session = Depends(get_db_with_tenant), user=Depends(get_curre
     return db.query(Role).all()
 
 @router.post("", response_model=RoleResponse)
-def create_role(role_in: RoleCreate, db: Session = Depends(get_db_with_tenant), user=Depends(get_current_tenant_user)):
+def create_role(role_in: RoleCreate, db: Session = Depends(get_db_with_tenant), user=Depends(require_permission(MANAGE_ROLES))):
     existing = db.query(Role).filter(func.lower(Role.name) == role_in.name.lower()).first()
     if existing:
         raise HTTPException(status_code=400, detail="Role with this name already exists")
@@ -29,10 +33,11 @@ def create_role(role_in: RoleCreate, db: Session = Depends(get_db_with_tenant),
     db.add(new_role)
     db.commit()
     db.refresh(new_role)
+    invalidate_role_permissions(db.info.get('tenant_schema'))
     return new_role
 
 @router.put("/{id}", response_model=RoleResponse)
-def update_role(id: int, role_in: RoleUpdate, db: Session = Depends(get_db_with_tenant), user=Depends(get_current_tenant_user)):
+def update_role(id: int, role_in: RoleUpdate, db: Session = Depends(get_db_with_tenant), user=Depends(require_permission(MANAGE_ROLES))):
     role = db.query(Role).filter(Role.id == id).first()
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
@@ -52,10 +57,13 @@ def update_role(id: int, role_in: RoleUpdate, db: Session = Depends(get_db_with_
         
     db.commit()
     db.refresh(role)
+    # Role membership/names are part of the cached user context
+    invalidate_tenant_user_contexts(db.info.get('tenant_schema'))
+    invalidate_role_permissions(db.info.get('tenant_schema'))
     return role
 
 @router.delete("/{id}")
-def delete_role(id: int, db: Session = Depends(get_db_with_tenant), user=Depends(get_current_tenant_user)):
+def delete_role(id: int, db: Session = Depends(get_db_with_tenant), user=Depends(require_permission(MANAGE_ROLES))):
     role = db.query(Role).filter(Role.id == id).first()
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
@@ -63,6 +71,11 @@ def delete_role(id: int, db: Session = Depends(get_db_with_tenant), user=Depends
     if role.name in ["Admin", "Manager"]:
         raise HTTPException(status_code=400, detail="Cannot delete system critical roles")
 
+    # Members lose the role: tokens issued with it stop validating
+    for member in role.users:
+        revoke_user_tokens(member)
     db.delete(role)
     db.commit()
+    invalidate_tenant_user_contexts(db.info.get('tenant_schema'))
+    invalidate_role_permissions(db.info.get('tenant_schema'))
     return {"message": "Role deleted successfully"}
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import text
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import List, Optional
+import os
 import traceback
 
 from ..models import (
-    Patient, Invoice, InvoiceItem, SalesReturn, 
+    Patient, Invoice, InvoiceItem, SalesReturn, DraftCart,
     StockInventory, Product, RegulatoryLog, User
 )
-from ..schemas import InvoiceCreate
+from ..schemas import InvoiceCreate, DraftCartSave, DraftCartResponse
 from ..auth import get_db_with_tenant, get_current_tenant_user
 
 router = APIRouter()
@@ -21,11 +23,6 @@ def process_return(invoice_id: int, amount: float, reason: str, db: Session = De
     ret_id = ret.id
     db.commit()
     # db.refresh(ret)
-    
-    # Restore tenant search path
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
 
     ret = db.query(SalesReturn).filter(SalesReturn.id == ret_id).first()
     return ret
@@ -38,4 +35,117 @@ def patient_history(patient_id: int, db: Session = Depends(get_db_with_tenant)):
 
 # Patients routes are at root level for compatibility
 
+# --- Draft Carts (held bills) ---
+# A held bill is only a saved cart: parking, recalling and editing it never
+# touch stock, invoice rows or the journal. Finalizing posts it as a normal invoice.
+# Expired drafts are invisible here and deleted by purge_draft_carts.py.
+
+DRAFT_CART_TTL_HOURS = int(os.getenv("DRAFT_CART_TTL_HOURS", 24))
+
+def _apply_draft(draft: DraftCart, draft_in: DraftCartSave, user: User):
+    draft.label = draft_in.label or draft_in.cart.customer_name
+    draft.cart = draft_in.cart.model_dump(mode="json")
+    draft.item_count = len(draft_in.cart.items)
+    draft.cash_register_session_id = draft_in.cart.cash_register_session_id
+    draft.store_id = user.store_id
+    draft.expires_at = datetime.utcnow() + timedelta(hours=DRAFT_CART_TTL_HOURS)
+
+def _live_drafts(db: Session, user: User):
+    """Unexpired held bills of the user's store"""
+    query = db.query(DraftCart).filter(DraftCart.expires_at > datetime.utcnow())
+    if user.store_id:
+        query = query.filter(DraftCart.store_id == user.store_id)
+    return query
+
+@router.get("/draft-carts", response_model=List[DraftCartResponse])
+def list_draft_carts(db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
+    """Held bills of the user's store"""
+    return _live_drafts(db, user).order_by(DraftCart.created_at.desc()).all()
+
+@router.post("/draft-carts", response_model=DraftCartResponse)
+def hold_draft_cart(draft_in: DraftCartSave, db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
+    """Park the current POS cart"""
+    draft = DraftCart(user_id=user.id)
+    _apply_draft(draft, draft_in, user)
+    db.add(draft)
+    db.flush()
+    draft_id = draft.id
+    db.commit()
+    
+    return db.query(DraftCart).filter(DraftCart.id == draft_id).first()
+
+@router.get("/draft-carts/{draft_id}", response_model=DraftCartResponse)
+def get_draft_cart(draft_id: int, db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
+    """Recall a held bill"""
+    draft = _live_drafts(db, user).filter(DraftCart.id == draft_id).first()
+    if not draft:
+        raise HTTPException(status_code=404, detail="Held bill not found")
+    return draft
+
+@router.put("/draft-carts/{draft_id}", response_model=DraftCartResponse)
+def update_draft_cart(draft_id: int, draft_in: DraftCartSave, db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
+    """Replace the cart of a held bill"""
+    draft = _live_drafts(db, user).filter(DraftCart.id == draft_id).first()
+    if not draft:
+        raise HTTPException(status_code=404, detail="Held bill not found")
+    _apply_draft(draft, draft_in, user)
+    db.commit()
+    
+    return db.query(DraftCart).filter(DraftCart.id == draft_id).first()
+
+@router.delete("/draft-carts/{draft_id}")
+def discard_draft_cart(draft_id: int, db: Session = Depends(get_db_with_tenant), user: User = Depends(get_current_tenant_user)):
+    """Discard a held bill (nothing to restore)"""
+    deleted = _live_drafts(db, user).filter(DraftCart.id == draft_id).delete(synchronize_session=False)
+    db.commit()
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Held bill not found")
+    return {"message": "Held bill discarded"}
 
+@router.post("/draft-carts/{draft_id}/finalize")
+def finalize_draft_cart(
+    draft_id: int,
+    cart: Optional[InvoiceCreate] = None,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db_with_tenant),
+    user: User = Depends(get_current_tenant_user)
+):
+    """
+    Post a held bill as an invoice (stock, regulatory log and accounting
+    happen here, once) and remove the draft in the same transaction.
+    `cart` optionally replaces the stored cart, e.g. with the final payment method.
+    """
+    from ..services.idempotency import claim_idempotency_key, remember_response, IdempotencyKeyReused
+    from ..services.invoice_posting import post_invoice, invoice_response
+    from ..services.stock_engine import InsufficientStockError
+    
+    try:
+        try:
+            replay = claim_idempotency_key(db, "draft-carts", idempotency_key, {"draft_id": draft_id, "cart": cart})
+        except IdempotencyKeyReused as key_err:
+            raise HTTPException(status_code=422, detail=str(key_err))
+        if replay is not None:
+            return replay.body
+        
+        # Locked so two terminals cannot finalize the same held bill
+        draft = _live_drafts(db, user).filter(DraftCart.id == draft_id).with_for_update().first()
+        if not draft:
+            raise HTTPException(status_code=404, detail="Held bill not found")
+        
+        inv_in = cart or InvoiceCreate.model_validate(draft.cart)
+        try:
+            new_inv = post_invoice(db, inv_in, user)
+        except InsufficientStockError as stock_err:
+            raise HTTPException(status_code=400, detail=str(stock_err))
+        
+        response = invoice_response(db, new_inv)
+        db.delete(draft)
+        remember_response(db, "draft-carts", idempotency_key, response)
+        db.commit()
+        print(f"✓ DONE: Held bill {draft_id} finalized as {response['invoice_number']}.")
+        return response
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        if isinstance(e, HTTPException): raise e
+        raise HTTPException(status_code=500, detail=str(e))
@@ -9,6 +9,7 @@ from ..database import get_db
 from ..models import SoftwarePayment, SuperAdmin, Tenant
 from ..schemas import SoftwarePaymentResponse, SoftwarePaymentUpdate
 from ..auth import get_current_superadmin, get_current_user_data as get_current_user
+from ..services.tenant_registry import invalidate_tenant
 
 router = APIRouter()
 
@@ -53,6 +54,7 @@ async def submit_payment(
     db.add(db_payment)
     db.commit()
     db.refresh(db_payment)
+    invalidate_tenant(tenant_id=tenant_id)
     return db_payment
 
 @router.put("/{payment_id}", response_model=SoftwarePaymentResponse)
@@ -99,6 +101,7 @@ async def update_my_payment(
 
     db.commit()
     db.refresh(db_payment)
+    invalidate_tenant(tenant_id=tenant.id)
     return db_payment
 
 @router.get("/my", response_model=List[SoftwarePaymentResponse])
@@ -145,4 +148,5 @@ def update_payment_status(
     
     db.commit()
     db.refresh(db_payment)
+    invalidate_tenant(tenant_id=db_payment.tenant_id)
     return db_payment
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_db, REPLICA_DATABASE_URLS, REPLICA_MAX_LAG_SECONDS, get_replica_lag
 from ..models import SuperAdmin, Tenant, SoftwarePayment
 from ..schemas.superadmin_schemas import SuperAdminResponse, SuperAdminUpdate
-from ..auth import get_current_superadmin, get_password_hash
+from ..auth import get_current_superadmin, get_password_hash, get_password_hashing_stats
 
 router = APIRouter()
 
@@ -29,6 +29,26 @@ def get_stats(
         "total_payments": total_payments
     }
 
+@router.get("/stats/password-hashing")
+def get_password_hashing_metrics(current_admin: SuperAdmin = Depends(get_current_superadmin)):
+    """Bcrypt pool utilisation for this worker (queue depth, rejections, cost)"""
+    return get_password_hashing_stats()
+
+@router.get("/stats/replicas")
+def get_replica_metrics(current_admin: SuperAdmin = Depends(get_current_superadmin)):
+    """Replay lag per configured replica and whether reports are currently routed to it"""
+    replicas = []
+    for shard_key in REPLICA_DATABASE_URLS:
+        lag = get_replica_lag(shard_key)
+        reachable = lag != float("inf")
+        replicas.append({
+            "shard_key": shard_key,
+            "reachable": reachable,
+            "lag_seconds": lag if reachable else None,
+            "in_use": lag <= REPLICA_MAX_LAG_SECONDS,
+        })
+    return {"max_lag_seconds": REPLICA_MAX_LAG_SECONDS, "replicas": replicas}
+
 @router.patch("/me", response_model=SuperAdminResponse)
 def update_me(
     update_data: SuperAdminUpdate,
@@ -1,47 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, func
 from typing import List, Optional
 from datetime import datetime, timedelta
 import traceback
 
-from ..database import engine, Base, get_db, SessionLocal
-from ..models import (
-    Tenant, User, Role, Product, SuperAdmin, Permission, 
-    StockInventory, Category, Manufacturer, Supplier, Store
-)
+from ..database import get_db, create_tenant_session, get_shard_keys, DEFAULT_SHARD
+from ..models import Tenant, SuperAdmin
 from ..schemas import TenantCreate, TenantResponse, TenantUpdate
 from ..auth import get_password_hash, get_current_superadmin
+from ..services.tenant_registry import invalidate_tenant
+from ..services.tenant_provisioning import RESERVED_SUBDOMAINS, clone_template_schema, provision_tenant_schema
+from ..services.tenant_migrations import stamp_tenant_head
 
 router = APIRouter()
 
+def _pick_least_loaded_shard(db: Session) -> str:
+    """Shard with the fewest tenants (ties go to the first configured shard)"""
+    counts = dict(
+        db.query(func.coalesce(Tenant.shard_key, DEFAULT_SHARD), func.count(Tenant.id))
+        .group_by(func.coalesce(Tenant.shard_key, DEFAULT_SHARD)).all()
+    )
+    return min(get_shard_keys(), key=lambda key: counts.get(key, 0))
+
 @router.post("/", response_model=TenantResponse)
 def create_tenant(tenant_in: TenantCreate, db: Session = Depends(get_db), admin: SuperAdmin = Depends(get_current_superadmin)):
     try:
         schema_name = f"tenant_{tenant_in.subdomain}"
         
         # 1. Primary Identity Checks
+        if tenant_in.subdomain.lower() in RESERVED_SUBDOMAINS:
+            raise HTTPException(status_code=400, detail="This subdomain is reserved")
         if db.query(Tenant).filter(Tenant.subdomain == tenant_in.subdomain).first():
             raise HTTPException(status_code=400, detail="Subdomain already exists")
         if db.query(Tenant).filter(Tenant.name == tenant_in.name).first():
             raise HTTPException(status_code=400, detail="Pharmacy name already exists")
 
-        # 2. Infrastructure Setup (Schema)
-        with engine.connect() as conn:
-            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema_name}"))
-            conn.commit()
-            
-            # Set path for creation
-            conn.execute(text(f"SET search_path TO {schema_name}"))
-            tenant_tables = [t for t in Base.metadata.sorted_tables if t.schema != "public"]
-            Base.metadata.create_all(bind=conn, tables=tenant_tables)
-            conn.commit()
+        # 2. Infrastructure Setup: clone the pre-seeded template schema on the least-loaded shard
+        shard_key = _pick_least_loaded_shard(db)
+        clone_template_schema(schema_name, shard_key)
+        # Built from the current models, so it is already at the latest tenant migration
+        stamp_tenant_head(schema_name, shard_key)
         
         # 3. Register Tenant in Global Registry
         db_tenant = Tenant(
             name=tenant_in.name, 
             subdomain=tenant_in.subdomain, 
             schema_name=schema_name, 
+            shard_key=shard_key,
             admin_username=tenant_in.admin_username, 
             admin_password=get_password_hash(tenant_in.admin_password),
             is_trial=tenant_in.is_trial,
@@ -52,183 +58,18 @@ def create_tenant(tenant_in: TenantCreate, db: Session = Depends(get_db), admin:
         db_tenant_id = db_tenant.id
         db.commit()
         # db.refresh(db_tenant) -- REMOVED per multi-tenant best practice
-        
-        # Restore tenant search path (although usually public for global tenant registry)
-        # But we were in public already. Let's be safe if we were in a specific context.
-        # Actually create_tenant runs as superadmin, usually public.
-        # But let's check db.info just in case.
-        tenant_schema = db.info.get('tenant_schema')
-        if tenant_schema:
-            db.execute(text(f"SET search_path TO {tenant_schema}, public"))
-        else:
-             # Default to public if not set (create_tenant usually starts in public)
-             db.execute(text("SET search_path TO public"))
-
         db_tenant = db.query(Tenant).filter(Tenant.id == db_tenant_id).first()
         
-        # 4. Seed Tenant Data
-        with SessionLocal() as sdb:
-            sdb.execute(text(f"SET search_path TO {schema_name}"))
-            
-            # 1. Base Data
-            cats = [Category(name=n) for n in ["Antibiotics", "Analgesics", "Antivirals", "Narcotics", "Supplements"]]
-            mans = [Manufacturer(name=n) for n in ["Pfizer", "GlaxoSmithKline", "Novartis", "Local Pharma"]]
-            sups = [Supplier(name="Main Distributions", address="Global Hub", gst_number="GST-99901")]
-            # Seed default store
-            main_store = Store(name="Main Branch", address="Primary Hub", is_warehouse=False)
-            sdb.add_all(cats + mans + sups + [main_store]); sdb.flush()
-
-            # 2. Roles & Perms
-            # Comprehensive Permission List
-            PERMISSION_STRUCTURE = {
-                "Inventory > Products": ["list", "view", "add", "edit", "delete", "print_labels"],
-                "Inventory > Stock": ["list", "view", "adjust", "transfer", "view_history"],
-                "Inventory > Setup": ["list", "add", "edit", "delete"],
-                
-                "Sales > POS": ["access", "process_sale", "apply_discount", "void_item", "return_item"],
-                "Sales > Invoices": ["list", "view", "print", "cancel"],
-                "Sales > Customers": ["list", "view", "add", "edit", "delete", "view_history"],
-
-                "Procurement > Suppliers": ["list", "view", "add", "edit", "delete"],
-                "Procurement > Purchase Orders": ["list", "create", "edit", "approve", "delete", "print"],
-                "Procurement > GRN": ["list", "create", "view", "print"],
-
-                "Accounting > Chart of Accounts": ["list", "view", "add", "edit"],
-                "Accounting > Journal Entries": ["list", "create", "view", "print"],
-                "Accounting > Reports": ["view_daily", "view_financial", "view_inventory", "export"],
-                "Accounting > Payments": ["list", "create", "view", "approve"],
-
-                "Settings > General": ["view", "update"],
-                "Settings > User Management": ["list", "invite", "edit", "delete", "manage_roles"],
-                "Settings > Stores": ["list", "add", "edit", "delete"]
-            }
-
-            all_perms = []
-            for module, actions in PERMISSION_STRUCTURE.items():
-                for action in actions:
-                    perm_name = f"{module}:{action}"
-                    p = Permission(name=perm_name, module=module, action=action, description=f"Can {action.replace('_', ' ')} in {module}")
-                    all_perms.append(p)
-            
-            sdb.add_all(all_perms); sdb.flush()
-            
-            # Create Default Roles
-            admin_role = Role(name="Admin", description="Full Access", permissions=all_perms)
-            
-            # Cashier Role - Sales Focused
-            cashier_perms = [p for p in all_perms if "Sales > POS" in p.module or "Sales > Invoices" in p.module]
-            cashier_role = Role(name="Cashier", description="Sales & POS Access", permissions=cashier_perms)
-            
-            # Stock Manager - Inventory Focused
-            stock_perms = [p for p in all_perms if "Inventory" in p.module or "Procurement" in p.module]
-            stock_role = Role(name="Stock Manager", description="Inventory & Procurement", permissions=stock_perms)
-
-            sdb.add_all([admin_role, cashier_role, stock_role]); sdb.flush()
-
-            # 3. Admin User
-            admin_user = User(username=tenant_in.admin_username, email=f"{tenant_in.admin_username}@{tenant_in.subdomain}.com", 
-                              hashed_password=db_tenant.admin_password, roles=[admin_role], store_id=main_store.id)
-            sdb.add(admin_user)
-            
-            # 4. Generics
-            from ..models import Generic
-            paracetamol = Generic(name="Paracetamol")
-            sdb.add(paracetamol)
-            sdb.flush()
-
-            # 5. Sample Product
-            sample_product = Product(
-                product_name="Panadol CF",
-                category_id=cats[1].id, 
-                manufacturer_id=mans[2].id,
-                generics_id=paracetamol.id,
-                supplier_id=sups[0].id,
-                retail_price=10.0,
-                average_cost=5.0
+        # 4. Tenant-specific data (admin user + default store); everything else came from the template
+        with create_tenant_session(schema_name, shard_key) as sdb:
+            provision_tenant_schema(
+                sdb,
+                admin_username=tenant_in.admin_username,
+                admin_email=f"{tenant_in.admin_username}@{tenant_in.subdomain}.com",
+                admin_password_hash=db_tenant.admin_password
             )
-            sdb.add(sample_product); sdb.flush()
-            sdb.add(StockInventory(
-                product_id=sample_product.id, store_id=main_store.id, batch_number="BN-101", 
-                expiry_date=datetime.now()+timedelta(days=365),
-                unit_cost=5.0, selling_price=9.5, 
-                quantity=200, grn_id=None
-            ))
-            
-            # 6. Seed Chart of Accounts
-            from ..models.accounting_models import Account, AccountType
-            
-            default_accounts = [
-                # ROOTS
-                {"code": "1", "name": "Assets", "type": AccountType.ASSET, "parent": None},
-                {"code": "2", "name": "Liabilities", "type": AccountType.LIABILITY, "parent": None},
-                {"code": "3", "name": "Equity", "type": AccountType.EQUITY, "parent": None},
-                {"code": "4", "name": "Revenue", "type": AccountType.REVENUE, "parent": None},
-                {"code": "5", "name": "Expenses", "type": AccountType.EXPENSE, "parent": None},
-
-                # ASSETS (Children of 1)
-                {"code": "1000", "name": "Cash", "type": AccountType.ASSET, "parent": "1"},
-                {"code": "1100", "name": "Bank Account", "type": AccountType.ASSET, "parent": "1"},
-                {"code": "1200", "name": "Accounts Receivable", "type": AccountType.ASSET, "parent": "1"},
-                {"code": "1300", "name": "Inventory", "type": AccountType.ASSET, "parent": "1"},
-                {"code": "1400", "name": "Prepaid Expenses", "type": AccountType.ASSET, "parent": "1"},
-                {"code": "1450", "name": "Advance Tax Receivable", "type": AccountType.ASSET, "parent": "1"},
-                {"code": "1500", "name": "Fixed Assets", "type": AccountType.ASSET, "parent": "1"},
-                {"code": "1510", "name": "Furniture & Fixtures", "type": AccountType.ASSET, "parent": "1500"},
-                {"code": "1520", "name": "Equipment", "type": AccountType.ASSET, "parent": "1500"},
-                
-                # LIABILITIES (Children of 2)
-                {"code": "2000", "name": "Accounts Payable", "type": AccountType.LIABILITY, "parent": "2"},
-                {"code": "2100", "name": "Salaries Payable", "type": AccountType.LIABILITY, "parent": "2"},
-                {"code": "2200", "name": "Tax Payable", "type": AccountType.LIABILITY, "parent": "2"},
-                {"code": "2300", "name": "Short-term Loans", "type": AccountType.LIABILITY, "parent": "2"},
-                
-                # EQUITY (Children of 3)
-                {"code": "3000", "name": "Owner's Capital", "type": AccountType.EQUITY, "parent": "3"},
-                {"code": "3100", "name": "Retained Earnings", "type": AccountType.EQUITY, "parent": "3"},
-                {"code": "3200", "name": "Drawings", "type": AccountType.EQUITY, "parent": "3"},
-                
-                # REVENUE (Children of 4)
-                {"code": "4000", "name": "Sales Revenue", "type": AccountType.REVENUE, "parent": "4"},
-                {"code": "4100", "name": "Other Income", "type": AccountType.REVENUE, "parent": "4"},
-                
-                # EXPENSES (Children of 5)
-                {"code": "5000", "name": "Cost of Goods Sold", "type": AccountType.EXPENSE, "parent": "5"},
-                {"code": "5100", "name": "Salaries Expense", "type": AccountType.EXPENSE, "parent": "5"},
-                {"code": "5200", "name": "Rent Expense", "type": AccountType.EXPENSE, "parent": "5"},
-                {"code": "5300", "name": "Utilities Expense", "type": AccountType.EXPENSE, "parent": "5"},
-                {"code": "5400", "name": "Discount Given", "type": AccountType.EXPENSE, "parent": "5"},
-                {"code": "5500", "name": "Other Expenses", "type": AccountType.EXPENSE, "parent": "5"},
-                {"code": "5600", "name": "Depreciation Expense", "type": AccountType.EXPENSE, "parent": "5"},
-            ]
-            
-            # Create account code to ID mapping for parent relationships
-            account_map = {}
-            
-            # First pass: Create all accounts without parent relationships
-            for acc_data in default_accounts:
-                account = Account(
-                    account_code=acc_data["code"],
-                    account_name=acc_data["name"],
-                    account_type=acc_data["type"],
-                    is_active=True,
-                    opening_balance=0.0,
-                    current_balance=0.0,
-                    description=f"Default {acc_data['type'].value} account"
-                )
-                sdb.add(account)
-                sdb.flush()  # Get the ID
-                account_map[acc_data["code"]] = account.id
-            
-            # Second pass: Update parent relationships
-            for acc_data in default_accounts:
-                if acc_data["parent"]:
-                    account = sdb.query(Account).filter(
-                        Account.account_code == acc_data["code"]
-                    ).first()
-                    if account:
-                        account.parent_account_id = account_map.get(acc_data["parent"])
-            
             sdb.commit()
+        invalidate_tenant(subdomain=tenant_in.subdomain)
         return db_tenant
     except Exception as e:
         traceback.print_exc()
@@ -237,12 +78,10 @@ def create_tenant(tenant_in: TenantCreate, db: Session = Depends(get_db), admin:
 
 @router.get("/", response_model=List[TenantResponse])
 def list_tenants(db: Session = Depends(get_db), admin: SuperAdmin = Depends(get_current_superadmin)):
-    db.execute(text("SET search_path TO public"))
     return db.query(Tenant).all()
 
 @router.patch("/{tenant_id}", response_model=TenantResponse)
 def update_tenant(tenant_id: int, tenant_in: TenantUpdate, db: Session = Depends(get_db), admin: SuperAdmin = Depends(get_current_superadmin)):
-    db.execute(text("SET search_path TO public"))
     db_tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
     if not db_tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
@@ -258,17 +97,19 @@ def update_tenant(tenant_id: int, tenant_in: TenantUpdate, db: Session = Depends
     
     db.commit()
     db.refresh(db_tenant)
+    invalidate_tenant(subdomain=db_tenant.subdomain, tenant_id=db_tenant.id)
     return db_tenant
 
 @router.delete("/{tenant_id}")
 def delete_tenant(tenant_id: int, db: Session = Depends(get_db), admin: SuperAdmin = Depends(get_current_superadmin)):
-    db.execute(text("SET search_path TO public"))
     db_tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
     if not db_tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
     # Optional: Drop schema? (Usually safer to just deactivate OR have a separate "purge" step)
     # For now, let's keep the user's requested "remove" logic which was in the frontend but missing in backend
+    subdomain = db_tenant.subdomain
     db.delete(db_tenant)
     db.commit()
+    invalidate_tenant(subdomain=subdomain, tenant_id=tenant_id)
     return {"detail": "Tenant deleted"}
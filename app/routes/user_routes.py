@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from ..models import User, Role
 from ..schemas import UserCreate, UserUpdate, UserResponse, RoleResponse
-from ..auth import get_db_with_tenant, get_current_tenant_user, get_password_hash
+from ..auth import get_db_with_tenant, get_current_tenant_user, get_password_hash, require_permission
+from ..services.user_context import invalidate_user_context, revoke_user_tokens
 
 router = APIRouter()
 
@@ -14,7 +15,7 @@ def list_users(db: Session = Depends(get_db_with_tenant), user: User = Depends(g
     return db.query(User).all()
 
 @router.post("", response_model=UserResponse)
-def create_user(user_in: UserCreate, db: Session = Depends(get_db_with_tenant), current_user: User = Depends(get_current_tenant_user)):
+def create_user(user_in: UserCreate, db: Session = Depends(get_db_with_tenant), current_user: User = Depends(require_permission("Settings > User Management:invite"))):
     roles = db.query(Role).filter(Role.name.in_(user_in.role_names)).all()
     new_u = User(username=user_in.username, email=user_in.email, hashed_password=get_password_hash(user_in.password), roles=roles)
     db.add(new_u)
@@ -22,12 +23,34 @@ def create_user(user_in: UserCreate, db: Session = Depends(get_db_with_tenant),
     new_u_id = new_u.id
     db.commit()
     # db.refresh(new_u) -- REMOVED per multi-tenant best practice
-    
-    # Restore tenant search path
-    tenant_schema = db.info.get('tenant_schema')
-    if tenant_schema:
-        db.execute(text(f"SET search_path TO {tenant_schema}, public"))
+    invalidate_user_context(db.info.get('tenant_schema'), new_u_id)
 
     new_u = db.query(User).filter(User.id == new_u_id).first()
     return new_u
 
+@router.put("/{user_id}", response_model=UserResponse)
+def update_user(user_id: int, user_in: UserUpdate, db: Session = Depends(get_db_with_tenant), current_user: User = Depends(require_permission("Settings > User Management:edit"))):
+    db_user = db.query(User).filter(User.id == user_id).first()
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Password, role and active-flag changes revoke the user's issued tokens
+    revoke = False
+    if user_in.email is not None:
+        db_user.email = user_in.email
+    if user_in.password:
+        db_user.hashed_password = get_password_hash(user_in.password)
+        revoke = True
+    if user_in.role_names is not None:
+        db_user.roles = db.query(Role).filter(Role.name.in_(user_in.role_names)).all()
+        revoke = True
+    if user_in.is_active is not None and user_in.is_active != db_user.is_active:
+        db_user.is_active = user_in.is_active
+        revoke = True
+    if revoke:
+        revoke_user_tokens(db_user)
+
+    db.commit()
+    invalidate_user_context(db.info.get('tenant_schema'), user_id)
+
+    return db.query(User).filter(User.id == user_id).first()
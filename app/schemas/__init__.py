@@ -7,7 +7,9 @@ from .user_schemas import (
 )
 from .pharmacy_schemas import (
     BatchBase, IngredientBase, ProductSupplierBase, 
-    MedicineCreate, POSItem, InvoiceCreate
+    MedicineCreate, POSItem, InvoiceCreate,
+    InvoiceSyncEntry, InvoiceSyncBatch, DraftCartSave, DraftCartResponse,
+    ProductCodeCreate, ProductCodeResponse
 )
 from .procurement_schemas import (
     PurchaseOrderCreate, PurchaseOrderUpdate, PurchaseOrderResponse,
@@ -37,6 +39,12 @@ __all__ = [
     "MedicineCreate",
     "POSItem",
     "InvoiceCreate",
+    "InvoiceSyncEntry",
+    "InvoiceSyncBatch",
+    "DraftCartSave",
+    "DraftCartResponse",
+    "ProductCodeCreate",
+    "ProductCodeResponse",
     "PurchaseOrderCreate",
     "PurchaseOrderUpdate",
     "PurchaseOrderResponse",
@@ -364,3 +364,19 @@ class AgingReport(BaseModel):
     report_type: str # AP or AR
     items: List[AgingBucket]
     total_amount: Decimal
+
+class AccountingOutboxResponse(BaseModel):
+    id: int
+    event_type: str
+    aggregate_id: int
+    user_id: Optional[int] = None
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    available_at: datetime
+    journal_entry_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    processed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -68,3 +68,47 @@ class InvoiceCreate(BaseModel):
     cash_register_session_id: Optional[int] = None
     remarks: Optional[str] = None
     status: str = "Paid"
+
+class InvoiceSyncEntry(BaseModel):
+    client_ref: Optional[str] = None # Terminal's local id for the sale, echoed back in the result
+    idempotency_key: Optional[str] = None # Same key space as the Idempotency-Key header of POST /invoices
+    invoice: InvoiceCreate
+
+class InvoiceSyncBatch(BaseModel):
+    invoices: List[InvoiceSyncEntry]
+    chunk_size: int = 50 # Invoices validated per locking stock read (each is committed on its own)
+
+class DraftCartSave(BaseModel):
+    label: Optional[str] = None
+    cart: InvoiceCreate
+
+class DraftCartResponse(BaseModel):
+    id: int
+    label: Optional[str] = None
+    user_id: Optional[int] = None
+    store_id: Optional[int] = None
+    cash_register_session_id: Optional[int] = None
+    cart: InvoiceCreate
+    item_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
+class ProductCodeCreate(BaseModel):
+    code: str
+    code_type: str = "barcode" # barcode, sku, alternate
+    unit_id: Optional[int] = None # Pack-level code (PurchaseConversionUnit)
+    pack_quantity: Optional[int] = None # Base units per scan; defaults to the product's purchase_conv_factor for pack codes
+
+class ProductCodeResponse(BaseModel):
+    id: int
+    product_id: int
+    code: str
+    code_type: Optional[str] = None
+    unit_id: Optional[int] = None
+    pack_quantity: Optional[int] = None
+    created_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
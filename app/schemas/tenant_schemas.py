@@ -21,6 +21,7 @@ class TenantResponse(BaseModel):
     name: str
     subdomain: str
     schema_name: str
+    shard_key: Optional[str] = None
     is_active: bool
     is_trial: bool
     trial_end_date: Optional[datetime]
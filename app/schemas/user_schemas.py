@@ -35,6 +35,7 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     password: Optional[str] = None
     role_names: Optional[List[str]] = None
+    is_active: Optional[bool] = None
 
 class UserResponse(BaseModel):
     id: int
@@ -0,0 +1,59 @@
+"""
+Account Balances
+Journal postings append signed deltas to account_balance_deltas instead of
+updating accounts.current_balance, so concurrent checkouts never queue on the
+Cash / Revenue / COGS / Inventory rows. Pending deltas are folded into
+current_balance in one statement when accounts are read, and periodically by
+fold_account_balances.py.
+"""
+
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from ..models import Account, AccountBalanceDelta
+from ..models.accounting_models import AccountType
+
+
+def signed_amount(account: Account, debit_amount, credit_amount) -> Decimal:
+    """Balance change of a line in the account's normal direction"""
+    debit_amount = Decimal(str(debit_amount or 0))
+    credit_amount = Decimal(str(credit_amount or 0))
+    if account.account_type in [AccountType.ASSET, AccountType.EXPENSE]:
+        # Debit increases, Credit decreases
+        return debit_amount - credit_amount
+    # Credit increases, Debit decreases
+    return credit_amount - debit_amount
+
+
+def record_balance_delta(db: Session, account: Account, debit_amount, credit_amount, journal_entry_id: Optional[int] = None):
+    """Queue a line's effect on the account balance (an INSERT; the account row is not locked)"""
+    amount = signed_amount(account, debit_amount, credit_amount)
+    if amount:
+        db.add(AccountBalanceDelta(account_id=account.id, journal_entry_id=journal_entry_id, amount=amount))
+
+
+def fold_balance_deltas(db: Session) -> int:
+    """
+    Move all pending deltas into accounts.current_balance in one statement
+    (DELETE ... RETURNING feeding an UPDATE). Returns the number of accounts
+    updated; the caller commits.
+    """
+    deltas = AccountBalanceDelta.__table__
+    accounts = Account.__table__
+
+    moved = delete(deltas).returning(deltas.c.account_id, deltas.c.amount).cte("moved")
+    totals = select(
+        moved.c.account_id, func.sum(moved.c.amount).label("total")
+    ).group_by(moved.c.account_id).subquery("totals")
+    result = db.execute(
+        update(accounts)
+        .where(accounts.c.id == totals.c.account_id)
+        .values(current_balance=func.coalesce(accounts.c.current_balance, 0) + totals.c.total)
+        .add_cte(moved)
+    )
+    # ORM copies of the accounts in this session are now stale
+    db.expire_all()
+    return result.rowcount
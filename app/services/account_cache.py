@@ -0,0 +1,91 @@
+"""
+Chart of Accounts Cache
+Per-tenant snapshot of the accounts table (code -> account, id -> account)
+so postings and reports resolve accounts without a query per lookup.
+Balances are not cached; read Account rows for current_balance.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import Account
+from ..utils.ttl_cache import TTLCache
+
+ACCOUNT_CACHE_TTL_SECONDS = int(os.getenv("ACCOUNT_CACHE_TTL_SECONDS", 300))
+# A lookup miss reloads the chart at most once per interval per tenant, so
+# tenants without optional accounts (e.g. 1450, 5400) do not reload it on every posting
+ACCOUNT_MISS_RELOAD_SECONDS = int(os.getenv("ACCOUNT_MISS_RELOAD_SECONDS", 30))
+
+
+class AccountInfo:
+    """Detached, read-only view of an Account (everything except balances that change per posting)"""
+
+    __slots__ = ("id", "account_code", "account_name", "account_type", "parent_account_id", "is_active", "opening_balance")
+
+    def __init__(self, account: Account):
+        self.id = account.id
+        self.account_code = account.account_code
+        self.account_name = account.account_name
+        self.account_type = account.account_type
+        self.parent_account_id = account.parent_account_id
+        self.is_active = account.is_active
+        self.opening_balance = account.opening_balance
+
+
+class ChartOfAccounts:
+    def __init__(self, accounts: List[AccountInfo]):
+        self.by_id: Dict[int, AccountInfo] = {a.id: a for a in accounts}
+        self.by_code: Dict[str, AccountInfo] = {a.account_code: a for a in accounts}
+
+    def get(self, account_id: int) -> Optional[AccountInfo]:
+        return self.by_id.get(account_id)
+
+    def get_by_code(self, account_code: str) -> Optional[AccountInfo]:
+        return self.by_code.get(account_code)
+
+    def active_accounts(self, account_type=None) -> List[AccountInfo]:
+        """Active accounts (optionally of one type) ordered by account code"""
+        return sorted(
+            (a for a in self.by_id.values() if a.is_active and (account_type is None or a.account_type == account_type)),
+            key=lambda a: a.account_code
+        )
+
+
+_chart_cache = TTLCache(ACCOUNT_CACHE_TTL_SECONDS)
+# Tenants whose chart was reloaded because of a miss within the last interval
+_miss_reloads = TTLCache(ACCOUNT_MISS_RELOAD_SECONDS)
+
+
+def _load_chart(db: Session) -> ChartOfAccounts:
+    return ChartOfAccounts([AccountInfo(a) for a in db.query(Account).all()])
+
+
+def get_chart_of_accounts(db: Session) -> ChartOfAccounts:
+    """Return the cached chart of accounts for the session's tenant"""
+    return _chart_cache.get_or_load(db.info.get('tenant_schema'), lambda: _load_chart(db))
+
+
+def _lookup(db: Session, find):
+    account = find(get_chart_of_accounts(db))
+    tenant_key = db.info.get('tenant_schema')
+    if account is None and _miss_reloads.get(tenant_key) is None:
+        # May have been created through another worker since the snapshot was taken
+        _chart_cache.pop(tenant_key)
+        _miss_reloads.set(tenant_key, True)
+        account = find(get_chart_of_accounts(db))
+    return account
+
+
+def get_account_info(db: Session, account_id: int) -> Optional[AccountInfo]:
+    return _lookup(db, lambda chart: chart.get(account_id))
+
+
+def get_account_info_by_code(db: Session, account_code: str) -> Optional[AccountInfo]:
+    return _lookup(db, lambda chart: chart.get_by_code(account_code))
+
+
+def invalidate_chart_of_accounts(tenant_key: Optional[str]):
+    _chart_cache.pop(tenant_key)
+    _miss_reloads.pop(tenant_key)
@@ -0,0 +1,125 @@
+"""
+Accounting Outbox
+Business documents (invoices, GRNs, stock adjustments) enqueue their journal
+posting in the same transaction that saves them; a worker
+(run_accounting_outbox.py) posts the entries afterwards. Each event is posted
+and marked done in one transaction, failures are retried with exponential
+backoff, and events that keep failing are parked as "dead" for review.
+"""
+
+import os
+import traceback
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..models import AccountingOutbox, Invoice, GRN, StockAdjustment
+from .accounting_service import AccountingService
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_RETRY_BASE_SECONDS = int(os.getenv("OUTBOX_RETRY_BASE_SECONDS", 30))
+# A posting that waits longer than this for a lock (e.g. the write fence of a
+# shard move) gives up and is picked up again on the next pass, by then
+# routed to the tenant's current shard
+OUTBOX_LOCK_TIMEOUT_MS = int(os.getenv("OUTBOX_LOCK_TIMEOUT_MS", 5000))
+
+
+def enqueue_posting(db: Session, event_type: str, aggregate_id: int, user_id: Optional[int] = None) -> AccountingOutbox:
+    """Queue a journal posting; committed (or rolled back) together with the caller's document"""
+    if event_type not in POSTING_HANDLERS:
+        raise ValueError(f"Unknown accounting event '{event_type}'")
+    event = AccountingOutbox(event_type=event_type, aggregate_id=aggregate_id, user_id=user_id, status="pending", attempts=0)
+    db.add(event)
+    return event
+
+
+def _post_sale(db: Session, event: AccountingOutbox):
+    invoice = db.query(Invoice).get(event.aggregate_id)
+    if not invoice:
+        raise ValueError(f"Invoice {event.aggregate_id} not found")
+    return AccountingService.record_sale_transaction(db, invoice, event.user_id)
+
+
+def _post_purchase(db: Session, event: AccountingOutbox):
+    grn = db.query(GRN).get(event.aggregate_id)
+    if not grn:
+        raise ValueError(f"GRN {event.aggregate_id} not found")
+    return AccountingService.record_purchase_transaction(db, grn, user_id=event.user_id)
+
+
+def _post_inventory_adjustment(db: Session, event: AccountingOutbox):
+    adjustment = db.query(StockAdjustment).get(event.aggregate_id)
+    if not adjustment:
+        raise ValueError(f"Stock adjustment {event.aggregate_id} not found")
+    return AccountingService.record_inventory_adjustment_accounting(db, adjustment, event.user_id)
+
+
+POSTING_HANDLERS = {
+    "sale": _post_sale,
+    "purchase": _post_purchase,
+    "inventory_adjustment": _post_inventory_adjustment,
+}
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), 3600))
+
+
+def process_next_event(db: Session) -> Optional[AccountingOutbox]:
+    """
+    Claim and post one due event. Returns the event (done, pending retry or
+    dead), or None when nothing is due. Safe to run from several workers:
+    claimed rows are skipped by the others.
+    """
+    with AccountingService.unit_of_work(db):
+        db.execute(text(f"SET LOCAL lock_timeout = {OUTBOX_LOCK_TIMEOUT_MS}"))
+        event = db.query(AccountingOutbox).filter(
+            AccountingOutbox.status == "pending",
+            AccountingOutbox.available_at <= datetime.utcnow()
+        ).order_by(AccountingOutbox.id).with_for_update(skip_locked=True).first()
+        if event is None:
+            return None
+
+        # The posting runs in a savepoint so a failure can still be recorded on the (locked) event row
+        savepoint = db.begin_nested()
+        try:
+            journal_entry = POSTING_HANDLERS[event.event_type](db, event)
+            savepoint.commit()
+        except Exception as e:
+            savepoint.rollback()
+            event.attempts += 1
+            event.last_error = f"{e}\n{traceback.format_exc()[-3000:]}"
+            if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+                event.status = "dead"
+                print(f"OUTBOX: {event.event_type} #{event.aggregate_id} moved to dead letters after {event.attempts} attempts: {e}")
+            else:
+                event.available_at = datetime.utcnow() + retry_delay(event.attempts)
+                print(f"OUTBOX: {event.event_type} #{event.aggregate_id} failed (attempt {event.attempts}), retrying: {e}")
+            return event
+
+        event.status = "done"
+        event.attempts += 1
+        event.last_error = None
+        event.journal_entry_id = journal_entry.id if journal_entry is not None else None
+        event.processed_at = datetime.utcnow()
+        return event
+
+
+def drain_outbox(db: Session, limit: int = 500) -> dict:
+    """Post up to `limit` due events for the session's tenant"""
+    counts = {"done": 0, "pending": 0, "dead": 0}
+    for _ in range(limit):
+        event = process_next_event(db)
+        if event is None:
+            break
+        counts[event.status] += 1
+    return counts
+
+
+def retry_dead_event(db: Session, event: AccountingOutbox):
+    """Send a dead-lettered event back to the queue (e.g. after fixing the chart of accounts)"""
+    event.status = "pending"
+    event.attempts = 0
+    event.available_at = datetime.utcnow()
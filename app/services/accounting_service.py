@@ -3,6 +3,7 @@ Accounting Service Layer
 Handles all accounting business logic and journal entry creation
 """
 
+from contextlib import contextmanager
 from sqlalchemy.orm import Session
 from sqlalchemy import text, and_, or_, func
 from datetime import date, datetime
@@ -15,6 +16,8 @@ from ..models.accounting_models import (
     PaymentMethod, PayeeType
 )
 from ..models import Invoice, GRN, Supplier, Patient
+from .account_balances import record_balance_delta
+from .account_cache import AccountInfo, get_account_info, get_account_info_by_code
 from ..schemas.accounting_schemas import (
     JournalEntryCreate, JournalEntryLineCreate
 )
@@ -22,9 +25,40 @@ from ..schemas.accounting_schemas import (
 class AccountingService:
     """Service class for accounting operations"""
     
+    @staticmethod
+    @contextmanager
+    def unit_of_work(db: Session):
+        """
+        Posting mode: service methods called inside the block only flush, and the
+        block commits once when it exits (or rolls everything back on error).
+        Nested blocks join the outermost one.
+        """
+        depth = db.info.get('accounting_uow', 0)
+        db.info['accounting_uow'] = depth + 1
+        try:
+            yield db
+            if depth == 0:
+                db.commit()
+        except Exception:
+            if depth == 0:
+                db.rollback()
+            raise
+        finally:
+            db.info['accounting_uow'] = depth
+    
+    @staticmethod
+    def _commit(db: Session):
+        """Commit, or just flush when running inside unit_of_work()"""
+        if db.info.get('accounting_uow'):
+            db.flush()
+        else:
+            db.commit()
+    
     @staticmethod
     def generate_entry_number(db: Session, transaction_type: TransactionType) -> str:
-        """Generate unique journal entry number"""
+        """Allocate the next journal entry number for the transaction type (JE-SALE-2026-00001, ...)"""
+        from .numbering import next_document_number
+
         prefix_map = {
             TransactionType.SALE: "JE-SALE",
             TransactionType.PURCHASE: "JE-PUR",
@@ -34,21 +68,7 @@ class AccountingService:
             TransactionType.OPENING: "JE-OPEN",
         }
         
-        prefix = prefix_map.get(transaction_type, "JE")
-        year = datetime.now().year
-        
-        # Get last entry number for this type and year
-        last_entry = db.query(JournalEntry).filter(
-            JournalEntry.entry_number.like(f"{prefix}-{year}-%")
-        ).order_by(JournalEntry.id.desc()).first()
-        
-        if last_entry:
-            last_num = int(last_entry.entry_number.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        
-        return f"{prefix}-{year}-{new_num:05d}"
+        return next_document_number(db, prefix_map.get(transaction_type, "JE"))
     
     @staticmethod
     def create_journal_entry(
@@ -95,15 +115,14 @@ class AccountingService:
             )
             db.add(line)
             
-            # Update account balance
-            account = db.query(Account).get(line_data.account_id)
+            # Queue the balance change; the account row itself is not updated here
+            account = get_account_info(db, line_data.account_id)
             if account:
-                if account.account_type in [AccountType.ASSET, AccountType.EXPENSE]:
-                    # Debit increases, Credit decreases
-                    account.current_balance += (line_data.debit_amount - line_data.credit_amount)
-                else:
-                    # Credit increases, Debit decreases
-                    account.current_balance += (line_data.credit_amount - line_data.debit_amount)
+                record_balance_delta(db, account, line_data.debit_amount, line_data.credit_amount, journal_entry.id)
+        
+        if db.info.get('accounting_uow'):
+            db.flush()
+            return journal_entry
         
         try:
             db.commit()
@@ -116,9 +135,9 @@ class AccountingService:
         return journal_entry
     
     @staticmethod
-    def get_account_by_code(db: Session, account_code: str) -> Optional[Account]:
-        """Get account by code"""
-        return db.query(Account).filter(Account.account_code == account_code).first()
+    def get_account_by_code(db: Session, account_code: str) -> Optional[AccountInfo]:
+        """Get account by code (from the tenant's cached chart of accounts)"""
+        return get_account_info_by_code(db, account_code)
     
     @staticmethod
     def record_sale_transaction(
@@ -338,7 +357,7 @@ class AccountingService:
             )
             db.add(customer_ledger)
 
-        db.commit()
+        AccountingService._commit(db)
         return sale_entry
     
     @staticmethod
@@ -518,7 +537,7 @@ class AccountingService:
                 created_by=user_id
             )
             db.add(payment_voucher)
-            db.commit()
+            AccountingService._commit(db)
             
         return purchase_entry
 
@@ -661,14 +680,14 @@ class AccountingService:
 
         # 7. Link to Sales Return
         sales_return.journal_entry_id = journal_entry.id
-        db.commit()
+        AccountingService._commit(db)
         
         return journal_entry
 
     @staticmethod
     def get_account_balance(db: Session, account_id: int, as_of_date: date) -> Decimal:
         """Calculate account balance as of a specific date"""
-        account = db.query(Account).get(account_id)
+        account = get_account_info(db, account_id)
         if not account:
             return Decimal('0.00')
         
@@ -793,6 +812,6 @@ class AccountingService:
         
         # 3. Link Journal to Adjustment
         adjustment.journal_entry_id = journal_entry.id
-        db.commit()
+        AccountingService._commit(db)
         
         return journal_entry
@@ -0,0 +1,163 @@
+"""
+Batch Allocation
+Picks the batches a POS line is sold from according to the tenant's
+AppSettings.sale_module (FEFO: earliest expiry first; FIFO / Avg Cost /
+Default: oldest batch first) and splits a line across batches when one batch
+is not enough, so terminals can send lines without a batch_id.
+
+Sellable batches of a product are kept in allocation order by the partial
+indexes ix_stock_inventory_fifo / ix_stock_inventory_fefo, and a whole cart is
+allocated with one statement: a window sum gives the running total of each
+product's batches in that order, and only the batches needed to reach the
+requested quantity are returned. The window still reads every sellable batch
+of the requested products, so the cost grows with their batch count, not
+with the quantity.
+Allocation does not lock; reserve_cart_stock locks and re-checks the batches.
+"""
+
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import Float, Integer, column, func, or_, select, values
+from sqlalchemy.orm import Session
+
+from ..models import AppSettings, StockInventory
+from ..utils.ttl_cache import TTLCache
+from .stock_engine import InsufficientStockError
+
+SETTINGS_CACHE_TTL_SECONDS = int(os.getenv("SETTINGS_CACHE_TTL_SECONDS", 300))
+
+_sale_module_cache = TTLCache(SETTINGS_CACHE_TTL_SECONDS)
+
+
+class BatchAllocation:
+    __slots__ = ("product_id", "batch_id", "quantity", "batch_number", "expiry_date", "retail_price", "selling_price", "tax_percent")
+
+    def __init__(self, row, quantity: float):
+        self.product_id = row.product_id
+        self.batch_id = row.inventory_id
+        self.quantity = quantity
+        self.batch_number = row.batch_number
+        self.expiry_date = row.expiry_date
+        self.retail_price = row.retail_price
+        self.selling_price = row.selling_price
+        self.tax_percent = row.tax_percent
+
+
+def get_sale_module(db: Session) -> str:
+    """The tenant's sale module (cached; invalidated when app settings are saved)"""
+    def load():
+        settings = db.query(AppSettings.sale_module).first()
+        return (settings.sale_module if settings else None) or "Default"
+    return _sale_module_cache.get_or_load(db.info.get('tenant_schema'), load)
+
+
+def invalidate_sale_module(tenant_key: Optional[str]):
+    _sale_module_cache.pop(tenant_key)
+
+
+def batch_order(sale_module: str) -> list:
+    """ORDER BY for a product's batches (matches the allocation indexes)"""
+    if sale_module == "FEFO":
+        return [StockInventory.expiry_date.asc().nulls_last(), StockInventory.inventory_id]
+    # FIFO and Avg Cost
+    return [StockInventory.inventory_id]
+
+
+def allocate_batches(db: Session, requested: Dict[int, float], sale_module: Optional[str] = None) -> Dict[int, List[BatchAllocation]]:
+    """
+    Allocate `requested` {product_id: quantity} across batches.
+    Returns {product_id: [BatchAllocation, ...]} in sale order; raises
+    InsufficientStockError listing every product that cannot be covered.
+    Expired batches are never allocated automatically.
+    """
+    requested = {pid: qty for pid, qty in requested.items() if qty > 0}
+    if not requested:
+        return {}
+    sale_module = sale_module or get_sale_module(db)
+
+    running = func.sum(StockInventory.quantity).over(
+        partition_by=StockInventory.product_id, order_by=batch_order(sale_module)
+    )
+    batches = select(
+        StockInventory.inventory_id, StockInventory.product_id, StockInventory.quantity,
+        StockInventory.batch_number, StockInventory.expiry_date, StockInventory.retail_price,
+        StockInventory.selling_price, StockInventory.tax_percent, running.label("running")
+    ).where(
+        StockInventory.product_id.in_(list(requested)),
+        StockInventory.quantity > 0,
+        StockInventory.is_available == True,
+        or_(StockInventory.expiry_date.is_(None), StockInventory.expiry_date >= datetime.utcnow())
+    ).subquery("batches")
+    wanted = values(column("product_id", Integer), column("qty", Float), name="wanted").data(list(requested.items()))
+
+    # Keep a batch while the stock before it is still short of the requested quantity
+    rows = db.execute(
+        select(batches)
+        .join(wanted, wanted.c.product_id == batches.c.product_id)
+        .where(batches.c.running - batches.c.quantity < wanted.c.qty)
+        .order_by(batches.c.product_id, batches.c.running)
+    ).all()
+
+    allocations: Dict[int, List[BatchAllocation]] = defaultdict(list)
+    for row in rows:
+        already = row.running - row.quantity
+        take = min(row.quantity, requested[row.product_id] - already)
+        allocations[row.product_id].append(BatchAllocation(row, take))
+
+    problems = []
+    for product_id, qty in requested.items():
+        available = sum(a.quantity for a in allocations.get(product_id, []))
+        if available < qty:
+            problems.append(f"Insufficient stock for {product_id} (requested {qty:g}, available {available:g})")
+    if problems:
+        raise InsufficientStockError(problems)
+    return dict(allocations)
+
+
+def allocate_cart_items(db: Session, items) -> list:
+    """
+    Return the POS items with every sale line that has no batch_id split into
+    one line per allocated batch (quantity and flat discount split
+    proportionally). Lines that name a batch are kept as sent.
+    """
+    open_lines = [item for item in items if item.batch_id is None and item.quantity > 0]
+    if not open_lines:
+        return list(items)
+
+    requested: Dict[int, float] = defaultdict(float)
+    for item in open_lines:
+        requested[item.medicine_id] += item.quantity
+    queues = {pid: list(allocs) for pid, allocs in allocate_batches(db, requested).items()}
+
+    expanded = []
+    for item in items:
+        if item.batch_id is not None or item.quantity <= 0:
+            expanded.append(item)
+            continue
+
+        queue = queues[item.medicine_id]
+        remaining = item.quantity
+        discount_left = item.discount_amount
+        while remaining > 0 and queue:
+            alloc = queue[0]
+            take = min(alloc.quantity, remaining)
+            alloc.quantity -= take
+            if alloc.quantity <= 0:
+                queue.pop(0)
+            remaining -= take
+
+            # The last split takes what is left of the discount so the total is unchanged
+            discount = discount_left if remaining <= 0 else round(item.discount_amount * take / item.quantity, 2)
+            discount_left -= discount
+            expanded.append(item.model_copy(update={
+                "batch_id": alloc.batch_id,
+                "batch_number": alloc.batch_number,
+                "quantity": take,
+                "discount_amount": discount,
+                "total_price": None,
+                "retail_price": item.retail_price if item.retail_price is not None else alloc.retail_price,
+            }))
+    return expanded
@@ -0,0 +1,110 @@
+"""
+Catalog Sync
+Versioned POS catalog so terminals can keep a local copy and poll cheaply.
+
+Every write to products / stock_inventory stamps the row's catalog_version
+with the writing transaction id (txid_current(), set by the models'
+default/onupdate), so no shared counter row is locked by sales or GRNs.
+A sync cursor is the oldest transaction still running when the read starts:
+everything older has committed or aborted, so `since=<cursor>` on the next
+poll returns every row changed after this read (a row may be sent twice,
+never missed). Hard-deleted products leave a catalog_deletions tombstone
+stamped the same way, listed in the delta as deleted_products.
+"""
+
+import hashlib
+from typing import Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from ..models import CatalogDeletion, Product, StockInventory
+from ..models.inventory_models import Generic
+
+SNAPSHOT_SQL = text(
+    "SELECT txid_snapshot_xmin(s) AS xmin, ARRAY(SELECT txid_snapshot_xip(s)) AS xip "
+    "FROM txid_current_snapshot() AS s"
+)
+
+
+def sync_cursor(db: Session) -> int:
+    """Read before the catalog rows; rows at or above it may still change"""
+    return db.execute(SNAPSHOT_SQL).first().xmin
+
+
+def catalog_etag(db: Session) -> str:
+    """
+    Strong ETag of the full snapshot: the newest row version, the product
+    count (hard deletes) and any older transaction still in flight, since its
+    rows would become visible without raising the newest version.
+    """
+    latest = db.execute(select(
+        select(func.max(Product.catalog_version)).scalar_subquery(),
+        select(func.max(StockInventory.catalog_version)).scalar_subquery(),
+        select(func.count(Product.id)).scalar_subquery(),
+    )).first()
+    newest = max(latest[0] or 0, latest[1] or 0)
+    snapshot = db.execute(SNAPSHOT_SQL).first()
+    pending = sorted(x for x in (snapshot.xip or []) if x < newest)
+
+    tag = f"{newest}.{latest[2]}"
+    if pending:
+        tag += "." + hashlib.sha1(",".join(map(str, pending)).encode("utf-8")).hexdigest()[:12]
+    return f'"{tag}"'
+
+
+def _product_rows(db: Session, since: Optional[int]):
+    stmt = select(
+        Product.id, Product.product_name, Generic.name.label("generic_name"),
+        Product.category_id, Product.manufacturer_id, Product.retail_price, Product.tax_percent,
+        Product.control_drug, Product.active, Product.purchase_conv_factor,
+        Product.purchase_conv_unit_id, Product.preferred_pos_unit_id, Product.catalog_version
+    ).outerjoin(Generic, Product.generics_id == Generic.id)
+    if since is not None:
+        stmt = stmt.where(Product.catalog_version >= since)
+    return [dict(row._mapping) for row in db.execute(stmt.order_by(Product.id))]
+
+
+def _batch_rows(db: Session, since: Optional[int]):
+    stmt = select(
+        StockInventory.inventory_id, StockInventory.product_id, StockInventory.batch_number,
+        StockInventory.expiry_date, StockInventory.quantity, StockInventory.selling_price,
+        StockInventory.retail_price, StockInventory.tax_percent, StockInventory.is_available,
+        StockInventory.catalog_version
+    )
+    if since is None:
+        stmt = stmt.where(StockInventory.quantity > 0, StockInventory.is_available == True)
+    else:
+        # Depleted / unavailable batches are included so terminals can drop them
+        stmt = stmt.where(StockInventory.catalog_version >= since)
+
+    batches = []
+    for row in db.execute(stmt.order_by(StockInventory.product_id, StockInventory.inventory_id)):
+        batch = dict(row._mapping)
+        batch["expiry_date"] = row.expiry_date.isoformat() if row.expiry_date else None
+        batches.append(batch)
+    return batches
+
+
+def _deleted_product_ids(db: Session, since: int):
+    return list(db.execute(
+        select(CatalogDeletion.product_id).where(CatalogDeletion.catalog_version >= since).distinct()
+    ).scalars())
+
+
+def catalog_snapshot(db: Session) -> dict:
+    """Every product and every sellable batch, with the cursor for the next delta"""
+    cursor = sync_cursor(db)
+    return {
+        "version": cursor, "full": True, "products": _product_rows(db, None),
+        "batches": _batch_rows(db, None), "deleted_products": []
+    }
+
+
+def catalog_changes(db: Session, since: int) -> dict:
+    """Products and batches written, and products deleted, since `since` (a cursor from an earlier response)"""
+    cursor = sync_cursor(db)
+    return {
+        "version": cursor, "full": False, "products": _product_rows(db, since),
+        "batches": _batch_rows(db, since), "deleted_products": _deleted_product_ids(db, since)
+    }
@@ -0,0 +1,97 @@
+"""
+Idempotency Keys
+Lets POS terminals retry create requests safely. The key is claimed with an
+INSERT ... ON CONFLICT DO NOTHING in the same transaction as the document, and
+the response is stored before that transaction commits, so a retry either
+replays the original response (one primary-key lookup) or waits for the first
+attempt to finish; a rolled-back attempt frees the key again.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..models import IdempotencyKey
+
+
+class IdempotencyKeyReused(ValueError):
+    """The key was already used for a different request body"""
+
+
+class IdempotentReplay:
+    __slots__ = ("status_code", "body", "request_hash")
+
+    def __init__(self, status_code: int, body: Any, request_hash: Optional[str] = None):
+        self.status_code = status_code
+        self.body = body
+        self.request_hash = request_hash
+
+    def matches(self, payload: Any) -> bool:
+        return self.request_hash == _request_hash(payload)
+
+
+def _request_hash(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(jsonable_encoder(payload), sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def claim_idempotency_key(db: Session, scope: str, key: Optional[str], payload: Any) -> Optional[IdempotentReplay]:
+    """
+    Reserve `key` for this request in the current transaction.
+    Returns None when the request should be processed, or the stored result
+    of the original request. A concurrent attempt with the same key blocks
+    here until the first one commits or rolls back.
+    """
+    if not key:
+        return None
+    request_hash = _request_hash(payload)
+    keys = IdempotencyKey.__table__
+
+    claimed = db.execute(
+        pg_insert(keys)
+        .values(scope=scope, key=key, request_hash=request_hash, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[keys.c.scope, keys.c.key])
+        .returning(keys.c.key)
+    ).scalar()
+    if claimed is not None:
+        return None
+
+    row = db.execute(
+        keys.select().where(keys.c.scope == scope, keys.c.key == key)
+    ).first()
+    if row.request_hash != request_hash:
+        raise IdempotencyKeyReused(f"Idempotency-Key '{key}' was already used with a different request")
+    return IdempotentReplay(row.status_code or 200, row.response_body, row.request_hash)
+
+
+def find_stored_responses(db: Session, scope: str, keys: Iterable[str]) -> Dict[str, IdempotentReplay]:
+    """
+    Completed requests among `keys` in one query (used by batch endpoints to
+    skip already-posted entries up front). Check `matches()` before replaying.
+    """
+    keys_table = IdempotencyKey.__table__
+    keys = [k for k in set(keys) if k]
+    if not keys:
+        return {}
+    rows = db.execute(
+        keys_table.select().where(keys_table.c.scope == scope, keys_table.c.key.in_(keys))
+    ).all()
+    return {row.key: IdempotentReplay(row.status_code or 200, row.response_body, row.request_hash) for row in rows}
+
+
+def remember_response(db: Session, scope: str, key: Optional[str], response: Any, response_model=None, status_code: int = 200):
+    """Store the response for `key`; call before the transaction that created the document commits"""
+    if not key:
+        return
+    if response_model is not None:
+        response = response_model.model_validate(response)
+    keys = IdempotencyKey.__table__
+    db.execute(
+        keys.update()
+        .where(keys.c.scope == scope, keys.c.key == key)
+        .values(status_code=status_code, response_body=jsonable_encoder(response))
+    )
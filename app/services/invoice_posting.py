@@ -0,0 +1,198 @@
+"""
+Invoice Posting
+Saves a POS invoice (stock deduction, regulatory log, sales-return audit rows
+and the queued accounting event) in the caller's transaction. Shared by the
+single checkout endpoint and the offline batch sync; the caller commits.
+"""
+
+
+from sqlalchemy.orm import Session, joinedload
+
+from ..models import Invoice, InvoiceItem, RegulatoryLog, User
+from ..models.sales_models import SalesReturn, SaleReturnItem
+from ..schemas import InvoiceCreate
+from .accounting_outbox import enqueue_posting
+from .batch_allocation import allocate_cart_items
+from .numbering import next_document_number
+from .stock_engine import reserve_cart_stock
+from .stock_on_hand import refresh_stock_on_hand
+
+
+def post_invoice(db: Session, inv_in: InvoiceCreate, user: User) -> Invoice:
+    """
+    Create the invoice and deduct its stock; flushed, not committed.
+    Raises InsufficientStockError listing every short line.
+    """
+    sub_total = 0
+    tax_total = 0
+    invoice_items = []
+    returned_items_data = [] # To track items for SalesReturn model
+
+    # Lines sent without a batch are split across batches by the tenant's sale module (FIFO/FEFO)
+    items = allocate_cart_items(db, inv_in.items)
+
+    # Lock every batch in the cart and deduct all lines in one statement
+    # (negative quantities restock returns); all short lines are reported together.
+    # batch_id in request maps to inventory_id in StockInventory
+    cart = reserve_cart_stock(db, items)
+    refresh_stock_on_hand(db, (item.medicine_id for item in items))
+
+    for item in items:
+        line_total = item.unit_price * item.quantity
+        tax = line_total * (item.tax_percent / 100)
+        sub_total += line_total
+        tax_total += tax
+
+        # Item level discount
+        if item.discount_percent > 0:
+            disc = line_total * (item.discount_percent / 100)
+        else:
+            disc = item.discount_amount
+
+        item_net = line_total + tax - disc
+
+        invoice_items.append(InvoiceItem(
+            medicine_id=item.medicine_id,
+            batch_id=item.batch_id,
+            quantity=item.quantity,
+            unit_price=item.unit_price,
+            retail_price=item.retail_price,
+            tax_amount=tax,
+            discount_percent=item.discount_percent,
+            discount_amount=disc if item.discount_percent == 0 else 0,
+            total_price=item_net
+        ))
+
+        # Track for SalesReturn if it's a return line
+        if item.quantity < 0:
+            returned_items_data.append({
+                "product_id": item.medicine_id,
+                "batch_id": item.batch_id,
+                "quantity": abs(item.quantity),
+                "unit_price": item.unit_price,
+                "retail_price": item.retail_price,
+                "tax_amount": abs(tax),
+                "total_price": abs(item_net)
+            })
+
+        control_drug = cart[(item.batch_id, item.medicine_id)].control_drug
+        if control_drug and item.quantity > 0:
+            db.add(RegulatoryLog(medicine_id=item.medicine_id, action="Dispensed", quantity=item.quantity, patient_id=inv_in.patient_id, customer_id=inv_in.customer_id))
+        elif control_drug and item.quantity < 0:
+            db.add(RegulatoryLog(medicine_id=item.medicine_id, action="Returned", quantity=abs(item.quantity), patient_id=inv_in.patient_id, customer_id=inv_in.customer_id))
+
+    # Net total calculation: (Gross Items) + (Adjustment) - (Invoice Discount)
+    # Note: adjustment can be positive (charge) or negative (discount)
+    # This matches the frontend: baseNetTotal = grossTotal + adjustment; netTotal = baseNetTotal - invoiceDiscount;
+    items_net_sum = sum(it.total_price for it in invoice_items)
+    net_total = items_net_sum + inv_in.adjustment - inv_in.invoice_discount
+
+    # Next number from the tenant's INV counter (held until this transaction commits)
+    new_invoice_number = next_document_number(db, "INV")
+
+    new_inv = Invoice(
+        invoice_number=new_invoice_number,
+        patient_id=inv_in.patient_id,
+        customer_id=inv_in.customer_id,
+        customer_name=inv_in.customer_name,
+        user_id=user.id,
+        store_id=user.store_id,
+        sub_total=sub_total,
+        tax_amount=tax_total,
+        discount_amount=inv_in.discount_amount,
+        invoice_discount=inv_in.invoice_discount,
+        net_total=net_total,
+        paid_amount=net_total,
+        status=inv_in.status,
+        payment_method=inv_in.payment_method,
+        cash_register_session_id=inv_in.cash_register_session_id,
+        remarks=inv_in.remarks,
+        items=invoice_items
+    )
+    db.add(new_inv)
+    db.flush()
+
+    # --- Handle SalesReturn Model for Audit ---
+    if returned_items_data:
+        # Calculate return totals from the negative lines
+        ret_sub = sum(d['total_price'] for d in returned_items_data) # This is absolute value
+
+        sales_ret = SalesReturn(
+            return_number=next_document_number(db, "REV"),
+            invoice_id=new_inv.id,
+            sub_total=ret_sub,
+            tax_amount=0.0, # Simplified: tax already reflected in item.total_price reversal
+            net_total=ret_sub,
+            reason="POS Return/Exchange",
+            remarks=inv_in.remarks
+        )
+        db.add(sales_ret)
+        db.flush()
+
+        for r_item in returned_items_data:
+            db.add(SaleReturnItem(
+                sales_return_id=sales_ret.id,
+                product_id=r_item['product_id'],
+                batch_id=r_item['batch_id'],
+                quantity=r_item['quantity'],
+                unit_price=r_item['unit_price'],
+                retail_price=r_item.get('retail_price'),
+                tax_amount=r_item.get('tax_amount', 0.0),
+                total_price=r_item['total_price']
+            ))
+
+        db.flush() # Ensure sales_ret.id is ready for accounting
+
+    # Queue the journal posting in the same transaction as the invoice, stock and
+    # regulatory log; the outbox worker posts it (record_sale_transaction is
+    # "Return-Aware" and books the whole invoice, including exchanges, in ONE
+    # balanced entry), so checkout does not wait on accounting.
+    enqueue_posting(db, "sale", new_inv.id, user.id)
+    return new_inv
+
+
+def invoice_response(db: Session, invoice: Invoice) -> dict:
+    """Plain dict of the invoice and its items (avoids circular references when serializing)"""
+    # Use a fresh query to load items with their products in one round-trip
+    try:
+        refreshed_inv = db.query(Invoice).options(
+            joinedload(Invoice.items).joinedload(InvoiceItem.product)
+        ).filter(Invoice.id == invoice.id).first()
+        if refreshed_inv:
+            invoice = refreshed_inv
+    except Exception as refresh_err:
+        print(f"⚠ Warning: Manual refresh failed: {refresh_err}")
+        # If refresh fails, we still have the flushed objects
+
+    response = {
+        "id": invoice.id,
+        "invoice_number": invoice.invoice_number,
+        "customer_name": invoice.customer_name,
+        "sub_total": invoice.sub_total,
+        "tax_amount": invoice.tax_amount,
+        "discount_amount": invoice.discount_amount,
+        "invoice_discount": invoice.invoice_discount,
+        "net_total": invoice.net_total,
+        "paid_amount": invoice.paid_amount,
+        "payment_method": invoice.payment_method,
+        "status": invoice.status,
+        "created_at": invoice.created_at.isoformat() if invoice.created_at else None,
+        "items": []
+    }
+
+    # Safely serialize items
+    for item in invoice.items:
+        response["items"].append({
+            "id": item.id,
+            "medicine_id": item.medicine_id,
+            "batch_id": item.batch_id,
+            "quantity": item.quantity,
+            "unit_price": item.unit_price,
+            "retail_price": item.retail_price,
+            "tax_amount": item.tax_amount,
+            "discount_percent": item.discount_percent,
+            "discount_amount": item.discount_amount,
+            "total_price": item.total_price,
+            "product_name": item.product.product_name if item.product else None
+        })
+    return response
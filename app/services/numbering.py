@@ -0,0 +1,103 @@
+"""
+Document Numbering
+Allocates gap-free document numbers (invoices, sales returns, journal
+entries, vouchers, cash sessions, GRNs, purchase orders) from the per-tenant document_counters
+table in O(1): one UPDATE ... RETURNING on the series row.
+
+The counter row stays locked until the caller's transaction ends, so
+concurrent terminals queue for the next number, and a rolled-back document
+gives its number back. A series is seeded once from the existing documents
+(highest matching number) the first time it is used.
+"""
+
+import re
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..models import (
+    DocumentCounter, Invoice, JournalEntry, PaymentVoucher, ReceiptVoucher,
+    CashRegisterSession, GRN, PurchaseOrder, SalesReturn
+)
+
+
+class DocumentSeries:
+    """
+    `prefix` may contain {year} / {day}; the rendered prefix (without the
+    trailing dash) is the counter key, so yearly/daily series restart at 1.
+    """
+
+    __slots__ = ("prefix", "width", "column")
+
+    def __init__(self, prefix: str, width: int, column):
+        self.prefix = prefix
+        self.width = width
+        self.column = column  # existing documents, used to seed the counter
+
+    def render_prefix(self, when: datetime) -> str:
+        return self.prefix.format(year=when.year, day=when.strftime("%Y%m%d"))
+
+
+DOCUMENT_SERIES = {
+    "INV": DocumentSeries("INV-", 6, Invoice.invoice_number),
+    "REV": DocumentSeries("REV-{year}-", 5, SalesReturn.return_number),
+    "PV": DocumentSeries("PV-{year}-", 5, PaymentVoucher.voucher_number),
+    "RV": DocumentSeries("RV-{year}-", 5, ReceiptVoucher.voucher_number),
+    "SES": DocumentSeries("SES-{day}-", 4, CashRegisterSession.session_number),
+    "GRN": DocumentSeries("GRN-{year}-", 5, GRN.custom_grn_no),
+    "PO": DocumentSeries("PO-{year}-", 5, PurchaseOrder.po_no),
+    "JE": DocumentSeries("JE-{year}-", 5, JournalEntry.entry_number),
+    "JE-SALE": DocumentSeries("JE-SALE-{year}-", 5, JournalEntry.entry_number),
+    "JE-PUR": DocumentSeries("JE-PUR-{year}-", 5, JournalEntry.entry_number),
+    "JE-PAY": DocumentSeries("JE-PAY-{year}-", 5, JournalEntry.entry_number),
+    "JE-REC": DocumentSeries("JE-REC-{year}-", 5, JournalEntry.entry_number),
+    "JE-ADJ": DocumentSeries("JE-ADJ-{year}-", 5, JournalEntry.entry_number),
+    "JE-OPEN": DocumentSeries("JE-OPEN-{year}-", 5, JournalEntry.entry_number),
+}
+
+
+def _seed_value(db: Session, series: DocumentSeries, prefix: str) -> int:
+    """Highest number already issued under `prefix` (one scan per series, on first use only)"""
+    # Sequence numbers only; older timestamp-style numbers (10+ digits) are ignored
+    pattern = "^" + re.escape(prefix) + "[0-9]{%d,9}$" % series.width
+    last = db.query(series.column).filter(
+        series.column.op("~")(pattern)
+    ).order_by(func.length(series.column).desc(), series.column.desc()).first()
+    return int(last[0][len(prefix):]) if last else 0
+
+
+def allocate(db: Session, doc_type: str, when: Optional[datetime] = None) -> int:
+    """Reserve the next sequence value of `doc_type` in the caller's transaction"""
+    series = DOCUMENT_SERIES[doc_type]
+    prefix = series.render_prefix(when or datetime.now())
+    key = prefix.rstrip("-")
+    counters = DocumentCounter.__table__
+
+    value = db.execute(
+        update(counters)
+        .where(counters.c.series == key)
+        .values(last_value=counters.c.last_value + 1, updated_at=datetime.utcnow())
+        .returning(counters.c.last_value)
+    ).scalar()
+    if value is None:
+        seed = _seed_value(db, series, prefix)
+        insert = pg_insert(counters).values(series=key, last_value=seed + 1, updated_at=datetime.utcnow())
+        # Another terminal may have created the row meanwhile
+        value = db.execute(
+            insert.on_conflict_do_update(
+                index_elements=[counters.c.series],
+                set_={"last_value": counters.c.last_value + 1, "updated_at": insert.excluded.updated_at}
+            ).returning(counters.c.last_value)
+        ).scalar()
+    return value
+
+
+def next_document_number(db: Session, doc_type: str, when: Optional[datetime] = None) -> str:
+    """e.g. next_document_number(db, "PV") -> "PV-2026-00042" """
+    series = DOCUMENT_SERIES[doc_type]
+    when = when or datetime.now()
+    value = allocate(db, doc_type, when)
+    return f"{series.render_prefix(when)}{value:0{series.width}d}"
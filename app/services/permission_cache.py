@@ -0,0 +1,61 @@
+"""
+Compiled Role Permissions
+Per-tenant map of role id -> frozenset of permission names, built once from
+role_permissions so permission checks are set lookups instead of joins.
+"""
+
+import os
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import Permission, role_permissions
+from ..utils.ttl_cache import TTLCache
+
+PERMISSION_CACHE_TTL_SECONDS = int(os.getenv("PERMISSION_CACHE_TTL_SECONDS", 300))
+
+# Seeded as "Full Access"; always allowed so new permissions never lock tenants out
+ADMIN_ROLE_NAME = "Admin"
+
+_role_permission_cache = TTLCache(PERMISSION_CACHE_TTL_SECONDS)
+
+
+def _compile_role_permissions(db: Session) -> Dict[int, FrozenSet[str]]:
+    rows = db.query(role_permissions.c.role_id, Permission.name).join(
+        Permission, Permission.id == role_permissions.c.permission_id
+    ).all()
+
+    compiled: Dict[int, set] = {}
+    for role_id, perm_name in rows:
+        compiled.setdefault(role_id, set()).add(perm_name)
+    return {role_id: frozenset(names) for role_id, names in compiled.items()}
+
+
+def get_role_permissions(db: Session) -> Dict[int, FrozenSet[str]]:
+    """Return the compiled role -> permissions map for the session's tenant"""
+    return _role_permission_cache.get_or_load(
+        db.info.get('tenant_schema'), lambda: _compile_role_permissions(db)
+    )
+
+
+def get_user_permissions(db: Session, role_ids: Iterable[int]) -> FrozenSet[str]:
+    compiled = get_role_permissions(db)
+    perms = frozenset()
+    for role_id in role_ids:
+        perms |= compiled.get(role_id, frozenset())
+    return perms
+
+
+def has_permissions(db: Session, user, required: Iterable[str], any_of: bool = False) -> bool:
+    """Check `required` against the union of the user's role permissions"""
+    if ADMIN_ROLE_NAME in (r.name for r in user.roles):
+        return True
+    perms = get_user_permissions(db, (r.id for r in user.roles))
+    required = tuple(required)
+    if any_of:
+        return any(p in perms for p in required)
+    return all(p in perms for p in required)
+
+
+def invalidate_role_permissions(tenant_key: Optional[str]):
+    _role_permission_cache.pop(tenant_key)
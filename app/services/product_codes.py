@@ -0,0 +1,102 @@
+"""
+Product Codes
+Barcode / alternate-code lookup for POS scanners. Each tenant's code table is
+held in memory as a dict (code -> product and pack unit), so resolving a scan
+is one hash lookup. Every code change bumps the tenant's "CODES" row in
+document_counters (mark_codes_changed, in the writer's transaction); a scan
+compares the snapshot's version with that row (one primary-key read) and
+reloads the snapshot when another worker has changed codes since. Batches
+are always read live.
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..models import DocumentCounter, ProductCode, StockInventory
+from ..models.inventory_models import PurchaseConversionUnit
+from ..utils.ttl_cache import TTLCache
+from .batch_allocation import batch_order, get_sale_module
+
+PRODUCT_CODE_CACHE_TTL_SECONDS = int(os.getenv("PRODUCT_CODE_CACHE_TTL_SECONDS", 600))
+
+_code_cache = TTLCache(PRODUCT_CODE_CACHE_TTL_SECONDS)
+CODES_VERSION_SERIES = "CODES"
+
+
+class ScanTarget:
+    __slots__ = ("code", "product_id", "unit_id", "unit_name", "pack_quantity")
+
+    def __init__(self, code: str, product_id: int, unit_id: Optional[int], unit_name: Optional[str], pack_quantity: Optional[int]):
+        self.code = code
+        self.product_id = product_id
+        self.unit_id = unit_id
+        self.unit_name = unit_name
+        self.pack_quantity = pack_quantity or 1
+
+
+def normalize_code(code: str) -> str:
+    return (code or "").strip()
+
+
+def _code_query():
+    return select(
+        ProductCode.code, ProductCode.product_id, ProductCode.unit_id,
+        PurchaseConversionUnit.name.label("unit_name"), ProductCode.pack_quantity
+    ).outerjoin(PurchaseConversionUnit, ProductCode.unit_id == PurchaseConversionUnit.id)
+
+
+def _load_codes(db: Session) -> Dict[str, ScanTarget]:
+    return {row.code: ScanTarget(*row) for row in db.execute(_code_query())}
+
+
+def _codes_version(db: Session) -> int:
+    version = db.execute(
+        select(DocumentCounter.last_value).where(DocumentCounter.series == CODES_VERSION_SERIES)
+    ).scalar()
+    return version or 0
+
+
+def mark_codes_changed(db: Session):
+    """Bump the tenant's code-table version in the caller's transaction (every worker reloads on its next scan)"""
+    counters = DocumentCounter.__table__
+    insert = pg_insert(counters).values(series=CODES_VERSION_SERIES, last_value=1, updated_at=datetime.utcnow())
+    db.execute(insert.on_conflict_do_update(
+        index_elements=[counters.c.series],
+        set_={"last_value": counters.c.last_value + 1, "updated_at": insert.excluded.updated_at}
+    ))
+
+
+def lookup_code(db: Session, code: str) -> Optional[ScanTarget]:
+    """Resolve a scanned code for the session's tenant"""
+    code = normalize_code(code)
+    if not code:
+        return None
+    tenant_key = db.info.get('tenant_schema')
+    version = _codes_version(db)
+    cached = _code_cache.get(tenant_key)
+    if cached is None or cached[0] != version:
+        cached = (version, _load_codes(db))
+        _code_cache.set(tenant_key, cached)
+    return cached[1].get(code)
+
+
+def invalidate_product_codes(tenant_key: Optional[str]):
+    _code_cache.pop(tenant_key)
+
+
+def allocatable_batches(db: Session, product_id: int) -> List[StockInventory]:
+    """Sellable batches of a product in the tenant's sale order (FIFO/FEFO)"""
+    return db.execute(
+        select(StockInventory)
+        .where(
+            StockInventory.product_id == product_id,
+            StockInventory.quantity > 0,
+            StockInventory.is_available == True
+        )
+        .order_by(*batch_order(get_sale_module(db)))
+    ).scalars().all()
@@ -0,0 +1,148 @@
+"""
+Product Search
+Search-as-you-type for the POS. Candidates come from index-backed matches on
+lower(product name), generic name and ingredient names (trigram GIN indexes
+for substrings, text_pattern_ops indexes for 1-2 character prefixes), ranked
+by prefix match and trigram similarity, and only the requested page is then
+loaded with its lookups and batches.
+"""
+
+from typing import List
+
+from sqlalchemy import case, func, literal, select, union_all
+from sqlalchemy.orm import Session, aliased
+
+from ..models import Product, ProductIngredient, StockInventory, Category, Manufacturer
+from ..models.inventory_models import Generic, PurchaseConversionUnit
+from .batch_allocation import batch_order, get_sale_module
+from .stock_on_hand import stock_totals
+
+SEARCH_MAX_LIMIT = 100
+TRIGRAM_MIN_LENGTH = 3  # shorter terms only match as a prefix
+
+# How much a hit on each field counts towards the rank
+NAME_WEIGHT = 1.0
+GENERIC_WEIGHT = 0.8
+INGREDIENT_WEIGHT = 0.6
+
+
+def normalize_term(q: str) -> str:
+    return " ".join((q or "").lower().split())
+
+
+def _like_escape(term: str) -> str:
+    # Backslash is PostgreSQL's default LIKE escape; an explicit ESCAPE clause would disable index use
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def rank_product_ids(db: Session, q: str, limit: int = 50, offset: int = 0) -> List[int]:
+    """Ids of the products matching `q`, best match first, one page"""
+    term = normalize_term(q)
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    offset = max(0, offset)
+
+    if not term:
+        return list(db.execute(
+            select(Product.id).order_by(Product.product_name).limit(limit).offset(offset)
+        ).scalars())
+
+    escaped = _like_escape(term)
+    prefix = escaped + "%"
+    pattern = "%" + escaped + "%" if len(term) >= TRIGRAM_MIN_LENGTH else prefix
+
+    def scored(product_id, field, weight):
+        matched = func.lower(field)
+        score = (case((matched.like(prefix), 1.0), else_=0.0) + func.similarity(matched, term)) * literal(weight)
+        return select(product_id.label("product_id"), score.label("score")), matched.like(pattern)
+
+    name_hits, name_match = scored(Product.id, Product.product_name, NAME_WEIGHT)
+    generic_hits, generic_match = scored(Product.id, Generic.name, GENERIC_WEIGHT)
+    ingredient_hits, ingredient_match = scored(ProductIngredient.product_id, ProductIngredient.name, INGREDIENT_WEIGHT)
+
+    hits = union_all(
+        name_hits.where(name_match),
+        generic_hits.join(Generic, Product.generics_id == Generic.id).where(generic_match),
+        ingredient_hits.where(ingredient_match),
+    ).subquery("hits")
+    ranked = select(
+        hits.c.product_id, func.max(hits.c.score).label("score")
+    ).group_by(hits.c.product_id).subquery("ranked")
+
+    return list(db.execute(
+        select(ranked.c.product_id)
+        .join(Product, Product.id == ranked.c.product_id)
+        .order_by(ranked.c.score.desc(), Product.product_name)
+        .limit(limit).offset(offset)
+    ).scalars())
+
+
+def search_products(db: Session, q: str, limit: int = 50, offset: int = 0) -> List[dict]:
+    """One page of ranked POS search results with stock totals and sellable batches"""
+    ids = rank_product_ids(db, q, limit, offset)
+    if not ids:
+        return []
+
+    PurchaseUnit = aliased(PurchaseConversionUnit)
+    PosUnit = aliased(PurchaseConversionUnit)
+    rows = db.execute(
+        select(
+            Product,
+            Category.name.label("category_name"),
+            Manufacturer.name.label("manufacturer_name"),
+            Generic.name.label("generic_name"),
+            PurchaseUnit.name.label("purchase_unit_name"),
+            PosUnit.name.label("pos_unit_name")
+        )
+        .outerjoin(Category, Product.category_id == Category.id)
+        .outerjoin(Manufacturer, Product.manufacturer_id == Manufacturer.id)
+        .outerjoin(Generic, Product.generics_id == Generic.id)
+        .outerjoin(PurchaseUnit, Product.purchase_conv_unit_id == PurchaseUnit.id)
+        .outerjoin(PosUnit, Product.preferred_pos_unit_id == PosUnit.id)
+        .where(Product.id.in_(ids))
+    ).all()
+
+    # Stock totals from stock_on_hand; sellable batches of the page only,
+    # already in the tenant's sale order (FIFO/FEFO)
+    current_stock = stock_totals(db, ids)
+    stock_rows = db.execute(
+        select(StockInventory)
+        .where(StockInventory.product_id.in_(ids), StockInventory.is_available == True)
+        .order_by(StockInventory.product_id, *batch_order(get_sale_module(db)))
+    ).scalars().all()
+    batches = {pid: [] for pid in ids}
+    for s in stock_rows:
+        batches[s.product_id].append({
+            "inventory_id": s.inventory_id,
+            "id": s.inventory_id, # Alias for compatibility
+            "batch_number": s.batch_number,
+            "quantity": s.quantity,
+            "selling_price": s.selling_price,
+            "retail_price": s.retail_price,
+            "tax_percent": s.tax_percent,
+            "expiry_date": s.expiry_date.isoformat() if s.expiry_date else None
+        })
+
+    by_id = {row[0].id: row for row in rows}
+    response = []
+    for pid in ids:
+        product, cat_name, man_name, gen_name, p_unit_name, pos_unit_name = by_id[pid]
+        response.append({
+            "id": product.id,
+            "product_name": product.product_name,
+            "name": product.product_name, # Alias for compatibility
+            "generic_name": gen_name or "N/A",
+            "retail_price": product.retail_price,
+            "current_stock": current_stock[pid],
+            "supplier_id": product.supplier_id,
+            "manufacturer_id": product.manufacturer_id,
+            "category": {"id": product.category_id, "name": cat_name or "Uncategorized"},
+            "manufacturer": {"id": product.manufacturer_id, "name": man_name or "N/A"},
+            "tax_percent": product.tax_percent or 0,
+            "uom": pos_unit_name or "Unit", # Base unit name from POS Unit
+            "purchase_conv_unit_id": product.purchase_conv_unit_id,
+            "purchase_conv_unit_name": p_unit_name,
+            "purchase_conv_factor": product.purchase_conv_factor,
+            "preferred_purchase_unit_id": product.preferred_purchase_unit_id,
+            "stock_inventory": batches[pid]
+        })
+    return response
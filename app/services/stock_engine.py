@@ -0,0 +1,146 @@
+"""
+Checkout Stock Engine
+Reserves stock for a whole POS cart in a fixed number of statements: one
+locking read of every batch (and its product) in the cart, then one
+conditional UPDATE ... RETURNING that applies all decrements at once.
+"""
+
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Float, Integer, column, or_, select, tuple_, update, values
+from sqlalchemy.orm import Session
+
+from ..models import Product, StockInventory
+
+
+class InsufficientStockError(ValueError):
+    """Raised with every failing cart line so the cashier can fix them in one go"""
+
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        super().__init__("; ".join(problems))
+
+
+class CartLine:
+    __slots__ = ("batch_id", "product_id", "quantity", "control_drug", "remaining")
+
+    def __init__(self, batch_id: int, product_id: int, quantity: float):
+        self.batch_id = batch_id
+        self.product_id = product_id
+        self.quantity = quantity
+        self.control_drug = False
+        self.remaining = None
+
+
+def _group_cart(items) -> Dict[Tuple[int, int], CartLine]:
+    # The same batch may appear on several lines (e.g. a sale and a return)
+    lines: Dict[Tuple[int, int], CartLine] = {}
+    for item in items:
+        key = (item.batch_id, item.medicine_id)
+        if key in lines:
+            lines[key].quantity += item.quantity
+        else:
+            lines[key] = CartLine(item.batch_id, item.medicine_id, item.quantity)
+    return lines
+
+
+def _lock_batches(db: Session, keys):
+    # Lock in inventory_id order so concurrent checkouts cannot deadlock
+    rows = db.execute(
+        select(StockInventory.inventory_id, StockInventory.product_id, StockInventory.quantity, Product.control_drug)
+        .join(Product, Product.id == StockInventory.product_id)
+        .where(tuple_(StockInventory.inventory_id, StockInventory.product_id).in_(keys))
+        .order_by(StockInventory.inventory_id)
+        .with_for_update(of=StockInventory)
+    ).all() if keys else []
+    return {(r.inventory_id, r.product_id): r for r in rows}
+
+
+def check_carts_stock(db: Session, carts: List[list]) -> List[List[str]]:
+    """
+    Validate several carts (e.g. a terminal's offline queue) against stock in
+    one locking read: the carts are applied in order to the locked quantities
+    and each cart's problems are returned (empty list = it fits). The locks are
+    held until the caller's transaction ends, so the result stays valid while
+    the carts are posted with reserve_cart_stock. Sale lines without a batch
+    are skipped here; they are allocated (and checked) when the cart is posted.
+    """
+    grouped = [
+        _group_cart([item for item in items if item.batch_id is not None or item.quantity <= 0])
+        for items in carts
+    ]
+    keys = sorted({key for lines in grouped for key in lines if key[0] is not None})
+    found = _lock_batches(db, keys)
+    available = {key: (row.quantity or 0) for key, row in found.items()}
+
+    results = []
+    for lines in grouped:
+        problems = []
+        for key, line in lines.items():
+            if key not in available:
+                problems.append(f"Batch {line.batch_id} not found for product {line.product_id}")
+            elif line.quantity > 0 and available[key] < line.quantity:
+                problems.append(
+                    f"Insufficient stock for {line.product_id} batch {line.batch_id} "
+                    f"(requested {line.quantity:g}, available {available[key]:g})"
+                )
+        if not problems:
+            for key, line in lines.items():
+                available[key] -= line.quantity
+        results.append(problems)
+    return results
+
+
+def reserve_cart_stock(db: Session, items) -> Dict[Tuple[int, int], CartLine]:
+    """
+    Deduct stock for all POS `items` (negative quantities restock returns).
+    Returns the cart lines keyed by (batch_id, product_id) with the product's
+    control_drug flag and the remaining batch quantity.
+    Raises InsufficientStockError listing every missing batch / short line.
+    """
+    lines = _group_cart(items)
+    problems = [
+        f"Batch {batch_id} not found for product {product_id}"
+        for (batch_id, product_id) in lines if batch_id is None
+    ]
+    keys = [key for key in lines if key[0] is not None]
+    found = _lock_batches(db, keys)
+
+    for key in keys:
+        line = lines[key]
+        row = found.get(key)
+        if row is None:
+            problems.append(f"Batch {line.batch_id} not found for product {line.product_id}")
+            continue
+        line.control_drug = bool(row.control_drug)
+        if line.quantity > 0 and (row.quantity or 0) < line.quantity:
+            problems.append(
+                f"Insufficient stock for {line.product_id} batch {line.batch_id} "
+                f"(requested {line.quantity:g}, available {row.quantity or 0:g})"
+            )
+    if problems:
+        raise InsufficientStockError(problems)
+
+    remaining = {}
+    deltas = [(key[0], lines[key].quantity) for key in keys if lines[key].quantity != 0]
+    if deltas:
+        cart = values(column("inventory_id", Integer), column("qty", Float), name="cart").data(deltas)
+        # The quantity guard keeps the update safe even without the row locks above
+        updated = db.execute(
+            update(StockInventory.__table__)
+            .where(StockInventory.inventory_id == cart.c.inventory_id)
+            .where(or_(cart.c.qty <= 0, StockInventory.quantity >= cart.c.qty))
+            .values(quantity=StockInventory.quantity - cart.c.qty)
+            .returning(StockInventory.inventory_id, StockInventory.quantity)
+        ).all()
+        remaining = {r.inventory_id: r.quantity for r in updated}
+
+        short = [key for key in keys if lines[key].quantity != 0 and key[0] not in remaining]
+        if short:
+            raise InsufficientStockError([
+                f"Insufficient stock for {lines[key].product_id} batch {lines[key].batch_id}" for key in short
+            ])
+
+    for key in keys:
+        lines[key].remaining = remaining.get(key[0], found[key].quantity)
+    return lines
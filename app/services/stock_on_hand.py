@@ -0,0 +1,126 @@
+"""
+Stock On Hand
+Materialized stock summary per product and store (stock_on_hand): quantity,
+value at landed cost, nearest expiry and latest batch of the available
+stock_inventory rows. Every stock-changing path (POS sales and returns,
+GRNs, adjustments, transfers, invoice edits/voids) calls
+refresh_stock_on_hand for the products it touched before committing, so
+readers get current stock with a primary-key lookup instead of summing
+batches.
+
+refresh_stock_on_hand only records the products; they are recomputed from
+their own batches, in three statements for any number of products, when the
+transaction commits. A transaction-scoped advisory lock per product
+serialises concurrent refreshes of the same product, so the summary never
+lags behind a committed stock change. Taking those locks last, in product
+order, keeps them out of the batch row-lock order (no deadlock when one
+transaction posts several invoices) and holds them only for the recompute
+and the commit. rebuild_stock_on_hand (rebuild_stock_on_hand.py) recomputes
+the whole table.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Integer, bindparam, delete, event, func, insert, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from ..models import StockInventory, StockOnHand
+
+_SUMMARY_COLUMNS = [
+    "product_id", "store_id", "quantity", "stock_value",
+    "nearest_expiry", "latest_inventory_id", "updated_at"
+]
+
+
+def _summary_select(*where):
+    """Aggregate of the available batches, one row per (product, store)"""
+    store_id = func.coalesce(StockInventory.store_id, 0)
+    quantity = func.coalesce(StockInventory.quantity, 0)
+    return select(
+        StockInventory.product_id,
+        store_id,
+        func.coalesce(func.sum(quantity), 0),
+        func.coalesce(func.sum(quantity * func.coalesce(StockInventory.unit_cost, 0)), 0),
+        func.min(StockInventory.expiry_date).filter(StockInventory.quantity > 0),
+        func.max(StockInventory.inventory_id),
+        bindparam("updated_at", datetime.utcnow())
+    ).where(StockInventory.is_available == True, *where)\
+     .group_by(StockInventory.product_id, store_id)
+
+
+def _lock_products(db: Session, product_ids: List[int]):
+    # ids are sorted, so concurrent refreshes take the locks in the same order
+    namespace = f"stock_on_hand:{db.info.get('tenant_schema') or 'public'}"
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:namespace), pid) FROM unnest(:ids) AS pid")
+        .bindparams(bindparam("ids", type_=ARRAY(Integer))),
+        {"namespace": namespace, "ids": product_ids}
+    )
+
+
+_PENDING_KEY = "stock_on_hand_pending"
+
+
+def refresh_stock_on_hand(db: Session, product_ids: Iterable[Optional[int]]):
+    """
+    Recompute the summary rows of `product_ids` from their batches when the
+    caller's transaction commits (summary reads in the same transaction
+    still see the old rows).
+    """
+    db.info.setdefault(_PENDING_KEY, set()).update(pid for pid in product_ids if pid is not None)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_pending(db: Session):
+    # Savepoint commits leave the work to the outer transaction
+    if db.in_nested_transaction():
+        return
+    ids = sorted(db.info.pop(_PENDING_KEY, ()))
+    if not ids:
+        return
+    db.flush()
+    _lock_products(db, ids)
+    summary = StockOnHand.__table__
+    db.execute(delete(summary).where(summary.c.product_id.in_(ids)))
+    db.execute(
+        insert(summary).from_select(_SUMMARY_COLUMNS, _summary_select(StockInventory.product_id.in_(ids)))
+    )
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(db: Session, transaction):
+    # Rolled back (or committed) outer transaction: nothing left to refresh
+    if transaction.parent is None:
+        db.info.pop(_PENDING_KEY, None)
+
+
+def rebuild_stock_on_hand(db: Session) -> int:
+    """
+    Recompute the whole table from stock_inventory. Stock changes wait for
+    the rebuild to commit. Returns the number of summary rows; the caller commits.
+    """
+    schema = db.info.get('tenant_schema')
+    table = f'"{schema}".stock_on_hand' if schema else "stock_on_hand"
+    db.execute(text(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE"))
+    summary = StockOnHand.__table__
+    db.execute(delete(summary))
+    result = db.execute(insert(summary).from_select(_SUMMARY_COLUMNS, _summary_select()))
+    # ORM copies of summary rows in this session are now stale
+    db.expire_all()
+    return result.rowcount
+
+
+def stock_totals(db: Session, product_ids: Iterable[int]) -> Dict[int, float]:
+    """Current stock per product, summed over stores (0 for products without stock)"""
+    ids = list(set(product_ids))
+    totals = {pid: 0 for pid in ids}
+    if ids:
+        rows = db.execute(
+            select(StockOnHand.product_id, func.sum(StockOnHand.quantity))
+            .where(StockOnHand.product_id.in_(ids))
+            .group_by(StockOnHand.product_id)
+        ).all()
+        totals.update({pid: qty or 0 for pid, qty in rows})
+    return totals
@@ -0,0 +1,129 @@
+"""
+Tenant Migrations
+Applies the Alembic revisions in migrations/ to every tenant schema in parallel,
+recording per-tenant progress in public.tenant_migration_status so a rollout
+can be resumed after failures.
+"""
+
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import List, Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from ..database import SessionLocal, engine, get_shard_engine, _shard_engines
+from ..models import Tenant, TenantMigrationStatus
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALEMBIC_INI = os.path.join(PROJECT_ROOT, "alembic.ini")
+
+
+def get_alembic_config(tenant_schema: str, shard_key: Optional[str] = None) -> Config:
+    cfg = Config(ALEMBIC_INI)
+    cfg.set_main_option("script_location", os.path.join(PROJECT_ROOT, "migrations"))
+    cfg.attributes["tenant_schema"] = tenant_schema
+    cfg.attributes["shard_key"] = shard_key
+    return cfg
+
+
+def get_head_revision() -> str:
+    return ScriptDirectory.from_config(get_alembic_config("__head__")).get_current_head()
+
+
+def get_current_revision(tenant_schema: str, shard_key: Optional[str] = None) -> Optional[str]:
+    with get_shard_engine(shard_key).connect() as conn:
+        ctx = MigrationContext.configure(conn, opts={"version_table_schema": tenant_schema})
+        return ctx.get_current_revision()
+
+
+def stamp_tenant_head(tenant_schema: str, shard_key: Optional[str] = None):
+    """Mark a schema built from the current models (e.g. a cloned template) as up to date"""
+    command.stamp(get_alembic_config(tenant_schema, shard_key), "head")
+
+
+def _set_status(tenant_id: int, **fields):
+    with SessionLocal() as db:
+        row = db.query(TenantMigrationStatus).filter(TenantMigrationStatus.tenant_id == tenant_id).first()
+        if row is None:
+            row = TenantMigrationStatus(tenant_id=tenant_id, attempts=0)
+            db.add(row)
+        for key, value in fields.items():
+            setattr(row, key, value)
+        db.commit()
+
+
+def _init_worker():
+    # Connections inherited through fork must not be shared with the parent
+    for shard_engine in list(_shard_engines.values()):
+        shard_engine.dispose(close=False)
+
+
+def migrate_tenant(tenant_id: int, schema_name: str, shard_key: Optional[str], revision: str, attempts: int) -> dict:
+    """Upgrade one tenant schema; runs inside a pool worker process"""
+    _set_status(
+        tenant_id, schema_name=schema_name, shard_key=shard_key, target_revision=revision,
+        status="running", attempts=attempts + 1, error=None, started_at=datetime.utcnow(), finished_at=None
+    )
+    try:
+        command.upgrade(get_alembic_config(schema_name, shard_key), revision)
+        current = get_current_revision(schema_name, shard_key)
+        _set_status(tenant_id, status="done", current_revision=current, finished_at=datetime.utcnow())
+        return {"schema": schema_name, "status": "done", "revision": current}
+    except Exception as e:
+        current = None
+        try:
+            current = get_current_revision(schema_name, shard_key)
+        except Exception:
+            pass
+        _set_status(
+            tenant_id, status="failed", current_revision=current,
+            error=traceback.format_exc()[-4000:], finished_at=datetime.utcnow()
+        )
+        return {"schema": schema_name, "status": "failed", "revision": current, "error": str(e)}
+
+
+def run_tenant_migrations(
+    revision: str = "head",
+    workers: int = 4,
+    subdomains: Optional[List[str]] = None,
+    force: bool = False
+) -> List[dict]:
+    """
+    Upgrade all (or the given) tenants to `revision` with a process pool.
+    Tenants already recorded as done at the target revision are skipped unless `force`.
+    """
+    TenantMigrationStatus.__table__.create(bind=engine, checkfirst=True)
+    target = get_head_revision() if revision == "head" else revision
+
+    with SessionLocal() as db:
+        query = db.query(Tenant)
+        if subdomains:
+            query = query.filter(Tenant.subdomain.in_(subdomains))
+        tenants = query.order_by(Tenant.id).all()
+        progress = {row.tenant_id: row for row in db.query(TenantMigrationStatus).all()}
+
+        jobs = []
+        for tenant in tenants:
+            row = progress.get(tenant.id)
+            if not force and row and row.status == "done" and row.current_revision == target:
+                continue
+            jobs.append((tenant.id, tenant.schema_name, tenant.shard_key, revision, row.attempts if row else 0))
+
+    print(f"Migrating {len(jobs)} of {len(tenants)} tenant schemas to {target} with {workers} workers")
+    results = []
+    if not jobs:
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(migrate_tenant, *job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            suffix = f" ({result['error']})" if result["status"] == "failed" else ""
+            print(f"  [{done}/{len(jobs)}] {result['schema']}: {result['status']} @ {result['revision']}{suffix}")
+    return results
@@ -0,0 +1,306 @@
+"""
+Tenant Provisioning
+New tenant schemas are cloned from a pre-built, pre-seeded template schema
+(one server-side SQL batch) instead of running create_all + row-by-row seeding.
+"""
+
+import hashlib
+import inspect
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import Enum, Integer, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable, CreateIndex
+
+from ..database import Base, get_shard_engine
+from ..models import (
+    User, Role, Product, Permission, Generic,
+    StockInventory, Category, Manufacturer, Supplier, Store
+)
+from ..models.accounting_models import Account, AccountType
+from .stock_on_hand import refresh_stock_on_hand
+
+# Tenant schemas are named "tenant_<subdomain>", so a leading underscore keeps
+# the template out of their namespace
+TEMPLATE_SCHEMA = "_tenant_template"
+# Subdomains that must never become tenants
+RESERVED_SUBDOMAINS = {"template", "public", "admin", "www"}
+
+# The sample batch's expiry is set when a tenant is cloned, not when the template is built
+SAMPLE_BATCH_NUMBER = "BN-101"
+SAMPLE_BATCH_SHELF_LIFE_DAYS = 365
+
+_pg_dialect = postgresql.dialect()
+
+
+def _tenant_tables():
+    return [t for t in Base.metadata.sorted_tables if t.schema != "public"]
+
+
+def build_tenant_ddl(schema_name: str) -> List[str]:
+    """CREATE TYPE/TABLE/INDEX statements for every tenant table, rendered into `schema_name`"""
+    translate = {"schema_translate_map": {None: schema_name}, "render_schema_translate": True}
+    statements = []
+
+    seen_types = set()
+    for table in _tenant_tables():
+        for column in table.columns:
+            if isinstance(column.type, Enum) and column.type.native_enum and column.type.name not in seen_types:
+                seen_types.add(column.type.name)
+                labels = ", ".join("'" + label.replace("'", "''") + "'" for label in column.type.enums)
+                statements.append(f"CREATE TYPE {schema_name}.{column.type.name} AS ENUM ({labels})")
+
+    for table in _tenant_tables():
+        statements.append(str(CreateTable(table).compile(dialect=_pg_dialect, **translate)).strip())
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            statements.append(str(CreateIndex(index).compile(dialect=_pg_dialect, **translate)).strip())
+    return statements
+
+
+def template_version() -> str:
+    """Hash of the tenant DDL and the seed; the template is rebuilt whenever either changes"""
+    ddl = "\n".join(build_tenant_ddl("__tenant__"))
+    seed = inspect.getsource(seed_tenant_defaults)
+    return hashlib.sha1((ddl + "\n" + seed).encode("utf-8")).hexdigest()[:16]
+
+
+def seed_tenant_defaults(sdb: Session):
+    """Default catalog, permissions, roles and chart of accounts for a new tenant (no users)"""
+    # 1. Base Data
+    cats = [Category(name=n) for n in ["Antibiotics", "Analgesics", "Antivirals", "Narcotics", "Supplements"]]
+    mans = [Manufacturer(name=n) for n in ["Pfizer", "GlaxoSmithKline", "Novartis", "Local Pharma"]]
+    sups = [Supplier(name="Main Distributions", address="Global Hub", gst_number="GST-99901")]
+    # Seed default store
+    main_store = Store(name="Main Branch", address="Primary Hub", is_warehouse=False)
+    sdb.add_all(cats + mans + sups + [main_store]); sdb.flush()
+
+    # 2. Roles & Perms
+    # Comprehensive Permission List
+    PERMISSION_STRUCTURE = {
+        "Inventory > Products": ["list", "view", "add", "edit", "delete", "print_labels"],
+        "Inventory > Stock": ["list", "view", "adjust", "transfer", "view_history"],
+        "Inventory > Setup": ["list", "add", "edit", "delete"],
+
+        "Sales > POS": ["access", "process_sale", "apply_discount", "void_item", "return_item"],
+        "Sales > Invoices": ["list", "view", "print", "cancel"],
+        "Sales > Customers": ["list", "view", "add", "edit", "delete", "view_history"],
+
+        "Procurement > Suppliers": ["list", "view", "add", "edit", "delete"],
+        "Procurement > Purchase Orders": ["list", "create", "edit", "approve", "delete", "print"],
+        "Procurement > GRN": ["list", "create", "view", "print"],
+
+        "Accounting > Chart of Accounts": ["list", "view", "add", "edit"],
+        "Accounting > Journal Entries": ["list", "create", "view", "print"],
+        "Accounting > Reports": ["view_daily", "view_financial", "view_inventory", "export"],
+        "Accounting > Payments": ["list", "create", "view", "approve"],
+
+        "Settings > General": ["view", "update"],
+        "Settings > User Management": ["list", "invite", "edit", "delete", "manage_roles"],
+        "Settings > Stores": ["list", "add", "edit", "delete"]
+    }
+
+    all_perms = []
+    for module, actions in PERMISSION_STRUCTURE.items():
+        for action in actions:
+            perm_name = f"{module}:{action}"
+            p = Permission(name=perm_name, module=module, action=action, description=f"Can {action.replace('_', ' ')} in {module}")
+            all_perms.append(p)
+
+    sdb.add_all(all_perms); sdb.flush()
+
+    # Create Default Roles
+    admin_role = Role(name="Admin", description="Full Access", permissions=all_perms)
+
+    # Cashier Role - Sales Focused
+    cashier_perms = [p for p in all_perms if "Sales > POS" in p.module or "Sales > Invoices" in p.module]
+    cashier_role = Role(name="Cashier", description="Sales & POS Access", permissions=cashier_perms)
+
+    # Stock Manager - Inventory Focused
+    stock_perms = [p for p in all_perms if "Inventory" in p.module or "Procurement" in p.module]
+    stock_role = Role(name="Stock Manager", description="Inventory & Procurement", permissions=stock_perms)
+
+    sdb.add_all([admin_role, cashier_role, stock_role]); sdb.flush()
+
+    # 4. Generics
+    paracetamol = Generic(name="Paracetamol")
+    sdb.add(paracetamol)
+    sdb.flush()
+
+    # 5. Sample Product
+    sample_product = Product(
+        product_name="Panadol CF",
+        category_id=cats[1].id, 
+        manufacturer_id=mans[2].id,
+        generics_id=paracetamol.id,
+        supplier_id=sups[0].id,
+        retail_price=10.0,
+        average_cost=5.0
+    )
+    sdb.add(sample_product); sdb.flush()
+    sdb.add(StockInventory(
+        product_id=sample_product.id, store_id=main_store.id, batch_number=SAMPLE_BATCH_NUMBER,
+        expiry_date=None,  # set per tenant by provision_tenant_schema
+        unit_cost=5.0, selling_price=9.5, 
+        quantity=200, grn_id=None
+    ))
+    # stock_on_hand is filled by provision_tenant_schema once the expiry is set
+
+    # 6. Seed Chart of Accounts
+    default_accounts = [
+        # ROOTS
+        {"code": "1", "name": "Assets", "type": AccountType.ASSET, "parent": None},
+        {"code": "2", "name": "Liabilities", "type": AccountType.LIABILITY, "parent": None},
+        {"code": "3", "name": "Equity", "type": AccountType.EQUITY, "parent": None},
+        {"code": "4", "name": "Revenue", "type": AccountType.REVENUE, "parent": None},
+        {"code": "5", "name": "Expenses", "type": AccountType.EXPENSE, "parent": None},
+
+        # ASSETS (Children of 1)
+        {"code": "1000", "name": "Cash", "type": AccountType.ASSET, "parent": "1"},
+        {"code": "1100", "name": "Bank Account", "type": AccountType.ASSET, "parent": "1"},
+        {"code": "1200", "name": "Accounts Receivable", "type": AccountType.ASSET, "parent": "1"},
+        {"code": "1300", "name": "Inventory", "type": AccountType.ASSET, "parent": "1"},
+        {"code": "1400", "name": "Prepaid Expenses", "type": AccountType.ASSET, "parent": "1"},
+        {"code": "1450", "name": "Advance Tax Receivable", "type": AccountType.ASSET, "parent": "1"},
+        {"code": "1500", "name": "Fixed Assets", "type": AccountType.ASSET, "parent": "1"},
+        {"code": "1510", "name": "Furniture & Fixtures", "type": AccountType.ASSET, "parent": "1500"},
+        {"code": "1520", "name": "Equipment", "type": AccountType.ASSET, "parent": "1500"},
+
+        # LIABILITIES (Children of 2)
+        {"code": "2000", "name": "Accounts Payable", "type": AccountType.LIABILITY, "parent": "2"},
+        {"code": "2100", "name": "Salaries Payable", "type": AccountType.LIABILITY, "parent": "2"},
+        {"code": "2200", "name": "Tax Payable", "type": AccountType.LIABILITY, "parent": "2"},
+        {"code": "2300", "name": "Short-term Loans", "type": AccountType.LIABILITY, "parent": "2"},
+
+        # EQUITY (Children of 3)
+        {"code": "3000", "name": "Owner's Capital", "type": AccountType.EQUITY, "parent": "3"},
+        {"code": "3100", "name": "Retained Earnings", "type": AccountType.EQUITY, "parent": "3"},
+        {"code": "3200", "name": "Drawings", "type": AccountType.EQUITY, "parent": "3"},
+
+        # REVENUE (Children of 4)
+        {"code": "4000", "name": "Sales Revenue", "type": AccountType.REVENUE, "parent": "4"},
+        {"code": "4100", "name": "Other Income", "type": AccountType.REVENUE, "parent": "4"},
+
+        # EXPENSES (Children of 5)
+        {"code": "5000", "name": "Cost of Goods Sold", "type": AccountType.EXPENSE, "parent": "5"},
+        {"code": "5100", "name": "Salaries Expense", "type": AccountType.EXPENSE, "parent": "5"},
+        {"code": "5200", "name": "Rent Expense", "type": AccountType.EXPENSE, "parent": "5"},
+        {"code": "5300", "name": "Utilities Expense", "type": AccountType.EXPENSE, "parent": "5"},
+        {"code": "5400", "name": "Discount Given", "type": AccountType.EXPENSE, "parent": "5"},
+        {"code": "5500", "name": "Other Expenses", "type": AccountType.EXPENSE, "parent": "5"},
+        {"code": "5600", "name": "Depreciation Expense", "type": AccountType.EXPENSE, "parent": "5"},
+    ]
+
+    # Parents are linked through the relationship so the whole chart is written in one flush
+    accounts_by_code = {}
+    for acc_data in default_accounts:
+        accounts_by_code[acc_data["code"]] = Account(
+            account_code=acc_data["code"],
+            account_name=acc_data["name"],
+            account_type=acc_data["type"],
+            is_active=True,
+            opening_balance=0.0,
+            current_balance=0.0,
+            description=f"Default {acc_data['type'].value} account"
+        )
+    for acc_data in default_accounts:
+        if acc_data["parent"]:
+            accounts_by_code[acc_data["code"]].parent_account = accounts_by_code[acc_data["parent"]]
+    sdb.add_all(accounts_by_code.values())
+    sdb.flush()
+
+
+def ensure_template_schema(shard_key: Optional[str] = None):
+    """Build (or rebuild, if the models changed) the seeded template schema on a shard"""
+    version = template_version()
+    with get_shard_engine(shard_key).connect() as conn:
+        # Serialize concurrent provisioning on this shard while checking/building the template
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": TEMPLATE_SCHEMA})
+        current = conn.execute(
+            text("SELECT obj_description(oid, 'pg_namespace') FROM pg_namespace WHERE nspname = :schema"),
+            {"schema": TEMPLATE_SCHEMA}
+        ).scalar()
+
+        if current != version:
+            print(f"Building tenant template schema (version {version})")
+            # Product search indexes use trigram operator classes
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public"))
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {TEMPLATE_SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {TEMPLATE_SCHEMA}"))
+            conn.exec_driver_sql(";\n".join(build_tenant_ddl(TEMPLATE_SCHEMA)))
+
+            # Seed inside the same transaction through a translated session
+            template_conn = conn.execution_options(schema_translate_map={None: TEMPLATE_SCHEMA})
+            with Session(bind=template_conn) as sdb:
+                seed_tenant_defaults(sdb)
+                sdb.flush()
+            conn.execute(text(f"COMMENT ON SCHEMA {TEMPLATE_SCHEMA} IS '{version}'"))
+        conn.commit()
+
+
+def build_clone_script(schema_name: str) -> str:
+    """Single SQL batch: create the schema, its tables, copy template rows and fix sequences"""
+    statements = [f"CREATE SCHEMA {schema_name}"] + build_tenant_ddl(schema_name)
+
+    for table in _tenant_tables():
+        columns = ", ".join(f'"{c.name}"' for c in table.columns)
+        statements.append(
+            f'INSERT INTO {schema_name}."{table.name}" ({columns}) '
+            f'SELECT {columns} FROM {TEMPLATE_SCHEMA}."{table.name}"'
+        )
+
+    for table in _tenant_tables():
+        pk = list(table.primary_key.columns)
+        if len(pk) == 1 and isinstance(pk[0].type, Integer) and pk[0].autoincrement in (True, "auto"):
+            statements.append(
+                f"SELECT setval(pg_get_serial_sequence('{schema_name}.{table.name}', '{pk[0].name}'), "
+                f'(SELECT COALESCE(MAX("{pk[0].name}"), 0) + 1 FROM {schema_name}."{table.name}"), false)'
+            )
+    return ";\n".join(statements)
+
+
+def clone_template_schema(schema_name: str, shard_key: Optional[str] = None):
+    """Create `schema_name` as a copy of the template in one round-trip and one transaction"""
+    ensure_template_schema(shard_key)
+    with get_shard_engine(shard_key).connect() as conn:
+        conn.exec_driver_sql(build_clone_script(schema_name))
+        conn.commit()
+
+
+def provision_tenant_schema(
+    sdb: Session,
+    admin_username: str,
+    admin_email: str,
+    admin_password_hash: str,
+    store_name: Optional[str] = None,
+    store_address: Optional[str] = None
+) -> User:
+    """
+    Apply the per-tenant parameters to a freshly cloned schema: the admin user
+    (Admin role, default store), the sample batch's expiry date and optionally
+    the default store's details.
+    Usable from tests/fixtures with any session created via create_tenant_session().
+    """
+    main_store = sdb.query(Store).order_by(Store.id).first()
+    if main_store and store_name:
+        main_store.name = store_name
+    if main_store and store_address:
+        main_store.address = store_address
+
+    # Give the template's sample batch a shelf life counted from today
+    sample_batches = sdb.query(StockInventory).filter(
+        StockInventory.batch_number == SAMPLE_BATCH_NUMBER, StockInventory.grn_id == None
+    ).all()
+    for batch in sample_batches:
+        batch.expiry_date = datetime.now() + timedelta(days=SAMPLE_BATCH_SHELF_LIFE_DAYS)
+    refresh_stock_on_hand(sdb, [batch.product_id for batch in sample_batches])
+
+    admin_role = sdb.query(Role).filter(Role.name == "Admin").first()
+    admin_user = User(
+        username=admin_username, email=admin_email, hashed_password=admin_password_hash,
+        roles=[admin_role] if admin_role else [], store_id=main_store.id if main_store else None
+    )
+    sdb.add(admin_user)
+    sdb.flush()
+    return admin_user
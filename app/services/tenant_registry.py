@@ -0,0 +1,90 @@
+"""
+Tenant Registry Cache
+In-process cache of the public tenant registry (tenants + subscription state)
+so that tenant resolution and login checks stay off the public schema.
+"""
+
+import os
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, desc
+
+from ..database import SessionLocal, DEFAULT_SHARD
+from ..models import Tenant, SoftwarePayment
+from ..utils.ttl_cache import TTLCache
+
+# Each worker process keeps its own copy. Changes made through the API
+# invalidate the local copy immediately; other workers pick them up once
+# the entry expires.
+TENANT_CACHE_TTL_SECONDS = int(os.getenv("TENANT_CACHE_TTL_SECONDS", 60))
+
+
+class TenantInfo:
+    """Detached snapshot of a tenant and its subscription window"""
+
+    __slots__ = (
+        "id", "name", "subdomain", "schema_name", "shard_key",
+        "is_active", "is_trial", "trial_end_date",
+        "subscription_valid_to",
+        "latest_payment_status", "latest_payment_valid_to", "latest_payment_rejection_reason",
+    )
+
+    def __init__(self, tenant: Tenant, subscription_valid_to: Optional[datetime], latest_payment: Optional[SoftwarePayment]):
+        self.id = tenant.id
+        self.name = tenant.name
+        self.subdomain = tenant.subdomain
+        self.schema_name = tenant.schema_name
+        self.shard_key = tenant.shard_key or DEFAULT_SHARD
+        self.is_active = tenant.is_active
+        self.is_trial = tenant.is_trial
+        self.trial_end_date = tenant.trial_end_date
+        # End of the furthest approved payment; compared against "now" at read time
+        self.subscription_valid_to = subscription_valid_to
+        self.latest_payment_status = latest_payment.status if latest_payment else None
+        self.latest_payment_valid_to = latest_payment.valid_to if latest_payment else None
+        self.latest_payment_rejection_reason = latest_payment.rejection_reason if latest_payment else None
+
+    def has_active_subscription(self, now: Optional[datetime] = None) -> bool:
+        now = now or datetime.utcnow()
+        return self.subscription_valid_to is not None and self.subscription_valid_to >= now
+
+
+_tenant_cache = TTLCache(TENANT_CACHE_TTL_SECONDS)
+
+
+def _load_tenant(subdomain: str) -> Optional[TenantInfo]:
+    with SessionLocal() as db:
+        tenant = db.query(Tenant).filter(Tenant.subdomain == subdomain).first()
+        if not tenant:
+            return None
+
+        subscription_valid_to = db.query(func.max(SoftwarePayment.valid_to)).filter(
+            SoftwarePayment.tenant_id == tenant.id,
+            SoftwarePayment.status == 'approved'
+        ).scalar()
+        latest_payment = db.query(SoftwarePayment).filter(
+            SoftwarePayment.tenant_id == tenant.id
+        ).order_by(desc(SoftwarePayment.created_at)).first()
+
+        return TenantInfo(tenant, subscription_valid_to, latest_payment)
+
+
+def get_tenant_info(subdomain: str) -> Optional[TenantInfo]:
+    """Return the cached registry entry for `subdomain`, loading it on a miss or after TTL expiry"""
+    if not subdomain:
+        return None
+    # Unknown subdomains are not cached so a newly created tenant is visible at once
+    return _tenant_cache.get_or_load(subdomain, lambda: _load_tenant(subdomain))
+
+
+def invalidate_tenant(subdomain: Optional[str] = None, tenant_id: Optional[int] = None):
+    """Drop a tenant from the cache by subdomain and/or id"""
+    if subdomain:
+        _tenant_cache.pop(subdomain)
+    if tenant_id is not None:
+        _tenant_cache.pop_where(lambda key, info: info.id == tenant_id)
+
+
+def clear_tenant_cache():
+    _tenant_cache.clear()
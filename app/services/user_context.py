@@ -0,0 +1,100 @@
+"""
+User Context Cache
+Caches the authenticated tenant user (identity + roles) so that protected
+routes do not re-query User/Role on every call.
+"""
+
+import os
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from ..models import User
+from ..utils.ttl_cache import TTLCache
+
+USER_CONTEXT_TTL_SECONDS = int(os.getenv("USER_CONTEXT_TTL_SECONDS", 300))
+
+
+class RoleContext:
+    __slots__ = ("id", "name")
+
+    def __init__(self, role):
+        self.id = role.id
+        self.name = role.name
+
+
+class UserContext:
+    """
+    Detached, read-only view of the current user.
+    Exposes the same attributes routes read from `User` (id, username, store_id, roles, ...).
+    """
+
+    __slots__ = ("id", "username", "email", "store_id", "is_active", "token_version", "roles")
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.store_id = user.store_id
+        self.is_active = user.is_active
+        self.token_version = user.token_version or 0
+        self.roles: Tuple[RoleContext, ...] = tuple(RoleContext(r) for r in user.roles)
+
+    @property
+    def role_ids(self) -> Tuple[int, ...]:
+        return tuple(r.id for r in self.roles)
+
+    @property
+    def role_names(self) -> Tuple[str, ...]:
+        return tuple(r.name for r in self.roles)
+
+
+# Keyed by (tenant schema, user id, token version)
+_user_context_cache = TTLCache(USER_CONTEXT_TTL_SECONDS)
+
+
+def _load_user_context(db: Session, user_id: Optional[int], username: str) -> Optional[UserContext]:
+    query = db.query(User).options(selectinload(User.roles))
+    if user_id is not None:
+        user = query.filter(User.id == user_id).first()
+    else:
+        # Tokens issued before the "id" claim existed
+        user = query.filter(User.username == username).first()
+    if user is None or user.username != username:
+        return None
+    return UserContext(user)
+
+
+def get_user_context(db: Session, payload: dict) -> Optional[UserContext]:
+    """Resolve the JWT payload to a cached UserContext; None if the user is gone or the token is revoked"""
+    user_id = payload.get("id")
+    token_version = payload.get("ver", 0)
+    key = (db.info.get('tenant_schema'), user_id, token_version)
+
+    ctx = _user_context_cache.get(key) if user_id is not None else None
+    if ctx is None:
+        ctx = _load_user_context(db, user_id, payload.get("sub"))
+        if ctx is None or ctx.token_version != token_version or ctx.is_active is False:
+            return None
+        if user_id is not None:
+            _user_context_cache.set(key, ctx)
+    return ctx
+
+
+def revoke_user_tokens(user: User):
+    """
+    Bump the user's token_version: tokens issued before (and contexts cached
+    for them) stop validating once the caller commits. Call
+    invalidate_user_context after the commit to drop this worker's copies.
+    """
+    user.token_version = (user.token_version or 0) + 1
+
+
+def invalidate_user_context(tenant_key: Optional[str], user_id: int):
+    """Drop every cached version for one user"""
+    _user_context_cache.pop_where(lambda key, ctx: key[0] == tenant_key and key[1] == user_id)
+
+
+def invalidate_tenant_user_contexts(tenant_key: Optional[str]):
+    """Drop all cached users of a tenant (e.g. after a role change)"""
+    _user_context_cache.pop_where(lambda key, ctx: key[0] == tenant_key)
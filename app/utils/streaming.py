@@ -0,0 +1,177 @@
+"""
+Streaming JSON responses for large list endpoints.
+The JSON array is written item by item from a server-side cursor (queries use
+yield_per=STREAM_BATCH_SIZE), encoded with orjson and compressed on the fly
+(brotli or gzip, negotiated from Accept-Encoding), so worker memory does not
+grow with the number of rows and the first bytes leave after the first batch.
+"""
+
+import os
+import zlib
+from decimal import Decimal
+from typing import Any, AsyncIterable, Callable, Iterable, Optional, Union
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 1000))
+STREAM_FLUSH_BYTES = 64 * 1024
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return jsonable_encoder(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """orjson with FastAPI's fallbacks (Decimal -> float, enums, pydantic models, ...)"""
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def pydantic_item(schema) -> Callable[[Any], bytes]:
+    """Serializer for ORM rows of a response_model schema (validated like FastAPI would)"""
+    return lambda obj: schema.model_validate(obj).model_dump_json().encode("utf-8")
+
+
+def open_stream_session(db: Session) -> Session:
+    """
+    Fresh session on the same tenant schema/shard as `db`. The body of a
+    StreamingResponse is iterated after the route returns, when the request's
+    dependency session may already be closed, so the stream owns its own.
+    """
+    from ..database import SessionLocal, create_tenant_session
+    schema = db.info.get('tenant_schema')
+    if not schema:
+        return SessionLocal()
+    return create_tenant_session(schema, db.info.get('shard_key'))
+
+
+def open_async_stream_session(db: AsyncSession) -> AsyncSession:
+    """Async counterpart of open_stream_session"""
+    from ..database import create_async_tenant_session
+    return create_async_tenant_session(db.info['tenant_schema'], db.info.get('shard_key'))
+
+
+class _Gzip:
+    encoding = "gzip"
+
+    def __init__(self):
+        self._z = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Sync flush so every chunk is decodable by the client as soon as it arrives
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+class _Brotli:
+    encoding = "br"
+
+    def __init__(self):
+        self._c = brotli.Compressor(quality=4)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _Identity:
+    encoding = None
+
+    def chunk(self, data: bytes) -> bytes:
+        return data
+
+    def finish(self) -> bytes:
+        return b""
+
+
+def _negotiate(accept_encoding: Optional[str]):
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip())
+    if "br" in accepted and brotli is not None:
+        return _Brotli()
+    if "gzip" in accepted:
+        return _Gzip()
+    return _Identity()
+
+
+class _ArrayWriter:
+    """Buffers serialized items into ~STREAM_FLUSH_BYTES compressed chunks"""
+
+    def __init__(self, compressor, serialize: Callable[[Any], bytes]):
+        self.compressor = compressor
+        self.serialize = serialize
+        self.buffer = bytearray(b"[")
+        self.first = True
+
+    def add(self, item) -> Optional[bytes]:
+        if not self.first:
+            self.buffer += b","
+        self.first = False
+        self.buffer += self.serialize(item)
+        if len(self.buffer) >= STREAM_FLUSH_BYTES:
+            return self.flush()
+        return None
+
+    def flush(self) -> bytes:
+        out = self.compressor.chunk(bytes(self.buffer))
+        self.buffer.clear()
+        return out
+
+    def close(self) -> bytes:
+        self.buffer += b"]"
+        return self.flush() + self.compressor.finish()
+
+
+def stream_json_array(
+    request: Request,
+    items: Union[Iterable, AsyncIterable],
+    serialize: Callable[[Any], bytes] = dumps,
+    headers: Optional[dict] = None
+) -> StreamingResponse:
+    """
+    Stream `items` (a sync or async iterator, typically over a yield_per
+    result) as a JSON array. Sync iterators are consumed in the threadpool by
+    Starlette, async ones on the event loop.
+    """
+    compressor = _negotiate(request.headers.get("accept-encoding"))
+    writer = _ArrayWriter(compressor, serialize)
+
+    if hasattr(items, "__aiter__"):
+        async def body():
+            async for item in items:
+                chunk = writer.add(item)
+                if chunk:
+                    yield chunk
+            yield writer.close()
+    else:
+        def body():
+            for item in items:
+                chunk = writer.add(item)
+                if chunk:
+                    yield chunk
+            yield writer.close()
+
+    response_headers = {"Vary": "Accept-Encoding"}
+    if compressor.encoding:
+        response_headers["Content-Encoding"] = compressor.encoding
+    response_headers.update(headers or {})
+    return StreamingResponse(body(), media_type="application/json", headers=response_headers)
@@ -0,0 +1,38 @@
+"""
+Benchmark login throughput through the bounded bcrypt pool.
+
+Usage: python benchmark_bcrypt.py [--rounds 10 11 12 13] [--logins 200] [--concurrency 32]
+Reports logins/second (one verify_password per login) for each bcrypt cost.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import auth
+
+
+def run(rounds, logins, concurrency):
+    hashed = auth.get_password_hash("benchmark-password", rounds=rounds)
+
+    start = time.perf_counter()
+    # Simulate request threads all calling verify_password at once
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        results = list(clients.map(lambda _: auth.verify_password("benchmark-password", hashed), range(logins)))
+    elapsed = time.perf_counter() - start
+
+    assert all(results), "verification failed"
+    stats = auth.get_password_hashing_stats()
+    print(f"cost={rounds:>2}  logins={logins:>5}  {logins / elapsed:8.1f} logins/s  "
+          f"({elapsed * 1000 / logins:6.1f} ms avg)  peak_in_flight={stats['peak_in_flight']}  rejected={stats['rejected']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"bcrypt workers={auth.BCRYPT_WORKERS} max_queue={auth.BCRYPT_MAX_QUEUE} configured_cost={auth.BCRYPT_ROUNDS}")
+    for r in args.rounds:
+        run(r, args.logins, args.concurrency)
@@ -0,0 +1,53 @@
+"""
+Fold pending account_balance_deltas into accounts.current_balance for every tenant.
+
+Usage: python fold_account_balances.py [--tenant sub1 sub2] [--interval 60]
+With --interval the fold repeats every N seconds (run it under a process
+supervisor or cron it without the flag). Postings never touch the account
+rows themselves, so this is the only writer of current_balance besides
+account creation/edits.
+"""
+import sys
+import os
+import time
+import argparse
+# Adjust path to include backend root
+sys.path.append(os.getcwd())
+
+from app.database import SessionLocal, create_tenant_session
+from app.models import Tenant
+from app.services.account_balances import fold_balance_deltas
+
+
+def fold_all(subdomains=None):
+    with SessionLocal() as db:
+        query = db.query(Tenant).filter(Tenant.is_active == True)
+        if subdomains:
+            query = query.filter(Tenant.subdomain.in_(subdomains))
+        tenants = [(t.subdomain, t.schema_name, t.shard_key) for t in query.order_by(Tenant.id).all()]
+
+    for subdomain, schema_name, shard_key in tenants:
+        db = create_tenant_session(schema_name, shard_key)
+        try:
+            folded = fold_balance_deltas(db)
+            db.commit()
+            if folded:
+                print(f"{subdomain}: folded deltas into {folded} accounts")
+        except Exception as e:
+            db.rollback()
+            print(f"{subdomain}: FAILED - {e}")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold account balance deltas")
+    parser.add_argument("--tenant", nargs="*", help="Only these subdomains")
+    parser.add_argument("--interval", type=int, default=0, help="Repeat every N seconds")
+    args = parser.parse_args()
+
+    while True:
+        fold_all(args.tenant)
+        if not args.interval:
+            break
+        time.sleep(args.interval)
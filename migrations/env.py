@@ -0,0 +1,66 @@
+"""
+Alembic environment for tenant schemas.
+
+Each run targets ONE tenant schema, passed either programmatically
+(config.attributes["tenant_schema"] / ["shard_key"], as run_tenant_migrations.py
+does) or on the command line:
+
+    alembic -x tenant_schema=tenant_demo -x shard_key=default upgrade head
+
+The version table lives inside the tenant schema, so every tenant tracks its
+own revision and an interrupted rollout simply resumes.
+"""
+from alembic import context
+
+from app.database import Base, get_shard_engine
+import app.models  # noqa: F401  (register all tables on Base.metadata)
+
+config = context.config
+x_args = context.get_x_argument(as_dictionary=True)
+
+tenant_schema = config.attributes.get("tenant_schema") or x_args.get("tenant_schema")
+shard_key = config.attributes.get("shard_key") or x_args.get("shard_key")
+if not tenant_schema:
+    raise RuntimeError("tenant_schema is required (config.attributes or -x tenant_schema=...)")
+config.attributes["tenant_schema"] = tenant_schema
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Public registry tables are not part of tenant migrations
+    table = obj if type_ == "table" else getattr(obj, "table", None)
+    return table is None or table.schema != "public"
+
+
+def run_migrations_offline():
+    context.configure(
+        url=str(get_shard_engine(shard_key).url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        version_table_schema=tenant_schema,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with get_shard_engine(shard_key).connect() as connection:
+        connection = connection.execution_options(schema_translate_map={None: tenant_schema})
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            version_table_schema=tenant_schema,
+            include_object=include_object,
+            # Commit after each revision so a failure keeps earlier progress
+            transaction_per_migration=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,26 @@
+"""baseline: tenant schema as created by create_all / the tenant template
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-16
+
+Existing tenants are brought under version control by upgrading through
+this no-op revision.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
@@ -0,0 +1,31 @@
+"""users.token_version for user-context cache / token revocation
+
+Revision ID: 0002_users_token_version
+Revises: 0001_baseline
+Create Date: 2026-10-16
+
+Replaces the matching ALTER in sync_tenants.py for migrated tenants.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_users_token_version'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), server_default="0"),
+        schema=schema, if_not_exists=True,
+    )
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.drop_column("users", "token_version", schema=schema)
@@ -0,0 +1,45 @@
+"""index invoice_items.invoice_id (online)
+
+Revision ID: 0003_invoice_items_invoice_id_index
+Revises: 0002_users_token_version
+Create Date: 2026-10-16
+
+Built with CREATE INDEX CONCURRENTLY outside the migration transaction so
+POS writes to invoice_items are not blocked during the rollout.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_invoice_items_invoice_id_index'
+down_revision = '0002_users_token_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    with op.get_context().autocommit_block():
+        # An interrupted CONCURRENTLY build leaves an INVALID index behind; drop it so the retry rebuilds it
+        op.execute(
+            "DO $$ BEGIN "
+            "IF EXISTS (SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            f"WHERE n.nspname = '{schema}' AND c.relname = 'ix_invoice_items_invoice_id' AND NOT i.indisvalid) "
+            f"THEN DROP INDEX {schema}.ix_invoice_items_invoice_id; END IF; "
+            "END $$"
+        )
+        op.create_index(
+            "ix_invoice_items_invoice_id", "invoice_items", ["invoice_id"],
+            schema=schema, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_invoice_items_invoice_id", table_name="invoice_items",
+            schema=schema, postgresql_concurrently=True, if_exists=True,
+        )
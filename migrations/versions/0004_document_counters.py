@@ -0,0 +1,34 @@
+"""document_counters table for gap-free document numbering
+
+Revision ID: 0004_document_counters
+Revises: 0003_invoice_items_invoice_id_index
+Create Date: 2026-10-16
+
+Counters start empty; each series is seeded from the existing documents the
+first time a number is allocated (see app/services/numbering.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_document_counters'
+down_revision = '0003_invoice_items_invoice_id_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.create_table(
+        "document_counters",
+        sa.Column("series", sa.String(100), primary_key=True),
+        sa.Column("last_value", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+        schema=schema, if_not_exists=True,
+    )
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.drop_table("document_counters", schema=schema)
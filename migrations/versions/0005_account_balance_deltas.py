@@ -0,0 +1,40 @@
+"""account_balance_deltas for contention-free balance updates
+
+Revision ID: 0005_account_balance_deltas
+Revises: 0004_document_counters
+Create Date: 2026-10-16
+
+Journal postings append here instead of updating accounts.current_balance;
+see app/services/account_balances.py.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_account_balance_deltas'
+down_revision = '0004_document_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.create_table(
+        "account_balance_deltas",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("account_id", sa.Integer(), sa.ForeignKey(f"{schema}.accounts.id"), nullable=False),
+        sa.Column("journal_entry_id", sa.Integer(), sa.ForeignKey(f"{schema}.journal_entries.id"), nullable=True),
+        sa.Column("amount", sa.Numeric(15, 2), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        schema=schema, if_not_exists=True,
+    )
+    op.create_index(
+        "ix_account_balance_deltas_account_id", "account_balance_deltas", ["account_id"],
+        schema=schema, if_not_exists=True,
+    )
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.drop_table("account_balance_deltas", schema=schema)
@@ -0,0 +1,45 @@
+"""accounting_outbox for asynchronous journal posting
+
+Revision ID: 0006_accounting_outbox
+Revises: 0005_account_balance_deltas
+Create Date: 2026-10-16
+
+Drained by run_accounting_outbox.py (app/services/accounting_outbox.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_accounting_outbox'
+down_revision = '0005_account_balance_deltas'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.create_table(
+        "accounting_outbox",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("event_type", sa.String(30), nullable=False),
+        sa.Column("aggregate_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("journal_entry_id", sa.Integer(), sa.ForeignKey(f"{schema}.journal_entries.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("processed_at", sa.DateTime(), nullable=True),
+        schema=schema, if_not_exists=True,
+    )
+    op.create_index(
+        "ix_accounting_outbox_status", "accounting_outbox", ["status"],
+        schema=schema, if_not_exists=True,
+    )
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.drop_table("accounting_outbox", schema=schema)
@@ -0,0 +1,38 @@
+"""idempotency_keys for retry-safe create endpoints
+
+Revision ID: 0007_idempotency_keys
+Revises: 0006_accounting_outbox
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_idempotency_keys'
+down_revision = '0006_accounting_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("scope", sa.String(50), primary_key=True),
+        sa.Column("key", sa.String(255), primary_key=True),
+        sa.Column("request_hash", sa.String(64), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("response_body", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        schema=schema, if_not_exists=True,
+    )
+    op.create_index(
+        "ix_idempotency_keys_created_at", "idempotency_keys", ["created_at"],
+        schema=schema, if_not_exists=True,
+    )
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.drop_table("idempotency_keys", schema=schema)
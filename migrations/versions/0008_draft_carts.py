@@ -0,0 +1,40 @@
+"""draft_carts for held POS bills
+
+Revision ID: 0008_draft_carts
+Revises: 0007_idempotency_keys
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_draft_carts'
+down_revision = '0007_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.create_table(
+        "draft_carts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("label", sa.String(), nullable=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey(f"{schema}.users.id")),
+        sa.Column("store_id", sa.Integer(), sa.ForeignKey(f"{schema}.stores.id"), nullable=True),
+        sa.Column("cash_register_session_id", sa.Integer(), sa.ForeignKey(f"{schema}.cash_register_sessions.id"), nullable=True),
+        sa.Column("cart", sa.JSON(), nullable=False),
+        sa.Column("item_count", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("expires_at", sa.DateTime()),
+        schema=schema, if_not_exists=True,
+    )
+    op.create_index("ix_draft_carts_id", "draft_carts", ["id"], schema=schema, if_not_exists=True)
+    op.create_index("ix_draft_carts_expires_at", "draft_carts", ["expires_at"], schema=schema, if_not_exists=True)
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.drop_table("draft_carts", schema=schema)
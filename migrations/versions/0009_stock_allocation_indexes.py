@@ -0,0 +1,53 @@
+"""partial indexes for FIFO/FEFO batch allocation (online)
+
+Revision ID: 0009_stock_allocation_indexes
+Revises: 0008_draft_carts
+Create Date: 2026-10-16
+
+Built with CREATE INDEX CONCURRENTLY outside the migration transaction so
+checkouts updating stock_inventory are not blocked during the rollout.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_stock_allocation_indexes'
+down_revision = '0008_draft_carts'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_stock_inventory_fifo": ["product_id", "inventory_id"],
+    "ix_stock_inventory_fefo": ["product_id", "expiry_date", "inventory_id"],
+}
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            # An interrupted CONCURRENTLY build leaves an INVALID index behind; drop it so the retry rebuilds it
+            op.execute(
+                "DO $$ BEGIN "
+                "IF EXISTS (SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                f"WHERE n.nspname = '{schema}' AND c.relname = '{name}' AND NOT i.indisvalid) "
+                f"THEN DROP INDEX {schema}.{name}; END IF; "
+                "END $$"
+            )
+            op.create_index(
+                name, "stock_inventory", columns,
+                schema=schema, postgresql_where=sa.text("quantity > 0 AND is_available"),
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(
+                name, table_name="stock_inventory",
+                schema=schema, postgresql_concurrently=True, if_exists=True,
+            )
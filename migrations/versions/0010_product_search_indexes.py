@@ -0,0 +1,50 @@
+"""trigram / prefix indexes for product search (online)
+
+Revision ID: 0010_product_search_indexes
+Revises: 0009_stock_allocation_indexes
+Create Date: 2026-10-16
+
+Built with CREATE INDEX CONCURRENTLY outside the migration transaction so
+catalog edits are not blocked during the rollout.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_product_search_indexes'
+down_revision = '0009_stock_allocation_indexes'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_products_name_trgm": ("products", "USING gin (lower(product_name) gin_trgm_ops)"),
+    "ix_products_name_prefix": ("products", "(lower(product_name) text_pattern_ops)"),
+    "ix_generics_name_trgm": ("generics", "USING gin (lower(name) gin_trgm_ops)"),
+    "ix_generics_name_prefix": ("generics", "(lower(name) text_pattern_ops)"),
+    "ix_product_ingredients_name_trgm": ("product_ingredients", "USING gin (lower(name) gin_trgm_ops)"),
+    "ix_product_ingredients_name_prefix": ("product_ingredients", "(lower(name) text_pattern_ops)"),
+}
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public")
+    with op.get_context().autocommit_block():
+        for name, (table, definition) in INDEXES.items():
+            # An interrupted CONCURRENTLY build leaves an INVALID index behind; drop it so the retry rebuilds it
+            op.execute(
+                "DO $$ BEGIN "
+                "IF EXISTS (SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                f"WHERE n.nspname = '{schema}' AND c.relname = '{name}' AND NOT i.indisvalid) "
+                f"THEN DROP INDEX {schema}.{name}; END IF; "
+                "END $$"
+            )
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {schema}.{table} {definition}")
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {schema}.{name}")
@@ -0,0 +1,38 @@
+"""product_codes: barcodes and alternate codes per product
+
+Revision ID: 0011_product_codes
+Revises: 0010_product_search_indexes
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_product_codes'
+down_revision = '0010_product_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.create_table(
+        "product_codes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey(f"{schema}.products.id"), nullable=False),
+        sa.Column("code", sa.String(64), nullable=False),
+        sa.Column("code_type", sa.String(20)),
+        sa.Column("unit_id", sa.Integer(), sa.ForeignKey(f"{schema}.purchase_conversion_units.id"), nullable=True),
+        sa.Column("pack_quantity", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+        schema=schema, if_not_exists=True,
+    )
+    op.create_index("ix_product_codes_id", "product_codes", ["id"], schema=schema, if_not_exists=True)
+    op.create_index("ix_product_codes_code", "product_codes", ["code"], unique=True, schema=schema, if_not_exists=True)
+    op.create_index("ix_product_codes_product_id", "product_codes", ["product_id"], schema=schema, if_not_exists=True)
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.drop_table("product_codes", schema=schema)
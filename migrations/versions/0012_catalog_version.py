@@ -0,0 +1,56 @@
+"""catalog_version on products and stock_inventory (POS catalog delta feed)
+
+Revision ID: 0012_catalog_version
+Revises: 0011_product_codes
+Create Date: 2026-10-16
+
+The columns are added without a default (no table rewrite); existing rows
+keep NULL and are only part of full snapshots until they are next written.
+Indexes are built with CREATE INDEX CONCURRENTLY outside the migration
+transaction.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012_catalog_version'
+down_revision = '0011_product_codes'
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    "products": "ix_products_catalog_version",
+    "stock_inventory": "ix_stock_inventory_catalog_version",
+}
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    for table in TABLES:
+        op.add_column(table, sa.Column("catalog_version", sa.BigInteger(), nullable=True), schema=schema, if_not_exists=True)
+
+    with op.get_context().autocommit_block():
+        for table, name in TABLES.items():
+            # An interrupted CONCURRENTLY build leaves an INVALID index behind; drop it so the retry rebuilds it
+            op.execute(
+                "DO $$ BEGIN "
+                "IF EXISTS (SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                f"WHERE n.nspname = '{schema}' AND c.relname = '{name}' AND NOT i.indisvalid) "
+                f"THEN DROP INDEX {schema}.{name}; END IF; "
+                "END $$"
+            )
+            op.create_index(
+                name, table, ["catalog_version"],
+                schema=schema, postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    with op.get_context().autocommit_block():
+        for table, name in TABLES.items():
+            op.drop_index(name, table_name=table, schema=schema, postgresql_concurrently=True, if_exists=True)
+    for table in TABLES:
+        op.drop_column(table, "catalog_version", schema=schema)
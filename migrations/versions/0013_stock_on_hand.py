@@ -0,0 +1,50 @@
+"""stock_on_hand: materialized stock per product and store
+
+Revision ID: 0013_stock_on_hand
+Revises: 0012_catalog_version
+Create Date: 2026-10-16
+
+Backfilled from the available stock_inventory batches; afterwards kept
+current by app/services/stock_on_hand.py (rebuild_stock_on_hand.py
+recomputes it).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013_stock_on_hand'
+down_revision = '0012_catalog_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.create_table(
+        "stock_on_hand",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey(f"{schema}.products.id"), primary_key=True),
+        sa.Column("store_id", sa.Integer(), primary_key=True),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("stock_value", sa.Float(), nullable=False),
+        sa.Column("nearest_expiry", sa.DateTime(), nullable=True),
+        sa.Column("latest_inventory_id", sa.Integer(), sa.ForeignKey(f"{schema}.stock_inventory.inventory_id"), nullable=True),
+        sa.Column("updated_at", sa.DateTime()),
+        schema=schema, if_not_exists=True,
+    )
+    op.execute(
+        f"DELETE FROM {schema}.stock_on_hand; "
+        f"INSERT INTO {schema}.stock_on_hand "
+        "(product_id, store_id, quantity, stock_value, nearest_expiry, latest_inventory_id, updated_at) "
+        "SELECT product_id, COALESCE(store_id, 0), "
+        "COALESCE(SUM(COALESCE(quantity, 0)), 0), "
+        "COALESCE(SUM(COALESCE(quantity, 0) * COALESCE(unit_cost, 0)), 0), "
+        "MIN(expiry_date) FILTER (WHERE quantity > 0), MAX(inventory_id), timezone('utc', now()) "
+        f"FROM {schema}.stock_inventory WHERE is_available "
+        "GROUP BY product_id, COALESCE(store_id, 0)"
+    )
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.drop_table("stock_on_hand", schema=schema)
@@ -0,0 +1,34 @@
+"""catalog_deletions: tombstones of hard-deleted products (POS catalog delta feed)
+
+Revision ID: 0014_catalog_deletions
+Revises: 0013_stock_on_hand
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014_catalog_deletions'
+down_revision = '0013_stock_on_hand'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.create_table(
+        "catalog_deletions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("catalog_version", sa.BigInteger(), server_default=sa.text("txid_current()")),
+        sa.Column("deleted_at", sa.DateTime()),
+        schema=schema, if_not_exists=True,
+    )
+    op.create_index("ix_catalog_deletions_id", "catalog_deletions", ["id"], schema=schema, if_not_exists=True)
+    op.create_index("ix_catalog_deletions_catalog_version", "catalog_deletions", ["catalog_version"], schema=schema, if_not_exists=True)
+
+
+def downgrade():
+    schema = op.get_context().config.attributes["tenant_schema"]
+    op.drop_table("catalog_deletions", schema=schema)
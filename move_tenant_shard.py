@@ -0,0 +1,173 @@
+"""
+Move a tenant schema to another shard.
+
+Usage: python move_tenant_shard.py <subdomain> <target_shard> [--drop-source] [--fence-wait N]
+
+Steps:
+  1. Fence writes: set is_active=False. Tenant session dependencies refuse
+     inactive tenants, and after --fence-wait seconds (default: the tenant
+     registry TTL + 5) every worker's cached entry says so.
+  2. Drain: take SHARE locks on every table of the schema, which waits
+     for transactions that were already writing to finish. The locks are
+     held until the switch, so writers that ignore the active flag (the
+     accounting outbox worker) block and time out instead of writing to
+     the old copy after the dump.
+  3. Copy the schema with pg_dump | psql and verify row counts table by table.
+     On failure the partial copy is dropped from the target, so the move can
+     simply be rerun; a move onto a shard that already has the schema is refused.
+  4. Point public.tenants.shard_key at the target and restore the active flag.
+Workers keep refusing the tenant until their cached (inactive) entry
+expires and then load the new shard, so no write reaches the old copy.
+"""
+import sys
+import os
+import time
+import argparse
+import subprocess
+# Adjust path to include backend root
+sys.path.append(os.getcwd())
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from app.database import SessionLocal, Base, get_shard_engine, SHARD_DATABASE_URLS, DEFAULT_SHARD
+from app.models import Tenant
+from app.services.tenant_registry import TENANT_CACHE_TTL_SECONDS
+
+
+def _libpq_url(url: str) -> str:
+    # pg_dump/psql understand plain postgresql:// URLs only
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def _row_counts(shard_key: str, schema_name: str) -> dict:
+    tables = [t.name for t in Base.metadata.sorted_tables if t.schema != "public"]
+    counts = {}
+    with get_shard_engine(shard_key).connect() as conn:
+        for table in tables:
+            try:
+                counts[table] = conn.execute(text(f'SELECT count(*) FROM "{schema_name}"."{table}"')).scalar()
+            except Exception:
+                conn.rollback()
+                counts[table] = None  # table missing in this schema
+    return counts
+
+
+def _tenant_tables(shard_key: str, schema_name: str) -> list:
+    with get_shard_engine(shard_key).connect() as conn:
+        return list(conn.execute(
+            text("SELECT tablename FROM pg_tables WHERE schemaname = :schema ORDER BY tablename"),
+            {"schema": schema_name}
+        ).scalars())
+
+
+def _schema_exists(shard_key: str, schema_name: str) -> bool:
+    with get_shard_engine(shard_key).connect() as conn:
+        return conn.execute(
+            text("SELECT 1 FROM information_schema.schemata WHERE schema_name = :schema"),
+            {"schema": schema_name}
+        ).first() is not None
+
+
+def _drop_schema(shard_key: str, schema_name: str):
+    with get_shard_engine(shard_key).connect() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema_name}" CASCADE'))
+        conn.commit()
+
+
+def _drain_writers(shard_key: str, schema_name: str):
+    """
+    Wait until no transaction that started before the fence is still writing
+    to the schema, and keep new writes out until the returned connection is closed.
+    """
+    tables = _tenant_tables(shard_key, schema_name)
+    conn = get_shard_engine(shard_key).connect()
+    if tables:
+        # SHARE conflicts with the ROW EXCLUSIVE lock every writer holds until it ends;
+        # pg_dump's ACCESS SHARE locks do not conflict with it
+        conn.execute(text("LOCK TABLE " + ", ".join(f'"{schema_name}"."{t}"' for t in tables) + " IN SHARE MODE"))
+    return conn
+
+
+def move_tenant(subdomain: str, target_shard: str, drop_source: bool = False, fence_wait: int = None):
+    if target_shard not in SHARD_DATABASE_URLS:
+        sys.exit(f"Unknown shard '{target_shard}'. Configured: {list(SHARD_DATABASE_URLS)}")
+
+    db = SessionLocal()
+    try:
+        tenant = db.query(Tenant).filter(Tenant.subdomain == subdomain).first()
+        if not tenant:
+            sys.exit(f"Tenant '{subdomain}' not found")
+        source_shard = tenant.shard_key or DEFAULT_SHARD
+        schema_name = tenant.schema_name
+        if source_shard == target_shard:
+            sys.exit(f"Tenant '{subdomain}' already on shard '{target_shard}'")
+        if _schema_exists(target_shard, schema_name):
+            sys.exit(f"Schema '{schema_name}' already exists on shard '{target_shard}'; drop it first")
+
+        print(f"Moving {subdomain} ({schema_name}): {source_shard} -> {target_shard}")
+        was_active = tenant.is_active
+        tenant.is_active = False
+        db.commit()
+
+        fence = None
+        try:
+            # 0. Fence: wait until every worker's registry cache sees the tenant as inactive,
+            # then for the writes that were already in flight
+            fence_wait = TENANT_CACHE_TTL_SECONDS + 5 if fence_wait is None else fence_wait
+            print(f"  Fencing writes: waiting {fence_wait}s for tenant caches to expire")
+            time.sleep(fence_wait)
+            fence = _drain_writers(source_shard, schema_name)
+
+            # 1. Copy schema (DDL + data) server to server
+            dump = subprocess.Popen(
+                ["pg_dump", "--no-owner", "--no-privileges", f"--schema={schema_name}", _libpq_url(SHARD_DATABASE_URLS[source_shard])],
+                stdout=subprocess.PIPE
+            )
+            restore = subprocess.run(
+                ["psql", "-q", "-v", "ON_ERROR_STOP=1", _libpq_url(SHARD_DATABASE_URLS[target_shard])],
+                stdin=dump.stdout
+            )
+            dump.stdout.close()
+            if dump.wait() != 0 or restore.returncode != 0:
+                raise RuntimeError("pg_dump/psql failed")
+
+            # 2. Verify
+            source_counts = _row_counts(source_shard, schema_name)
+            target_counts = _row_counts(target_shard, schema_name)
+            mismatched = {t: (c, target_counts.get(t)) for t, c in source_counts.items() if c != target_counts.get(t)}
+            if mismatched:
+                raise RuntimeError(f"Row count mismatch (source, target): {mismatched}")
+            print(f"  Verified {len(source_counts)} tables")
+
+            # 3. Switch routing
+            tenant.shard_key = target_shard
+        except BaseException:
+            # Leave the target clean so the move can be rerun
+            _drop_schema(target_shard, schema_name)
+            print(f"  Move failed; dropped the partial copy of {schema_name} on {target_shard}")
+            raise
+        finally:
+            tenant.is_active = was_active
+            db.commit()
+            if fence is not None:
+                # Released only once the registry points at the target shard
+                fence.close()
+    finally:
+        db.close()
+
+    if drop_source:
+        with get_shard_engine(source_shard).connect() as conn:
+            conn.execute(text(f'DROP SCHEMA "{schema_name}" CASCADE'))
+            conn.commit()
+        print(f"  Dropped {schema_name} on {source_shard}")
+    print("Done")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move a tenant schema between shards")
+    parser.add_argument("subdomain")
+    parser.add_argument("target_shard")
+    parser.add_argument("--drop-source", action="store_true")
+    parser.add_argument("--fence-wait", type=int, default=None, help="Seconds to wait for tenant caches (default: TTL + 5)")
+    args = parser.parse_args()
+    move_tenant(args.subdomain, args.target_shard, args.drop_source, args.fence_wait)
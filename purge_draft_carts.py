@@ -0,0 +1,44 @@
+"""
+Delete expired held bills (draft carts) for every tenant.
+
+Usage: python purge_draft_carts.py [--tenant sub1 sub2]
+The POS endpoints already ignore drafts past expires_at; this only reclaims
+the rows. Safe to run from cron at any interval.
+"""
+import sys
+import os
+import argparse
+from datetime import datetime
+# Adjust path to include backend root
+sys.path.append(os.getcwd())
+
+from app.database import SessionLocal, create_tenant_session
+from app.models import Tenant, DraftCart
+
+
+def purge_all(subdomains=None):
+    with SessionLocal() as db:
+        query = db.query(Tenant).filter(Tenant.is_active == True)
+        if subdomains:
+            query = query.filter(Tenant.subdomain.in_(subdomains))
+        tenants = [(t.subdomain, t.schema_name, t.shard_key) for t in query.order_by(Tenant.id).all()]
+
+    for subdomain, schema_name, shard_key in tenants:
+        db = create_tenant_session(schema_name, shard_key)
+        try:
+            deleted = db.query(DraftCart).filter(DraftCart.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+            db.commit()
+            if deleted:
+                print(f"{subdomain}: purged {deleted} expired held bills")
+        except Exception as e:
+            db.rollback()
+            print(f"{subdomain}: FAILED - {e}")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge expired draft carts")
+    parser.add_argument("--tenant", nargs="*", help="Only these subdomains")
+    args = parser.parse_args()
+    purge_all(args.tenant)
@@ -0,0 +1,44 @@
+"""
+Recompute the stock_on_hand summary from stock_inventory for every tenant.
+
+Usage: python rebuild_stock_on_hand.py [--tenant sub1 sub2]
+Stock-changing requests keep the summary current on their own; run this
+after editing stock_inventory outside the app (scripts, manual SQL). Stock
+changes of a tenant wait while its summary is being rebuilt.
+"""
+import sys
+import os
+import argparse
+# Adjust path to include backend root
+sys.path.append(os.getcwd())
+
+from app.database import SessionLocal, create_tenant_session
+from app.models import Tenant
+from app.services.stock_on_hand import rebuild_stock_on_hand
+
+
+def rebuild_all(subdomains=None):
+    with SessionLocal() as db:
+        query = db.query(Tenant).filter(Tenant.is_active == True)
+        if subdomains:
+            query = query.filter(Tenant.subdomain.in_(subdomains))
+        tenants = [(t.subdomain, t.schema_name, t.shard_key) for t in query.order_by(Tenant.id).all()]
+
+    for subdomain, schema_name, shard_key in tenants:
+        db = create_tenant_session(schema_name, shard_key)
+        try:
+            rows = rebuild_stock_on_hand(db)
+            db.commit()
+            print(f"{subdomain}: {rows} stock_on_hand rows")
+        except Exception as e:
+            db.rollback()
+            print(f"{subdomain}: FAILED - {e}")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild stock_on_hand")
+    parser.add_argument("--tenant", nargs="*", help="Only these subdomains")
+    args = parser.parse_args()
+    rebuild_all(args.tenant)
@@ -0,0 +1,55 @@
+"""
+Accounting outbox worker: posts queued journal entries for every tenant.
+
+Usage: python run_accounting_outbox.py [--tenant sub1 sub2] [--interval 5] [--once]
+Several workers may run side by side; events are claimed with
+SELECT ... FOR UPDATE SKIP LOCKED. Failed postings are retried with
+exponential backoff and, after OUTBOX_MAX_ATTEMPTS, listed under
+GET /accounting/outbox (status=dead) for review and manual retry.
+Inactive tenants are drained too: postings queued before a deactivation or
+during a shard move must still reach the books.
+"""
+import sys
+import os
+import time
+import argparse
+# Adjust path to include backend root
+sys.path.append(os.getcwd())
+
+from app.database import SessionLocal, create_tenant_session
+from app.models import Tenant
+from app.services.accounting_outbox import drain_outbox
+
+
+def drain_all(subdomains=None):
+    with SessionLocal() as db:
+        query = db.query(Tenant)
+        if subdomains:
+            query = query.filter(Tenant.subdomain.in_(subdomains))
+        tenants = [(t.subdomain, t.schema_name, t.shard_key) for t in query.order_by(Tenant.id).all()]
+
+    for subdomain, schema_name, shard_key in tenants:
+        db = create_tenant_session(schema_name, shard_key)
+        try:
+            counts = drain_outbox(db)
+            if any(counts.values()):
+                print(f"{subdomain}: posted {counts['done']}, retrying {counts['pending']}, dead {counts['dead']}")
+        except Exception as e:
+            db.rollback()
+            print(f"{subdomain}: FAILED - {e}")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drain the accounting outbox")
+    parser.add_argument("--tenant", nargs="*", help="Only these subdomains")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("OUTBOX_POLL_SECONDS", 5)))
+    parser.add_argument("--once", action="store_true", help="Drain once and exit")
+    args = parser.parse_args()
+
+    while True:
+        drain_all(args.tenant)
+        if args.once:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,50 @@
+"""
+Apply Alembic migrations (migrations/versions) to every tenant schema.
+
+Usage:
+    python run_tenant_migrations.py [--revision head] [--workers 8] [--tenant sub1 sub2] [--force]
+    python run_tenant_migrations.py --status
+
+Progress is stored per tenant in public.tenant_migration_status. Re-running
+the command resumes: tenants already at the target revision are skipped and
+failed ones are retried. New revisions: alembic revision -m "..." (see
+migrations/script.py.mako).
+"""
+import sys
+import os
+import argparse
+# Adjust path to include backend root
+sys.path.append(os.getcwd())
+
+from app.database import SessionLocal, engine
+from app.models import TenantMigrationStatus
+from app.services.tenant_migrations import run_tenant_migrations
+
+
+def print_status():
+    TenantMigrationStatus.__table__.create(bind=engine, checkfirst=True)
+    with SessionLocal() as db:
+        rows = db.query(TenantMigrationStatus).order_by(TenantMigrationStatus.status, TenantMigrationStatus.schema_name).all()
+        for row in rows:
+            print(f"{row.schema_name:<30} {row.status:<8} current={row.current_revision} target={row.target_revision} attempts={row.attempts}")
+        if not rows:
+            print("No migration runs recorded yet")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate all tenant schemas")
+    parser.add_argument("--revision", default="head")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TENANT_MIGRATION_WORKERS", 4)))
+    parser.add_argument("--tenant", nargs="*", help="Only these subdomains")
+    parser.add_argument("--force", action="store_true", help="Re-run tenants already marked done")
+    parser.add_argument("--status", action="store_true", help="Show recorded progress and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+        sys.exit(0)
+
+    results = run_tenant_migrations(args.revision, args.workers, args.tenant, args.force)
+    failed = [r for r in results if r["status"] == "failed"]
+    print(f"Done: {len(results) - len(failed)} succeeded, {len(failed)} failed")
+    sys.exit(1 if failed else 0)
@@ -30,6 +30,7 @@ def sync_all_tenants():
                     # 4. Patch Columns (Robustly with individual commits if needed)
                     patches = [
                         "ALTER TABLE users ADD COLUMN IF NOT EXISTS store_id INTEGER REFERENCES stores(id)",
+                        "ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER DEFAULT 0",
                         "ALTER TABLE medicines ADD COLUMN IF NOT EXISTS image_url VARCHAR",
                         "ALTER TABLE medicines ADD COLUMN IF NOT EXISTS composition TEXT",
                         "ALTER TABLE medicines ADD COLUMN IF NOT EXISTS dosage_info TEXT",
@@ -0,0 +1,118 @@
+"""
+Self-contained checks for app/services/batch_allocation.py (no database):
+the FEFO/FIFO order of the allocation query, splitting lines across batches
+and the proportional split of a line's flat discount.
+
+Usage: python test_batch_allocation_logic.py
+"""
+import sys
+import os
+from collections import namedtuple
+from datetime import date
+from types import SimpleNamespace
+# Adjust path to include backend root
+sys.path.append(os.getcwd())
+
+from sqlalchemy.dialects import postgresql
+
+from app.schemas import POSItem
+from app.services.batch_allocation import allocate_batches, allocate_cart_items
+from app.services.stock_engine import InsufficientStockError
+
+Row = namedtuple("Row", "inventory_id product_id quantity batch_number expiry_date retail_price selling_price tax_percent running")
+
+
+class FakeSession:
+    """
+    Stands in for the tenant session. `batches` are {product_id: [(inventory_id, quantity)]}
+    in the order the query is expected to return them; `wanted` mirrors the VALUES list,
+    so execute() returns the rows the real query would keep.
+    """
+
+    def __init__(self, sale_module, batches, wanted):
+        self.info = {"tenant_schema": f"test_{sale_module}"}
+        self.sale_module = sale_module
+        self.batches = batches
+        self.wanted = wanted
+        self.statements = []
+
+    def query(self, *entities):
+        return SimpleNamespace(first=lambda: SimpleNamespace(sale_module=self.sale_module))
+
+    def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        rows = []
+        for product_id, qty in self.wanted.items():
+            running = 0
+            for inventory_id, quantity in self.batches.get(product_id, []):
+                running += quantity
+                if running - quantity < qty:
+                    rows.append(Row(inventory_id, product_id, quantity, f"B{inventory_id}", date(2030, 1, 1), 10.0, 10.0, 0, running))
+        return SimpleNamespace(all=lambda: rows)
+
+
+def test_query_order():
+    fefo = FakeSession("FEFO", {}, {})
+    try:
+        allocate_batches(fefo, {1: 1}, sale_module="FEFO")
+    except InsufficientStockError:
+        pass
+    assert "ORDER BY stock_inventory.expiry_date ASC NULLS LAST, stock_inventory.inventory_id)" in fefo.statements[0]
+    print("Pass: FEFO walks batches by expiry, then age")
+
+    fifo = FakeSession("FIFO", {}, {})
+    try:
+        allocate_batches(fifo, {1: 1}, sale_module="FIFO")
+    except InsufficientStockError:
+        pass
+    assert "ORDER BY stock_inventory.inventory_id)" in fifo.statements[0]
+    assert "expiry_date ASC" not in fifo.statements[0]
+    print("Pass: FIFO walks batches by age")
+
+
+def test_allocate_batches():
+    db = FakeSession("FIFO", {1: [(11, 3), (12, 5), (13, 4)]}, {1: 6})
+    allocs = allocate_batches(db, {1: 6}, sale_module="FIFO")[1]
+    assert [(a.batch_id, a.quantity) for a in allocs] == [(11, 3), (12, 3)]
+    print("Pass: 6 units -> 3 from batch 11, 3 from batch 12 (batch 13 untouched)")
+
+    db = FakeSession("FIFO", {1: [(11, 3)]}, {1: 5})
+    try:
+        allocate_batches(db, {1: 5}, sale_module="FIFO")
+        assert False, "expected InsufficientStockError"
+    except InsufficientStockError:
+        print("Pass: short stock raises InsufficientStockError")
+
+
+def test_allocate_cart_items():
+    items = [
+        POSItem(medicine_id=1, quantity=3, unit_price=10, discount_amount=1.0),
+        POSItem(medicine_id=1, quantity=2, unit_price=10, discount_amount=0.5),
+        POSItem(medicine_id=2, batch_id=99, quantity=1, unit_price=5),
+    ]
+    db = FakeSession("FEFO", {1: [(21, 1), (22, 1), (23, 10)]}, {1: 5})
+    lines = allocate_cart_items(db, items)
+
+    first = lines[:3]
+    assert [(l.batch_id, l.quantity) for l in first] == [(21, 1), (22, 1), (23, 1)]
+    assert [l.discount_amount for l in first[:2]] == [0.33, 0.33]
+    assert round(sum(l.discount_amount for l in first), 2) == 1.0
+    print("Pass: first line split 1/1/1 across batches, discount 0.33/0.33/0.34")
+
+    second = lines[3]
+    assert (second.batch_id, second.quantity, second.discount_amount) == (23, 2, 0.5)
+    print("Pass: second line of the same product continues in batch 23 with its full discount")
+
+    assert lines[4] is items[2]
+    assert len(lines) == 5
+    assert sum(l.quantity for l in lines if l.medicine_id == 1) == 5
+    assert all(l.total_price is None for l in lines[:4])
+    print("Pass: line with a batch_id kept as sent, quantities preserved")
+
+
+if __name__ == "__main__":
+    print("Testing batch allocation logic...")
+    test_query_order()
+    test_allocate_batches()
+    test_allocate_cart_items()
+    print("All batch allocation tests passed.")